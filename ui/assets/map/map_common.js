@@ -0,0 +1,183 @@
+/*
+ * 在线（百度地图）和离线（本地瓦片）地图页面共用的脚本：页面参数、标注聚合图层和与Python端的QWebChannel通信。
+ * 页面需要在引入本脚本前加载 qwebchannel.js，并在地图创建完成后设置 map、isMapLoaded、window.mapFunctions，
+ * 再调用 markerLayer.init() 和 notifyReady()。
+ */
+
+// 全局变量
+var map;
+var isMapLoaded = false;
+var bridge = null;  // Python端的MapBridge
+
+// 页面参数由Python端通过URL查询串传入：中心点、缩放级别、密钥、瓦片地址等
+var mapParams = (function() {
+    var query = new URLSearchParams(window.location.search);
+    return {
+        lat: parseFloat(query.get('lat') || '39.915'),
+        lng: parseFloat(query.get('lng') || '116.404'),
+        zoom: parseInt(query.get('zoom') || '12', 10),
+        ak: query.get('ak') || '',
+        tiles: query.get('tiles') || '',
+        fallback: query.get('fallback') || ''
+    };
+})();
+
+// 地图坐标点：百度地图使用BMapGL.Point，离线地图使用普通对象
+function mapPoint(lng, lat) {
+    return typeof BMapGL !== 'undefined' ? new BMapGL.Point(lng, lat) : {lng: lng, lat: lat};
+}
+
+// 标注聚合图层：所有告警和无人机点画在同一个canvas上，按屏幕网格聚合，不为每个点创建覆盖物
+var markerLayer = {
+    points: new Map(),  // 标注id -> {lat, lng, kind, level, title}
+    showAlerts: true,
+    viewportTimer: null,
+    canvas: null,
+    cell: 48,  // 聚合网格边长（像素）
+    pending: false,
+    colors: {high: '#ff3b30', medium: '#ff9500', low: '#ffcc00', processed: '#8e8e93'},
+    rank: {high: 3, medium: 2, low: 1, processed: 0},
+
+    init: function() {
+        var self = this;
+        this.canvas = document.createElement('canvas');
+        this.canvas.style.cssText = 'position:absolute;left:0;top:0;pointer-events:none;z-index:100;';
+        document.getElementById('map').appendChild(this.canvas);
+        ['moving', 'moveend', 'zooming', 'zoomend', 'dragging', 'resize'].forEach(function(name) {
+            map.addEventListener(name, function() { self.redraw(); });
+        });
+        ['moveend', 'zoomend', 'resize'].forEach(function(name) {
+            map.addEventListener(name, function() { self.reportViewport(); });
+        });
+        this.redraw();
+    },
+
+    // 视野变化停止后回报给Python端，由Python端推送视野内的点（防抖，连续操作只回报一次）
+    reportViewport: function() {
+        clearTimeout(this.viewportTimer);
+        this.viewportTimer = setTimeout(function() {
+            if (!bridge || !isMapLoaded) return;
+            var bounds = map.getBounds();
+            var sw = bounds.getSouthWest(), ne = bounds.getNorthEast();
+            bridge.reportViewport(sw.lat, sw.lng, ne.lat, ne.lng, map.getZoom());
+        }, 150);
+    },
+
+    // 应用一条合并消息：upsert为 [id, 纬度, 经度, 类别, 等级, 标题, 数量]
+    apply: function(batch) {
+        var points = this.points;
+        if (batch.reset) points.clear();
+        batch.remove.forEach(function(id) { points.delete(id); });
+        batch.upsert.forEach(function(m) {
+            points.set(m[0], {lat: m[1], lng: m[2], kind: m[3], level: m[4], title: m[5], count: m[6] || 1});
+        });
+        this.redraw();
+    },
+
+    // 同一动画帧内的多次重绘请求只画一次
+    redraw: function() {
+        if (this.pending || !this.canvas) return;
+        this.pending = true;
+        var self = this;
+        requestAnimationFrame(function() {
+            self.pending = false;
+            self.draw();
+        });
+    },
+
+    draw: function() {
+        var container = document.getElementById('map');
+        var w = container.clientWidth, h = container.clientHeight;
+        var ratio = window.devicePixelRatio || 1;
+        if (this.canvas.width !== w * ratio || this.canvas.height !== h * ratio) {
+            this.canvas.width = w * ratio;
+            this.canvas.height = h * ratio;
+            this.canvas.style.width = w + 'px';
+            this.canvas.style.height = h + 'px';
+        }
+        var ctx = this.canvas.getContext('2d');
+        ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+        ctx.clearRect(0, 0, w, h);
+
+        // 只投影视野内的点，同一网格内的同类点聚合为一个
+        var bounds = map.getBounds();
+        var sw = bounds.getSouthWest(), ne = bounds.getNorthEast();
+        var cell = this.cell, rank = this.rank, showAlerts = this.showAlerts;
+        var clusters = new Map();
+        this.points.forEach(function(p) {
+            if (p.kind === 'alert' && !showAlerts) return;
+            if (p.lat < sw.lat || p.lat > ne.lat || p.lng < sw.lng || p.lng > ne.lng) return;
+            var px = map.pointToPixel(mapPoint(p.lng, p.lat));
+            var key = p.kind + ':' + Math.floor(px.x / cell) + ',' + Math.floor(px.y / cell);
+            var c = clusters.get(key);
+            if (!c) {
+                clusters.set(key, {x: px.x * p.count, y: px.y * p.count, n: p.count, kind: p.kind,
+                                    level: p.level, title: p.title});
+            } else {
+                c.x += px.x * p.count;
+                c.y += px.y * p.count;
+                c.n += p.count;
+                if ((rank[p.level] || 0) > (rank[c.level] || 0)) c.level = p.level;  // 显示最高等级
+            }
+        });
+
+        var colors = this.colors;
+        ctx.font = 'bold 11px Arial';
+        ctx.textAlign = 'center';
+        ctx.textBaseline = 'middle';
+        ctx.lineWidth = 1.5;
+        ctx.strokeStyle = 'white';
+        clusters.forEach(function(c) {
+            var x = c.x / c.n, y = c.y / c.n;
+            var r = c.n === 1 ? 6 : Math.min(10 + Math.log2(c.n) * 3, 28);
+            ctx.beginPath();
+            if (c.kind === 'drone') {
+                ctx.rect(x - r, y - r, 2 * r, 2 * r);
+                ctx.fillStyle = 'rgba(30, 144, 255, 0.85)';
+            } else {
+                ctx.arc(x, y, r, 0, 2 * Math.PI);
+                ctx.fillStyle = colors[c.level] || colors.medium;
+            }
+            ctx.fill();
+            ctx.stroke();
+            ctx.fillStyle = 'white';
+            if (c.n > 1) {
+                ctx.fillText(c.n > 999 ? Math.round(c.n / 1000) + 'k' : c.n, x, y);
+            } else if (c.kind === 'drone' && c.title) {
+                ctx.fillText(c.title, x, y - r - 8);
+            }
+        });
+    }
+};
+
+// 处理Python端发来的一帧合并消息：标注变化 + 地图命令
+function applyBatch(message) {
+    var batch = JSON.parse(message);
+    markerLayer.apply(batch);
+    batch.commands.forEach(function(cmd) {
+        var fn = window.mapFunctions && window.mapFunctions[cmd[0]];
+        if (typeof fn === 'function') {
+            fn.apply(null, cmd.slice(1));
+        } else {
+            console.error('地图函数不可用: ' + cmd[0]);
+        }
+    });
+}
+
+// 地图和通道都就绪后通知Python端发送全部标注
+function notifyReady() {
+    if (bridge && isMapLoaded && window.mapFunctions) {
+        bridge.ready();
+        markerLayer.reportViewport();
+    }
+}
+
+if (typeof QWebChannel !== "undefined") {
+    new QWebChannel(qt.webChannelTransport, function(channel) {
+        bridge = channel.objects.bridge;
+        bridge.batchReady.connect(applyBatch);
+        notifyReady();
+    });
+} else {
+    console.error("QWebChannel不可用，地图标注不会显示");
+}
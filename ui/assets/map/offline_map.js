@@ -0,0 +1,288 @@
+/*
+ * 离线地图：在本地瓦片服务（Web墨卡托XYZ瓦片）上实现拖动、滚轮缩放，
+ * 提供标注图层用到的与百度地图相同的接口（getBounds、getZoom、pointToPixel、addEventListener）。
+ *
+ * 系统中的坐标（地图中心、监测区域、告警和无人机位置）都是百度地图的BD-09坐标，而XYZ瓦片按WGS-84绘制，
+ * 两者相差数百米。对外接口仍使用BD-09，内部投影前转换为WGS-84（BD-09 -> GCJ-02 -> WGS-84）。
+ */
+
+// BD-09 / GCJ-02 / WGS-84 坐标转换（GCJ-02 -> WGS-84 没有解析解，迭代求逆，误差在厘米级）
+var CoordTransform = {
+    X_PI: Math.PI * 3000 / 180,
+    A: 6378245.0,
+    EE: 0.00669342162296594323,
+
+    outOfChina: function(lat, lng) {
+        return lng < 72.004 || lng > 137.8347 || lat < 0.8293 || lat > 55.8271;
+    },
+
+    bd09ToGcj02: function(lat, lng) {
+        var x = lng - 0.0065, y = lat - 0.006;
+        var z = Math.sqrt(x * x + y * y) - 0.00002 * Math.sin(y * this.X_PI);
+        var theta = Math.atan2(y, x) - 0.000003 * Math.cos(x * this.X_PI);
+        return {lat: z * Math.sin(theta), lng: z * Math.cos(theta)};
+    },
+
+    gcj02ToBd09: function(lat, lng) {
+        var z = Math.sqrt(lng * lng + lat * lat) + 0.00002 * Math.sin(lat * this.X_PI);
+        var theta = Math.atan2(lat, lng) + 0.000003 * Math.cos(lng * this.X_PI);
+        return {lat: z * Math.sin(theta) + 0.006, lng: z * Math.cos(theta) + 0.0065};
+    },
+
+    wgs84ToGcj02: function(lat, lng) {
+        if (this.outOfChina(lat, lng)) return {lat: lat, lng: lng};
+        var x = lng - 105.0, y = lat - 35.0;
+        var dLat = -100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * Math.sqrt(Math.abs(x))
+            + (20.0 * Math.sin(6.0 * x * Math.PI) + 20.0 * Math.sin(2.0 * x * Math.PI)) * 2.0 / 3.0
+            + (20.0 * Math.sin(y * Math.PI) + 40.0 * Math.sin(y / 3.0 * Math.PI)) * 2.0 / 3.0
+            + (160.0 * Math.sin(y / 12.0 * Math.PI) + 320 * Math.sin(y * Math.PI / 30.0)) * 2.0 / 3.0;
+        var dLng = 300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * Math.sqrt(Math.abs(x))
+            + (20.0 * Math.sin(6.0 * x * Math.PI) + 20.0 * Math.sin(2.0 * x * Math.PI)) * 2.0 / 3.0
+            + (20.0 * Math.sin(x * Math.PI) + 40.0 * Math.sin(x / 3.0 * Math.PI)) * 2.0 / 3.0
+            + (150.0 * Math.sin(x / 12.0 * Math.PI) + 300.0 * Math.sin(x / 30.0 * Math.PI)) * 2.0 / 3.0;
+        var radLat = lat / 180.0 * Math.PI;
+        var magic = 1 - this.EE * Math.sin(radLat) * Math.sin(radLat);
+        var sqrtMagic = Math.sqrt(magic);
+        dLat = (dLat * 180.0) / ((this.A * (1 - this.EE)) / (magic * sqrtMagic) * Math.PI);
+        dLng = (dLng * 180.0) / (this.A / sqrtMagic * Math.cos(radLat) * Math.PI);
+        return {lat: lat + dLat, lng: lng + dLng};
+    },
+
+    gcj02ToWgs84: function(lat, lng) {
+        var w = {lat: lat, lng: lng};
+        for (var i = 0; i < 3; i++) {
+            var g = this.wgs84ToGcj02(w.lat, w.lng);
+            w = {lat: w.lat - (g.lat - lat), lng: w.lng - (g.lng - lng)};
+        }
+        return w;
+    },
+
+    bd09ToWgs84: function(lat, lng) {
+        var g = this.bd09ToGcj02(lat, lng);
+        return this.gcj02ToWgs84(g.lat, g.lng);
+    },
+
+    wgs84ToBd09: function(lat, lng) {
+        var g = this.wgs84ToGcj02(lat, lng);
+        return this.gcj02ToBd09(g.lat, g.lng);
+    }
+};
+
+function TileMap(container, options) {
+    this.container = container;
+    this.tileUrl = options.tiles;
+    this.minZoom = options.minZoom || 3;
+    this.maxZoom = options.maxZoom || 18;
+    this.zoom = Math.round(options.zoom);
+    this.center = CoordTransform.bd09ToWgs84(options.lat, options.lng);  // 内部使用WGS-84
+    this.listeners = {};
+    this.tiles = new Map();  // "z/x/y" -> <img>
+
+    container.innerHTML = '';
+    container.style.position = 'relative';
+    container.style.overflow = 'hidden';
+    this.pane = document.createElement('div');
+    this.pane.style.cssText = 'position:absolute;left:0;top:0;width:100%;height:100%;';
+    container.appendChild(this.pane);
+
+    this.bindEvents();
+    this.render();
+}
+
+TileMap.TILE_SIZE = 256;
+
+// WGS-84经纬度 <-> 当前缩放级别下的世界像素坐标
+TileMap.prototype.project = function(lat, lng, zoom) {
+    var scale = TileMap.TILE_SIZE * Math.pow(2, zoom);
+    var sin = Math.sin(Math.max(Math.min(lat, 85.0511), -85.0511) * Math.PI / 180);
+    return {
+        x: (lng + 180) / 360 * scale,
+        y: (0.5 - Math.log((1 + sin) / (1 - sin)) / (4 * Math.PI)) * scale
+    };
+};
+
+TileMap.prototype.unproject = function(x, y, zoom) {
+    var scale = TileMap.TILE_SIZE * Math.pow(2, zoom);
+    var n = Math.PI - 2 * Math.PI * y / scale;
+    return {
+        lat: 180 / Math.PI * Math.atan(0.5 * (Math.exp(n) - Math.exp(-n))),
+        lng: x / scale * 360 - 180
+    };
+};
+
+// 视口左上角的世界像素坐标
+TileMap.prototype.origin = function() {
+    var c = this.project(this.center.lat, this.center.lng, this.zoom);
+    return {x: c.x - this.container.clientWidth / 2, y: c.y - this.container.clientHeight / 2};
+};
+
+// 以下对外接口的坐标均为BD-09
+TileMap.prototype.pointToPixel = function(point) {
+    var w = CoordTransform.bd09ToWgs84(point.lat, point.lng);
+    var p = this.project(w.lat, w.lng, this.zoom), o = this.origin();
+    return {x: p.x - o.x, y: p.y - o.y};
+};
+
+TileMap.prototype.getBounds = function() {
+    var o = this.origin(), w = this.container.clientWidth, h = this.container.clientHeight;
+    var sw = this.unproject(o.x, o.y + h, this.zoom), ne = this.unproject(o.x + w, o.y, this.zoom);
+    sw = CoordTransform.wgs84ToBd09(sw.lat, sw.lng);
+    ne = CoordTransform.wgs84ToBd09(ne.lat, ne.lng);
+    return {
+        getSouthWest: function() { return sw; },
+        getNorthEast: function() { return ne; }
+    };
+};
+
+TileMap.prototype.getZoom = function() {
+    return this.zoom;
+};
+
+TileMap.prototype.addEventListener = function(name, callback) {
+    (this.listeners[name] = this.listeners[name] || []).push(callback);
+};
+
+TileMap.prototype.fire = function(name) {
+    (this.listeners[name] || []).forEach(function(callback) { callback(); });
+};
+
+TileMap.prototype.centerAndZoom = function(point, zoom) {
+    this.center = CoordTransform.bd09ToWgs84(point.lat, point.lng);
+    this.setZoom(zoom);
+    this.render();
+    this.fire('moveend');
+};
+
+TileMap.prototype.setZoom = function(zoom, anchor) {
+    zoom = Math.max(this.minZoom, Math.min(this.maxZoom, Math.round(zoom)));
+    if (zoom === this.zoom) return;
+    if (anchor) {
+        // 以鼠标位置为中心缩放：缩放前后鼠标下的经纬度不变
+        var o = this.origin();
+        var fixed = this.unproject(o.x + anchor.x, o.y + anchor.y, this.zoom);
+        var p = this.project(fixed.lat, fixed.lng, zoom);
+        var w = this.container.clientWidth, h = this.container.clientHeight;
+        this.center = this.unproject(p.x - anchor.x + w / 2, p.y - anchor.y + h / 2, zoom);
+    }
+    this.zoom = zoom;
+    this.render();
+    this.fire('zoomend');
+};
+
+TileMap.prototype.panBy = function(dx, dy) {
+    var c = this.project(this.center.lat, this.center.lng, this.zoom);
+    this.center = this.unproject(c.x - dx, c.y - dy, this.zoom);
+    this.render();
+};
+
+// 只保留覆盖视口的瓦片，新出现的瓦片从本地瓦片服务加载
+TileMap.prototype.render = function() {
+    var size = TileMap.TILE_SIZE, n = Math.pow(2, this.zoom);
+    var o = this.origin(), w = this.container.clientWidth, h = this.container.clientHeight;
+    var x0 = Math.floor(o.x / size), x1 = Math.floor((o.x + w) / size);
+    var y0 = Math.max(Math.floor(o.y / size), 0), y1 = Math.min(Math.floor((o.y + h) / size), n - 1);
+    var needed = new Set();
+    for (var x = x0; x <= x1; x++) {
+        for (var y = y0; y <= y1; y++) {
+            var tx = ((x % n) + n) % n;  // 经度方向循环
+            var key = this.zoom + '/' + x + '/' + y;
+            needed.add(key);
+            var img = this.tiles.get(key);
+            if (!img) {
+                img = document.createElement('img');
+                img.style.cssText = 'position:absolute;width:' + size + 'px;height:' + size + 'px;user-select:none;';
+                img.draggable = false;
+                img.onerror = function() { this.style.visibility = 'hidden'; };  // 未缓存的瓦片
+                img.src = this.tileUrl.replace('{z}', this.zoom).replace('{x}', tx).replace('{y}', y);
+                this.pane.appendChild(img);
+                this.tiles.set(key, img);
+            }
+            img.style.left = Math.round(x * size - o.x) + 'px';
+            img.style.top = Math.round(y * size - o.y) + 'px';
+        }
+    }
+    var self = this;
+    this.tiles.forEach(function(img, key) {
+        if (!needed.has(key)) {
+            self.pane.removeChild(img);
+            self.tiles.delete(key);
+        }
+    });
+};
+
+TileMap.prototype.bindEvents = function() {
+    var self = this, container = this.container, drag = null;
+    container.addEventListener('mousedown', function(e) {
+        drag = {x: e.clientX, y: e.clientY, moved: false};
+    });
+    window.addEventListener('mousemove', function(e) {
+        if (!drag) return;
+        self.panBy(e.clientX - drag.x, e.clientY - drag.y);
+        drag.x = e.clientX;
+        drag.y = e.clientY;
+        drag.moved = true;
+        self.fire('moving');
+    });
+    window.addEventListener('mouseup', function() {
+        if (drag && drag.moved) self.fire('moveend');
+        drag = null;
+    });
+    container.addEventListener('wheel', function(e) {
+        e.preventDefault();
+        var rect = container.getBoundingClientRect();
+        self.setZoom(self.zoom + (e.deltaY < 0 ? 1 : -1), {x: e.clientX - rect.left, y: e.clientY - rect.top});
+    }, {passive: false});
+    container.addEventListener('dblclick', function(e) {
+        var rect = container.getBoundingClientRect();
+        self.setZoom(self.zoom + 1, {x: e.clientX - rect.left, y: e.clientY - rect.top});
+    });
+    window.addEventListener('resize', function() {
+        self.render();
+        self.fire('resize');
+    });
+};
+
+function initOfflineMap() {
+    var container = document.getElementById('map');
+    if (!mapParams.tiles) {
+        container.innerHTML = '<div class="offline-map"><h2>离线地图不可用</h2><p>未配置本地瓦片服务</p></div>';
+        return;
+    }
+    map = new TileMap(container, mapParams);
+    isMapLoaded = true;
+
+    // 与在线地图相同的控制函数，由Python端通过bridge.command调用
+    window.mapFunctions = {
+        setMapType: function(type) {
+            console.log('离线地图只有一种瓦片图层，忽略地图类型: ' + type);
+            return true;
+        },
+        panTo: function(lat, lng) {
+            map.centerAndZoom({lat: lat, lng: lng}, map.getZoom());
+            return true;
+        },
+        zoomIn: function() {
+            map.setZoom(map.getZoom() + 1);
+            return true;
+        },
+        zoomOut: function() {
+            map.setZoom(map.getZoom() - 1);
+            return true;
+        },
+        toggleAlerts: function(show) {
+            markerLayer.showAlerts = show;
+            markerLayer.redraw();
+            return true;
+        },
+        locateCurrentPosition: function() {
+            // 离线时没有定位服务，回到配置的地图中心
+            map.centerAndZoom({lat: mapParams.lat, lng: mapParams.lng}, mapParams.zoom);
+            return true;
+        }
+    };
+
+    markerLayer.init();
+    notifyReady();
+}
+
+window.onload = initOfflineMap;
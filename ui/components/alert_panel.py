@@ -2,11 +2,14 @@ import os
 import time
 from datetime import datetime
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-                            QTableWidget, QTableWidgetItem, QHeaderView, QComboBox,
+                            QTableView, QHeaderView, QComboBox,
                             QGroupBox, QToolBar, QAction, QMenu, QAbstractItemView, QMessageBox, QDialog, QProgressBar)
-from PyQt5.QtCore import Qt, pyqtSlot, QSize, QTimer, QDateTime, pyqtSignal
+from PyQt5.QtCore import Qt, pyqtSlot, QSize, QTimer, QDateTime, pyqtSignal, QCoreApplication
 from PyQt5.QtGui import QIcon, QColor, QBrush, QFont, QPixmap
 import random
+from utils.alert_engine import AlertEngine
+from utils.alert_store import AlertStore
+from ui.components.alert_table_model import AlertTableModel, AlertFilterProxy
 
 class AlertPanel(QWidget):
     """告警面板组件，显示各类灾害告警信息"""
@@ -14,11 +17,20 @@ class AlertPanel(QWidget):
     # 添加信号用于通知统计面板
     alert_added = pyqtSignal(str, str)  # 参数: alert_type, region
     alert_processed = pyqtSignal(str, str)  # 参数: alert_type, region - 新增信号用于通知告警已处理
+    alert_changed = pyqtSignal(dict)  # 告警新增、合并或处理后发出，参数: 告警字典（用于地图标注）
     
     def __init__(self, config):
         super().__init__()
         self.config = config
-        self.alerts = []  # 保存所有告警
+        self.page_size = config.get('alert_page_size', 200)  # 每次从数据库加载的历史告警条数
+        self.history_done = False  # 当前过滤条件下的历史告警是否已全部加载
+        self.max_rows = config.get('alert_table_rows', 10000)  # 表格最多保留的告警数，全部告警保存在数据库中
+        self.pending_alerts = []  # 等待批量插入表格的新告警
+        self.alert_engine = AlertEngine.from_config(config)  # 告警去重与限流
+        self.store = AlertStore(config.get('alert_db', os.path.join(config.get('logs_path', 'logs'), 'alerts.db')))
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.store.close)  # 退出前提交剩余写入
         self.current_filter = "all"  # 当前过滤类型
         self.current_severity = "all"  # 当前严重程度过滤
         
@@ -32,6 +44,7 @@ class AlertPanel(QWidget):
         })
         
         self.init_ui()
+        self.load_history()  # 加载最近的历史告警
         
         # 设置自动更新定时器
         self.update_timer = QTimer(self)
@@ -107,10 +120,15 @@ class AlertPanel(QWidget):
         # 添加工具栏到布局
         layout.addLayout(toolbar)
         
-        # 创建表格
-        self.alert_table = QTableWidget()
-        self.alert_table.setColumnCount(6)
-        self.alert_table.setHorizontalHeaderLabels(["时间", "类型", "位置", "详情", "等级", "操作"])
+        # 创建表格（模型/视图，数据按需生成，过滤排序由代理模型完成）
+        self.alert_model = AlertTableModel(self, max_rows=self.max_rows)
+        self.alert_proxy = AlertFilterProxy(self)
+        self.alert_proxy.setSourceModel(self.alert_model)
+        self.alert_table = QTableView()
+        self.alert_table.setModel(self.alert_proxy)
+        self.alert_table.setSortingEnabled(True)
+        self.alert_table.sortByColumn(0, Qt.AscendingOrder)
+        self.alert_table.verticalHeader().setDefaultSectionSize(28)  # 固定行高，避免逐行计算
         self.alert_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.alert_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.alert_table.setAlternatingRowColors(True)
@@ -120,16 +138,18 @@ class AlertPanel(QWidget):
                                       "QTableView { gridline-color: #1e3a5a; border: 1px solid #1e3a5a; }"
                                       "QTableView::item:selected { background-color: #2a4a6a; }")
         
-        # 设置列宽
-        self.alert_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
-        self.alert_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
-        self.alert_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
-        self.alert_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
-        self.alert_table.horizontalHeader().setSectionResizeMode(4, QHeaderView.ResizeToContents)
-        self.alert_table.horizontalHeader().setSectionResizeMode(5, QHeaderView.ResizeToContents)
+        # 设置列宽（ResizeToContents会遍历所有行，改为固定/交互宽度）
+        header = self.alert_table.horizontalHeader()
+        for column, width in ((0, 150), (1, 100), (2, 120), (4, 100), (5, 60)):
+            header.setSectionResizeMode(column, QHeaderView.Interactive)
+            header.resizeSection(column, width)
+        header.setSectionResizeMode(3, QHeaderView.Stretch)
         
-        # 双击行处理
-        self.alert_table.cellDoubleClicked.connect(self.show_alert_detail)
+        # 单击"操作"列处理告警，双击行查看详情
+        self.alert_table.clicked.connect(self.on_table_clicked)
+        self.alert_table.doubleClicked.connect(self.show_alert_detail)
+        # 滚动到顶部时从数据库加载更早的告警
+        self.alert_table.verticalScrollBar().valueChanged.connect(self.on_table_scrolled)
         
         # 添加表格到布局
         layout.addWidget(self.alert_table)
@@ -138,20 +158,49 @@ class AlertPanel(QWidget):
         self.setMinimumHeight(150)
         
     def add_alert(self, alert):
-        """添加告警到列表和表格"""
-        # 添加到告警列表
-        self.alerts.append(alert)
+        """添加告警到列表和表格
+        
+        返回:
+            str: 'new' 新增告警，'update' 合并到已有告警，'drop' 被限流丢弃
+        """
+        # 先经过告警引擎去重和限流
+        action, alert = self.alert_engine.ingest(alert)
+        if action == 'drop':
+            return action
+        if action == 'update':
+            self.store.update(alert)
+            self.update_alert_row(alert)
+            self.alert_changed.emit(alert)
+            return action
+        
+        # 保存到数据库（后台线程批量写入）
+        self.store.add(alert)
         
         # 发出信号通知统计面板
         print(f"发送告警信号: 类型={alert['type']}, 区域={alert['location']}")
         self.alert_added.emit(alert['type'], alert['location'])
+        self.alert_changed.emit(alert)
+        
+        # 同一轮事件循环内的告警合并成一批插入表格
+        self.pending_alerts.append(alert)
+        if len(self.pending_alerts) == 1:
+            QTimer.singleShot(0, self.flush_pending_alerts)
+        return action
+            
+    def flush_pending_alerts(self):
+        """把积累的新告警一次性插入表格"""
+        alerts, self.pending_alerts = self.pending_alerts, []
+        self.alert_model.append(alerts)
+        self.alert_table.scrollToBottom()  # 自动滚动到最新行
         
-        # 检查是否符合当前过滤条件
-        type_match = self.current_filter == "all" or alert['type'] == self.current_filter
-        severity_match = self.current_severity == "all" or alert['level'] == self.current_severity
+    def update_alert_row(self, alert):
+        """合并告警后原地刷新对应行的详情和等级"""
+        self.alert_model.update_alert(alert)
         
-        if type_match and severity_match:
-            self.add_filtered_alert(alert)
+    def get_alert_detail(self, alert):
+        """告警详情，合并过的告警附带次数"""
+        count = alert.get('count', 1)
+        return alert['detail'] if count <= 1 else f"{alert['detail']}（{count}次）"
         
     def get_alert_type_name(self, alert_type):
         """获取告警类型的中文名称
@@ -211,79 +260,57 @@ class AlertPanel(QWidget):
         
     @pyqtSlot(int)
     def filter_alerts(self, index):
-        """过滤告警"""
+        """过滤告警：按条件从数据库重新加载，之后的新告警由代理模型按类型/等级编码筛选"""
         # 获取当前过滤类型
         self.current_filter = self.filter_combo.currentData()
         self.current_severity = self.severity_combo.currentData()
-        
-        # 清空表格
-        self.alert_table.setRowCount(0)
-        
-        # 重新添加符合条件的告警
-        for alert in self.alerts:
-            type_match = self.current_filter == "all" or alert['type'] == self.current_filter
-            severity_match = self.current_severity == "all" or alert['level'] == self.current_severity
-            
-            if type_match and severity_match:
-                self.add_filtered_alert(alert)
+        self.alert_proxy.set_filter(self.current_filter, self.current_severity)
+        self.load_history()
+        
+    def load_history(self):
+        """从数据库加载符合当前过滤条件的最近告警"""
+        alerts = self.store.query(self.current_filter, self.current_severity, limit=self.page_size)
+        self.history_done = len(alerts) < self.page_size
+        self.alert_model.set_alerts(alerts[::-1])
+        self.alert_table.scrollToBottom()
+        
+    def load_older(self):
+        """从数据库加载比表格中最早的告警更早的一页"""
+        if self.history_done or not self.alert_model.alerts:
+            return
+        oldest = self.alert_model.alerts[0]
+        alerts = self.store.query(self.current_filter, self.current_severity, limit=self.page_size,
+                                  before=(oldest['ts'], oldest['id']))
+        self.history_done = len(alerts) < self.page_size
+        rows = self.alert_proxy.rowCount()
+        self.alert_model.prepend(alerts[::-1])
+        # 保持当前可见的行不动（表格按行滚动）
+        self.alert_table.verticalScrollBar().setValue(self.alert_proxy.rowCount() - rows)
+        
+    def on_table_scrolled(self, value):
+        if value == 0 and self.alert_table.verticalScrollBar().maximum() > 0:
+            self.load_older()
                 
-    def add_filtered_alert(self, alert):
-        """添加过滤后的告警到表格（不添加到告警列表）"""
-        row = self.alert_table.rowCount()
-        self.alert_table.insertRow(row)
-        
-        # 设置单元格内容
-        self.alert_table.setItem(row, 0, QTableWidgetItem(alert['time']))
-        
-        # 根据类型设置显示名称和颜色
-        type_item = QTableWidgetItem(self.get_alert_type_name(alert['type']))
-        type_item.setData(Qt.UserRole, alert['type'])
-        type_item.setBackground(self.get_alert_type_color(alert['type']))
-        self.alert_table.setItem(row, 1, type_item)
-        
-        self.alert_table.setItem(row, 2, QTableWidgetItem(alert['location']))
-        self.alert_table.setItem(row, 3, QTableWidgetItem(alert['detail']))
-        
-        # 根据等级设置显示名称和颜色
-        level_item = QTableWidgetItem(self.get_alert_level_name(alert['level']))
-        level_item.setBackground(self.get_alert_level_color(alert['level']))
-        self.alert_table.setItem(row, 4, level_item)
-        
-        # 操作按钮
-        btn_cell = QWidget()
-        btn_layout = QHBoxLayout(btn_cell)
-        btn_layout.setContentsMargins(2, 2, 2, 2)
-        
-        details_btn = QPushButton("详情")
-        details_btn.setFixedWidth(60)
-        details_btn.clicked.connect(lambda _, a=alert: self.show_alert_details(a))
-        
-        handle_btn = QPushButton("处理")
-        handle_btn.setFixedWidth(60)
-        if alert['level'] == 'high':
-            handle_btn.setEnabled(False)
-        handle_btn.clicked.connect(lambda _, r=row: self.handle_alert(r))
-        
-        btn_layout.addWidget(details_btn)
-        btn_layout.addWidget(handle_btn)
-        btn_cell.setLayout(btn_layout)
-        
-        self.alert_table.setCellWidget(row, 5, btn_cell)
-        
-        # 自动滚动到最新行
-        self.alert_table.scrollToItem(self.alert_table.item(row, 0))
-        
     @pyqtSlot()
     def clear_alerts(self):
         """清空告警"""
-        self.alerts = []
-        self.alert_table.setRowCount(0)
+        self.pending_alerts = []
+        self.history_done = True
+        self.alert_model.clear()
+        self.alert_engine.clear()
+        self.store.clear()
         
-    @pyqtSlot(int, int)
-    def show_alert_detail(self, row, column):
+    def show_alert_detail(self, index):
         """显示告警详情（双击行时触发）"""
-        # 实际项目中可以打开告警详情对话框
-        print(f"显示第 {row} 行告警详情")
+        self.show_alert_details(index.data(Qt.UserRole))
+        
+    def on_table_clicked(self, index):
+        """点击"操作"列时处理告警"""
+        if index.column() != 5:
+            return
+        alert = index.data(Qt.UserRole)
+        if alert['level'] not in ('high', 'processed'):  # 高等级告警不能直接处理
+            self.handle_alert(alert)
         
     def show_alert_details(self, alert):
         """显示告警详情"""
@@ -309,7 +336,7 @@ class AlertPanel(QWidget):
         msg.setIcon(QMessageBox.Information)
         msg.exec_()
         
-    def handle_alert(self, row):
+    def handle_alert(self, alert):
         """处理告警"""
         # 防止重复处理
         current_time = datetime.now()
@@ -318,9 +345,6 @@ class AlertPanel(QWidget):
                 return
         self.last_handle_time = current_time
         
-        # 获取告警数据
-        alert = self.alerts[row]
-        
         # 向护林员发送通知
         self.send_notification_to_ranger(alert)
         
@@ -332,32 +356,17 @@ class AlertPanel(QWidget):
             alert['level'] = 'low'
         elif alert['level'] == 'low':
             alert['level'] = 'processed'  # 添加'processed'状态表示已完全处理
+            self.alert_engine.forget(alert)  # 之后的同类告警作为新告警
+        self.store.update_status(alert)
         
         # 更新UI显示
-        level_name = self.get_alert_level_name(alert['level'])
-        level_color = self.get_alert_level_color(alert['level'])
-        
-        level_item = QTableWidgetItem(level_name)
-        level_item.setBackground(level_color)
-        self.alert_table.setItem(row, 4, level_item)
-        
-        # 如果已完全处理，禁用处理按钮
-        if alert['level'] == 'processed':
-            cell_widget = self.alert_table.cellWidget(row, 5)
-            if cell_widget:
-                for child in cell_widget.children():
-                    if isinstance(child, QPushButton) and child.text() == "处理":
-                        child.setEnabled(False)
-                        child.setText("已处理")
-                        break
+        self.alert_model.update_alert(alert)
+        self.alert_changed.emit(alert)
         
         # 发送告警已处理信号
         print(f"发送告警处理信号: 类型={alert['type']}, 区域={alert['location']}")
         self.alert_processed.emit(alert['type'], alert['location'])
         
-        # 滚动到当前行
-        self.alert_table.scrollToItem(self.alert_table.item(row, 0))
-        
     def send_notification_to_ranger(self, alert):
         """向护林员发送通知
         
@@ -629,7 +638,7 @@ class AlertPanel(QWidget):
             area = random.randint(10, 200)
             detail = f'检测到{pest_type}病虫害，受灾面积约{area}平方米'
         else:
-            detail = f'新检测到的告警 #{len(self.alerts) + 1}'
+            detail = f'新检测到的告警 #{self.store.next_id}'
         
         alert = {
             'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -0,0 +1,362 @@
+"""
+告警表格的模型/视图实现
+
+AlertTableModel 按行保存告警，用于过滤和排序的字段（时间戳、类型、等级）另存为NumPy列，
+单元格内容在 data() 中按需生成；一批告警只触发一次 beginInsertRows。
+AlertFilterProxy 用NumPy列向量化地计算过滤和排序后的行号，不逐行回调；源模型增删行时增量更新映射。
+表格只是数据库的一个窗口：过滤条件下推到 AlertStore.query，更早的告警按需从数据库翻页加载（prepend）。
+"""
+import time
+
+import numpy as np
+from PyQt5.QtCore import Qt, QAbstractTableModel, QAbstractProxyModel, QModelIndex
+from PyQt5.QtGui import QBrush, QColor
+
+
+class AlertTableModel(QAbstractTableModel):
+    """告警表格模型"""
+
+    HEADERS = ["时间", "类型", "位置", "详情", "等级", "操作"]
+    LEVELS = ['high', 'medium', 'low', 'processed']
+
+    def __init__(self, panel, max_rows=10000, parent=None):
+        """
+        参数:
+            panel (AlertPanel): 提供类型/等级的名称和颜色
+            max_rows (int): 最多保留的告警行数，超出时删除最旧的行
+        """
+        super().__init__(parent)
+        self.panel = panel
+        self.max_rows = max_rows
+        self.alerts = []  # 行 -> 告警字典
+        self.row_of = {}  # id(告警) -> 绝对序号（含已删除的行）
+        self.offset = 0  # 第0行的绝对序号（删除最旧行时增加，向前翻页时减少）
+        self.type_codes = {}  # 类型 -> 编码
+        self.size = 0
+        self.ts = np.zeros(1024)  # 首次出现时间，合并告警不改变排序位置
+        self.types = np.zeros(1024, dtype=np.int16)
+        self.levels = np.zeros(1024, dtype=np.int16)
+        self.brushes = {}  # 缓存的背景画刷
+
+    def type_code(self, alert_type):
+        code = self.type_codes.get(alert_type)
+        if code is None:
+            code = self.type_codes[alert_type] = len(self.type_codes)
+        return code
+
+    def level_code(self, level):
+        return self.LEVELS.index(level) if level in self.LEVELS else len(self.LEVELS)
+
+    def reserve(self, n):
+        """列数组容量不足时按倍数扩容"""
+        if n > len(self.ts):
+            capacity = max(n, 2 * len(self.ts))
+            for name in ('ts', 'types', 'levels'):
+                column = getattr(self, name)
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                setattr(self, name, grown)
+
+    # Qt模型接口
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.alerts)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        alert = self.alerts[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return alert.get('last_time') or alert['time']
+            if column == 1:
+                return self.panel.get_alert_type_name(alert['type'])
+            if column == 2:
+                return alert['location']
+            if column == 3:
+                return self.panel.get_alert_detail(alert)
+            if column == 4:
+                return self.panel.get_alert_level_name(alert['level'])
+            if column == 5:
+                return "已处理" if alert['level'] == 'processed' else "处理"
+        elif role == Qt.BackgroundRole:
+            if column == 1:
+                return self.brush('type', alert['type'])
+            if column == 4:
+                return self.brush('level', alert['level'])
+        elif role == Qt.ForegroundRole and column == 5 and alert['level'] in ('high', 'processed'):
+            return QBrush(QColor(120, 120, 120))  # 不可处理
+        elif role == Qt.UserRole:
+            return alert
+        return None
+
+    def brush(self, kind, key):
+        cached = self.brushes.get((kind, key))
+        if cached is None:
+            color = self.panel.get_alert_type_color(key) if kind == 'type' else self.panel.get_alert_level_color(key)
+            cached = self.brushes[(kind, key)] = QBrush(color)
+        return cached
+
+    # 数据操作
+    def append(self, alerts):
+        """批量追加告警，整批只触发一次行插入通知"""
+        if not alerts:
+            return
+        first = len(self.alerts)
+        self.reserve(self.size + len(alerts))
+        self.beginInsertRows(QModelIndex(), first, first + len(alerts) - 1)
+        for i, alert in enumerate(alerts, self.size):
+            self.ts[i] = alert.get('ts', time.time())
+            self.types[i] = self.type_code(alert['type'])
+            self.levels[i] = self.level_code(alert['level'])
+            self.row_of[id(alert)] = self.offset + i
+        self.alerts.extend(alerts)
+        self.size += len(alerts)
+        self.endInsertRows()
+
+        if len(self.alerts) > self.max_rows:
+            self.remove_oldest(len(self.alerts) - self.max_rows)
+
+    def prepend(self, alerts):
+        """在表格开头插入更早的告警（从数据库翻页加载），alerts按时间升序"""
+        if not alerts:
+            return
+        n = len(alerts)
+        self.reserve(self.size + n)
+        self.beginInsertRows(QModelIndex(), 0, n - 1)
+        for name in ('ts', 'types', 'levels'):
+            column = getattr(self, name)
+            column[n:self.size + n] = column[:self.size].copy()
+        self.offset -= n
+        for i, alert in enumerate(alerts):
+            self.ts[i] = alert.get('ts', 0)
+            self.types[i] = self.type_code(alert['type'])
+            self.levels[i] = self.level_code(alert['level'])
+            self.row_of[id(alert)] = self.offset + i
+        self.alerts[:0] = alerts
+        self.size += n
+        self.endInsertRows()
+
+    def remove_oldest(self, n):
+        """删除最旧的n行"""
+        self.beginRemoveRows(QModelIndex(), 0, n - 1)
+        for alert in self.alerts[:n]:
+            self.row_of.pop(id(alert), None)
+        del self.alerts[:n]
+        for name in ('ts', 'types', 'levels'):
+            column = getattr(self, name)
+            column[:self.size - n] = column[n:self.size]
+        self.size -= n
+        self.offset += n
+        self.endRemoveRows()
+
+    def row(self, alert):
+        """告警当前所在行，不在表格中返回None"""
+        position = self.row_of.get(id(alert))
+        return None if position is None else position - self.offset
+
+    def update_alert(self, alert):
+        """告警内容（次数、等级）变化后刷新对应行"""
+        row = self.row(alert)
+        if row is None:
+            return
+        self.levels[row] = self.level_code(alert['level'])
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+
+    def set_alerts(self, alerts):
+        """整体替换表格内容"""
+        self.beginResetModel()
+        self.alerts, self.row_of, self.offset, self.size = [], {}, 0, 0
+        self.reserve(len(alerts))
+        for i, alert in enumerate(alerts):
+            self.ts[i] = alert.get('ts', 0)
+            self.types[i] = self.type_code(alert['type'])
+            self.levels[i] = self.level_code(alert['level'])
+            self.row_of[id(alert)] = i
+        self.alerts = list(alerts)
+        self.size = len(alerts)
+        self.endResetModel()
+
+    def clear(self):
+        self.set_alerts([])
+
+
+class AlertFilterProxy(QAbstractProxyModel):
+    """按类型/等级过滤并排序的代理模型，行映射由NumPy列整体计算"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = np.zeros(0, dtype=np.int64)  # 代理行 -> 源行
+        self.inverse = np.zeros(0, dtype=np.int64)  # 源行 -> 代理行（-1表示被过滤）
+        self.alert_type = None
+        self.level = None
+        self.sort_column = 0
+        self.sort_order = Qt.AscendingOrder
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.rowsInserted.connect(self.on_rows_inserted)
+        model.rowsAboutToBeRemoved.connect(self.on_rows_about_to_be_removed)
+        model.rowsRemoved.connect(self.on_rows_removed)
+        model.modelReset.connect(self.refilter)
+        model.dataChanged.connect(self.on_data_changed)
+        self.refilter()
+
+    def set_filter(self, alert_type=None, level=None):
+        """设置过滤条件，None或'all'表示不过滤"""
+        self.alert_type = None if alert_type == 'all' else alert_type
+        self.level = None if level == 'all' else level
+        self.refilter()
+
+    def mask(self, start=0, stop=None):
+        """源模型[start, stop)行是否通过过滤"""
+        model = self.sourceModel()
+        stop = model.size if stop is None else stop
+        mask = np.ones(stop - start, dtype=bool)
+        if self.alert_type is not None:
+            code = model.type_codes.get(self.alert_type, -1)
+            mask &= model.types[start:stop] == code
+        if self.level is not None:
+            mask &= model.levels[start:stop] == model.level_code(self.level)
+        return mask
+
+    def sort_keys(self, rows):
+        model = self.sourceModel()
+        if self.sort_column == 1:
+            return model.types[rows]
+        if self.sort_column == 4:
+            return model.levels[rows]
+        if self.sort_column == 2:
+            return np.array([model.alerts[r]['location'] for r in rows], dtype=object)
+        return model.ts[rows]
+
+    def refilter(self, *args):
+        """重新计算过滤和排序结果"""
+        self.beginResetModel()
+        rows = np.nonzero(self.mask())[0]
+        if self.sort_column != 0 or self.sort_order != Qt.AscendingOrder:
+            order = np.argsort(self.sort_keys(rows), kind='stable')
+            rows = rows[order[::-1]] if self.sort_order == Qt.DescendingOrder else rows[order]
+        self.rows = rows
+        self.rebuild_inverse()
+        self.endResetModel()
+
+    def rebuild_inverse(self):
+        self.inverse = np.full(self.sourceModel().size, -1, dtype=np.int64)
+        self.inverse[self.rows] = np.arange(len(self.rows))
+
+    def on_rows_inserted(self, parent, first, last):
+        """按时间升序显示时把新增行插入到对应位置（末尾追加或开头翻页），其余排序方式重新排序"""
+        if self.sort_column != 0 or self.sort_order != Qt.AscendingOrder:
+            self.refilter()
+            return
+        n = last + 1 - first
+        new = np.nonzero(self.mask(first, last + 1))[0] + first
+        start = int(np.searchsorted(self.rows, first))  # 升序时代理行与源行同序
+        rows = np.concatenate((self.rows[:start], new, self.rows[start:] + n))
+        if not len(new):
+            self.rows = rows
+            self.rebuild_inverse()
+            return
+        self.beginInsertRows(QModelIndex(), start, start + len(new) - 1)
+        self.rows = rows
+        self.rebuild_inverse()
+        self.endInsertRows()
+
+    def on_rows_about_to_be_removed(self, parent, first, last):
+        """源行删除前移除对应的代理行（按连续区间从后往前通知，不重置模型）"""
+        removed = np.nonzero((self.rows >= first) & (self.rows <= last))[0]
+        if not len(removed):
+            return
+        runs = np.split(removed, np.nonzero(np.diff(removed) != 1)[0] + 1)
+        for run in reversed(runs):
+            self.beginRemoveRows(QModelIndex(), int(run[0]), int(run[-1]))
+            self.rows = np.delete(self.rows, slice(int(run[0]), int(run[-1]) + 1))
+            self.endRemoveRows()
+
+    def on_rows_removed(self, parent, first, last):
+        """源行删除后，后面的源行号前移"""
+        self.rows[self.rows > last] -= last + 1 - first
+        self.rebuild_inverse()
+
+    def position(self, row):
+        """源行row在当前代理行（不含row本身）中应处的位置，与 refilter 的稳定排序结果一致"""
+        rows = self.rows[self.rows != row]
+        if self.sort_column == 0 and self.sort_order == Qt.AscendingOrder:
+            return int(np.searchsorted(rows, row))
+        keys, key = self.sort_keys(rows), self.sort_keys([row])[0]
+        if self.sort_order == Qt.DescendingOrder:
+            return int(np.count_nonzero((keys > key) | ((keys == key) & (rows > row))))
+        return int(np.count_nonzero((keys < key) | ((keys == key) & (rows < row))))
+
+    def on_data_changed(self, top_left, bottom_right, roles=()):
+        """逐行重新判断过滤和排序位置（等级可能变化），只在结果改变时移除、插入或移动该行"""
+        last_column = self.columnCount() - 1
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            proxy_row = int(self.inverse[row])
+            passes = bool(self.mask(row, row + 1)[0])
+            if proxy_row < 0:
+                if passes:
+                    pos = self.position(row)
+                    self.beginInsertRows(QModelIndex(), pos, pos)
+                    self.rows = np.insert(self.rows, pos, row)
+                    self.rebuild_inverse()
+                    self.endInsertRows()
+                continue
+            if not passes:
+                self.beginRemoveRows(QModelIndex(), proxy_row, proxy_row)
+                self.rows = np.delete(self.rows, proxy_row)
+                self.rebuild_inverse()
+                self.endRemoveRows()
+                continue
+            pos = self.position(row)
+            if pos != proxy_row:
+                # Qt的目标行号按移动前计算，向下移动时要加1
+                self.beginMoveRows(QModelIndex(), proxy_row, proxy_row, QModelIndex(),
+                                   pos + 1 if pos > proxy_row else pos)
+                self.rows = np.insert(np.delete(self.rows, proxy_row), pos, row)
+                self.rebuild_inverse()
+                self.endMoveRows()
+            self.dataChanged.emit(self.index(pos, 0), self.index(pos, last_column))
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sort_column = column
+        self.sort_order = order
+        self.refilter()
+
+    # Qt代理模型接口
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self.rows)) or not (0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.sourceModel().columnCount()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(int(self.rows[proxy_index.row()]), proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid() or source_index.row() >= len(self.inverse):
+            return QModelIndex()
+        row = int(self.inverse[source_index.row()])
+        return self.index(row, source_index.column()) if row >= 0 else QModelIndex()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        return self.sourceModel().headerData(section, orientation, role)
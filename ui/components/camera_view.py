@@ -9,7 +9,9 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt5.QtCore import Qt, QTimer, pyqtSlot, pyqtSignal, QSize, QRect, QThread
 from PyQt5.QtGui import QImage, QPixmap, QIcon, QPainter, QPen, QColor, QFont
 import random
+import threading
 import time
+from concurrent.futures import TimeoutError as FutureTimeout
 import torch
 import torch.backends.cudnn as cudnn
 from pathlib import Path
@@ -27,6 +29,13 @@ from utils.datasets import IMG_FORMATS, VID_FORMATS, LoadImages, LoadStreams
 from utils.general import (LOGGER, check_file, check_img_size, check_imshow, check_requirements, colorstr,
                          increment_path, non_max_suppression, print_args, scale_coords, strip_optimizer, xyxy2xywh)
 from utils.plots import Annotator, colors, save_one_box
+from utils.inference_server import InferenceServer
+from utils.backend_select import BackendSelector
+from utils.model_cache import ModelCache
+from utils.motion_gate import MotionScheduler
+from utils.pipeline import DropOldestQueue, PipelineMonitor
+from utils.postprocess import DetectionPostprocessor
+from utils.tracker import Tracker
 from utils.torch_utils import select_device, time_sync
 
 class VideoThread(QThread):
@@ -35,21 +44,37 @@ class VideoThread(QThread):
     update_detections = pyqtSignal(list)
     fire_detected = pyqtSignal(str)  # 修改为发送区域信息的信号
     error_signal = pyqtSignal(str)
+    pipeline_stats = pyqtSignal(dict)  # 各阶段耗时与队列深度
     
-    def __init__(self, source=0):
+    def __init__(self, source=0, load_model=True, model_cache=None, imgsz=640):
+        """
+        参数:
+            source: 视频源
+            load_model (bool): 是否立即加载模型；分阶段启动时由启动编排器在后台加载后再调用 init_model()
+            model_cache (ModelCache, optional): 编译模型缓存
+            imgsz (int): 推理尺寸（配置中的 image_size）
+        """
         super().__init__()
         self.source = source
+        self.model_cache = model_cache
         self.running = False
         self.model = None
+        self.server = None
+        self.source_id = f"camera-{id(self)}"  # 在共享推理服务中的视频源标识
+        self.monitor = None  # 流水线统计
+        self.scheduler = None  # 运动门控推理调度
+        self.motion_threshold = 0.005  # 变化像素占比阈值
+        self.max_infer_interval = 2.0  # 静止画面最长推理间隔（秒）
         self.device = select_device('0' if torch.cuda.is_available() else 'cpu')
         self.half = False
         self.stride = 32
-        self.imgsz = [640, 640]
+        self.imgsz = [imgsz, imgsz]
         self.current_region = "中央林场"  # 添加默认区域
-        self.init_model()
+        if load_model:
+            self.init_model()
         
     def init_model(self):
-        """初始化YOLOv5火焰检测模型"""
+        """获取共享推理服务中的YOLOv5火焰检测模型"""
         try:
             # 获取项目根目录路径
             weights = str(ROOT / 'weights/best.pt')
@@ -59,36 +84,16 @@ class VideoThread(QThread):
                 self.model = None
                 return
                 
-            # 加载模型
-            self.model = DetectMultiBackend(weights, device=self.device)
-            self.stride = self.model.stride
-            self.imgsz = check_img_size(self.imgsz, s=self.stride)  # 检查图片尺寸
+            # 所有视频源共用同一个推理服务，模型只加载一次
+            self.server = InferenceServer.shared(weights, device=self.device, imgsz=self.imgsz,
+                                                 model_cache=self.model_cache)
+            self.model = self.server.model
+            self.stride = self.server.stride
+            self.imgsz = self.server.imgsz
+            self.half = self.server.half
             
             # 打印模型支持的类别
             print("模型支持的类别：", self.model.names)
-            
-            # 设置半精度
-            self.half = self.device.type != 'cpu'  # 仅在GPU上使用半精度
-            if self.half:
-                self.model.half()  # 转换模型为半精度
-            else:
-                self.model.float()  # 使用单精度
-
-            # 确保Detect层有inplace属性
-            for m in self.model.model.modules():
-                if isinstance(m, Detect):
-                    if not hasattr(m, 'inplace'):
-                        m.inplace = True
-            
-            # 预热模型
-            if self.device.type != 'cpu':
-                dummy = torch.zeros(1, 3, *self.imgsz).to(self.device)
-                dummy = dummy.half() if self.half else dummy.float()
-                for _ in range(3):  # 预热3次
-                    with torch.no_grad():
-                        self.model(dummy)  # 预热推理
-                torch.cuda.empty_cache()  # 清理显存
-                
             print(f"火焰检测模型加载成功：{weights}")
             
             # 设置CUDA性能优化
@@ -113,13 +118,12 @@ class VideoThread(QThread):
             self.error_signal.emit("错误：模型未加载")
             return
             
+        decode_queue = infer_queue = None
         try:
             self.running = True
             
             # 初始化参数
-            conf_thres = 0.25  # 置信度阈值
-            iou_thres = 0.45  # NMS IOU阈值
-            max_det = 1000  # 每张图片最大检测数量
+            conf_thres = 0.25  # 置信度阈值（NMS阈值由共享推理服务统一设置）
             line_thickness = 2  # 减小边框线条粗细以提高性能
             hide_labels = False  # 是否隐藏标签
             hide_conf = False  # 是否隐藏置信度
@@ -168,73 +172,78 @@ class VideoThread(QThread):
             self.imgsz = check_img_size(self.imgsz, s=stride)
             
             try:
-                # 设置数据加载器
+                # 设置数据加载器：只读取原始帧（raw），由推理服务直接letterbox进预分配的批次缓冲区
                 if webcam:
                     cudnn.benchmark = True
-                    dataset = LoadStreams(str(source), img_size=self.imgsz[0], stride=stride, auto=pt)
+                    dataset = LoadStreams(str(source), img_size=self.imgsz[0], stride=stride, auto=pt, latest=True,
+                                          raw=True)  # 始终取最新帧
                 else:
-                    dataset = LoadImages(source, img_size=self.imgsz[0], stride=stride, auto=pt)
+                    dataset = LoadImages(source, img_size=self.imgsz[0], stride=stride, auto=pt, raw=True)
             except Exception as e:
                 self.error_signal.emit(f"数据加载失败: {str(e)}")
                 return
                 
-            # 处理每一帧
-            for path, im, im0s, vid_cap, s in dataset:
-                if not self.running:
-                    break
+            post = DetectionPostprocessor(names, conf_thres=conf_thres)
+            trackers = {}  # 视频流索引 -> Tracker
+            self.scheduler = MotionScheduler(threshold=self.motion_threshold, max_interval=self.max_infer_interval)
+            
+            # 三级流水线：解码线程 -> 推理线程 -> 渲染/发送（本线程），解码第N+1帧与推理第N帧重叠
+            decode_queue = DropOldestQueue(maxsize=2)
+            infer_queue = DropOldestQueue(maxsize=2)
+            self.monitor = PipelineMonitor(['decode', 'infer', 'render'],
+                                           {'decode': decode_queue, 'infer': infer_queue})
+            live = webcam  # 实时流丢弃旧帧，本地文件逐帧处理
+            decoder = threading.Thread(target=self.decode_loop, args=(dataset, decode_queue, live), daemon=True)
+            worker = threading.Thread(target=self.infer_loop, args=(decode_queue, infer_queue, live), daemon=True)
+            decoder.start()
+            worker.start()
+            
+            last_report = time.time()
+            while self.running:
+                item = infer_queue.get(timeout=0.1)
+                if item is None:
+                    if infer_queue.finished():
+                        break
+                    continue
                     
+                start = time.time()
+                im0s, pred, s = item
                 try:
-                    # 预处理图像
-                    im = torch.from_numpy(im).to(self.device)
-                    im = im.half() if self.half else im.float()
-                    im /= 255
-                    if len(im.shape) == 3:
-                        im = im[None]
-                        
-                    # 推理
-                    with torch.no_grad():
-                        pred = self.model(im, augment=False)  # 禁用数据增强以提高速度
-                        if isinstance(pred, (list, tuple)):
-                            pred = pred[0]
-                    
-                    # NMS
-                    pred = non_max_suppression(pred, conf_thres, iou_thres, None, False, max_det=max_det)
-                    
-                    # 处理检测结果
+                    # 处理检测结果（坐标已由推理服务还原到原图尺寸），跳过推理的帧(None)沿用轨迹预测位置
                     for i, det in enumerate(pred):
-                        if webcam:
-                            im0 = im0s[i].copy()
-                        else:
-                            im0 = im0s.copy()
+                        im0 = im0s[i].copy()
                             
-                        s += '%gx%g ' % im.shape[2:]
+                        s += '%gx%g ' % tuple(self.imgsz)
                         annotator = Annotator(im0, line_width=line_thickness, example=str(names))
+                        tracker = trackers.get(i)
+                        if tracker is None:
+                            tracker = trackers[i] = Tracker()
                         
-                        if len(det):
-                            # 将边界框从img_size缩放到im0大小
-                            det[:, :4] = scale_coords(im.shape[2:], det[:, :4], im0.shape).round()
-                            
-                            detections = []
-                            fire_detected = False
-                            
-                            for c in det[:, -1].unique():
-                                n = (det[:, -1] == c).sum()
-                                s += f"{n} {names[int(c)]}{'s' * (n > 1)}, "
-                            
-                            for *xyxy, conf, cls in reversed(det):
-                                c = int(cls)
-                                if conf > conf_thres:  # 如果置信度大于阈值
-                                    label = None if hide_labels else (
-                                        names[c] if hide_conf else f'{names[c]} {conf:.2f}'
-                                    )
-                                    annotator.box_label(xyxy, label, color=colors(c, True))
-                                    
-                                    # 如果检测到火焰，发送信号
-                                    if names[c].lower() == 'fire' and conf > 0.5:  # 提高火焰检测的置信度阈值
-                                        print(f"检测到火焰！类别：{names[c]}，置信度：{conf:.2f}")  # 添加调试输出
-                                        self.fire_detected.emit(self.current_region)  # 发送当前区域信息
-                            
-                            self.update_detections.emit(detections)
+                        if det is None:
+                            tracks, events = tracker.predict(), []
+                        else:
+                            # 计数、阈值和火焰筛选在设备上一次完成
+                            result = post.process(det)
+                            s += result['summary']
+                            tracks, events = tracker.update(result['boxes'])
+                            self.update_detections.emit([
+                                {'track_id': int(t), 'class': int(c), 'label': names[int(c)], 'confidence': p,
+                                 'bbox': [int(x1), int(y1), int(x2), int(y2)]}
+                                for x1, y1, x2, y2, p, c, t in tracks.tolist()])
+                        
+                        for x1, y1, x2, y2, conf, c, t in tracks.tolist():
+                            c = int(c)
+                            label = None if hide_labels else (
+                                f'{names[c]} #{int(t)}' if hide_conf else f'{names[c]} #{int(t)} {conf:.2f}'
+                            )
+                            annotator.box_label((x1, y1, x2, y2), label, color=colors(c, True))
+                        
+                        # 只在火焰轨迹新出现或置信度升级时发送信号
+                        fire_events = [e for e in events if post.is_fire(e['class']) and e['confidence'] > post.fire_thres]
+                        if fire_events:
+                            print(f"检测到火焰！轨迹：{[e['id'] for e in fire_events]}，"
+                                  f"置信度：{max(e['confidence'] for e in fire_events):.2f}")  # 添加调试输出
+                            self.fire_detected.emit(self.current_region)  # 发送当前区域信息
                         
                         im0 = annotator.result()
                         self.update_frame.emit(im0)
@@ -243,9 +252,16 @@ class VideoThread(QThread):
                     print(f"处理帧时出错: {str(e)}")
                     import traceback
                     traceback.print_exc()
-                    continue
+                self.monitor.record('render', start)
                 
-                self.msleep(10)  # 减小延迟时间，提高帧率
+                # 每秒上报一次各阶段耗时和队列深度
+                if time.time() - last_report >= 1.0:
+                    stats = self.monitor.snapshot()
+                    if webcam:
+                        stats['streams'] = dataset.stats()  # 摄像头侧的丢帧/重复帧/过期帧计数
+                    stats['motion'] = self.scheduler.stats()  # 各路跳过推理的比例
+                    self.pipeline_stats.emit(stats)
+                    last_report = time.time()
                 
         except Exception as e:
             print(f"视频处理线程出错: {str(e)}")
@@ -255,6 +271,74 @@ class VideoThread(QThread):
             
         finally:
             self.running = False
+            # 关闭队列，唤醒可能阻塞的解码/推理线程
+            if decode_queue is not None:
+                decode_queue.close()
+                infer_queue.close()
+                decoder.join(timeout=1)
+                worker.join(timeout=1)
+            if self.server is not None:
+                self.server.unregister(self.source_id)
+    
+    def decode_loop(self, dataset, out_queue, live):
+        """解码阶段：读取原始视频帧（letterbox由推理服务完成）"""
+        try:
+            frames = iter(dataset)
+            while self.running:
+                start = time.time()
+                try:
+                    path, _, im0s, vid_cap, s = next(frames)
+                except StopIteration:
+                    break
+                if not isinstance(im0s, list):
+                    im0s = [im0s]
+                self.monitor.record('decode', start)
+                if not out_queue.put((im0s, s), block=not live):
+                    break
+        except Exception as e:
+            print(f"解码线程出错: {str(e)}")
+        finally:
+            out_queue.close()
+    
+    def infer_loop(self, in_queue, out_queue, live):
+        """推理阶段：按运动门控决定是否推理，需要推理的帧提交到共享推理服务组批"""
+        inferred = set()  # 已推理过的视频流索引，每路首帧必须推理
+        try:
+            while self.running:
+                item = in_queue.get(timeout=0.1)
+                if item is None:
+                    if in_queue.finished():
+                        break
+                    continue
+                start = time.time()
+                im0s, s = item
+                # 静止画面跳过推理，由渲染阶段的跟踪器延续检测框；
+                # 原始帧由推理线程直接letterbox进预分配缓冲区，不在这里逐帧letterbox、stack和拷贝
+                try:
+                    futures = [self.server.submit_frame(self.source_id, im0)
+                               if self.scheduler.should_infer(i, im0) or i not in inferred else None
+                               for i, im0 in enumerate(im0s)]
+                    pred = [f.result(InferenceServer.RESULT_TIMEOUT) if f is not None else None
+                            for f in futures]  # None表示本帧跳过推理
+                except FutureTimeout:
+                    print("推理超时，丢弃该帧")
+                    continue
+                except Exception as e:
+                    # 单个批次失败（如显存不足）只丢弃该帧；推理服务已停止时结束视频流并通知界面
+                    if not self.server.running:
+                        self.error_signal.emit(f"推理服务已停止: {str(e)}")
+                        break
+                    print(f"推理失败，丢弃该帧: {str(e)}")
+                    continue
+                inferred.update(i for i, f in enumerate(futures) if f is not None)
+                self.monitor.record('infer', start)
+                if not out_queue.put((im0s, pred, s), block=not live):
+                    break
+        except Exception as e:
+            print(f"推理线程出错: {str(e)}")
+            self.error_signal.emit(f"推理线程出错: {str(e)}")
+        finally:
+            out_queue.close()
         
     def draw_box(self, img, xyxy, label):
         """在图像上绘制边界框和标签"""
@@ -387,7 +471,7 @@ class CameraView(QWidget):
     
     fire_detected = pyqtSignal(str)  # 修改为发送区域信息的信号
     
-    def __init__(self, config=None):
+    def __init__(self, config=None, load_model=True):
         super().__init__()
         self.config = config
         self.detection_results = []
@@ -406,11 +490,15 @@ class CameraView(QWidget):
             self.device = select_device('cpu')
         
         # 创建视频处理线程
-        self.video_thread = VideoThread(self.current_source)
+        self.video_thread = VideoThread(self.current_source, load_model=load_model,
+                                        model_cache=BackendSelector.from_config(config) or
+                                        ModelCache.from_config(config),
+                                        imgsz=config.get('image_size', 640))
         self.video_thread.update_frame.connect(self.update_frame)
         self.video_thread.update_detections.connect(self.update_detections)
         self.video_thread.fire_detected.connect(self.on_fire_detected)
         self.video_thread.error_signal.connect(self.on_error)
+        self.video_thread.pipeline_stats.connect(self.update_pipeline_stats)
         
         # 创建结果保存目录
         self.results_dir = str(ROOT / 'results')
@@ -516,6 +604,11 @@ class CameraView(QWidget):
         self.detection_results = detections
         self.detection_label.setText(f"检测结果: {len(detections)}")
         
+    def update_pipeline_stats(self, stats):
+        """显示流水线各阶段耗时和队列深度（鼠标悬停FPS查看）"""
+        self.pipeline_info = stats
+        self.fps_label.setToolTip(PipelineMonitor.format(stats))
+        
     def update_timestamp(self):
         """更新时间戳"""
         self.timestamp_label.setText(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
@@ -1,4 +1,5 @@
 import os
+import time
 import cv2
 import numpy as np
 import random
@@ -6,18 +7,28 @@ from datetime import datetime
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                             QPushButton, QComboBox, QToolBar, QAction, 
                             QGridLayout, QFrame, QSplitter, QFileDialog,
-                            QTableWidget, QTableWidgetItem, QHeaderView,
+                            QTableView, QHeaderView,
                             QAbstractItemView, QGroupBox, QTabWidget)
 from PyQt5.QtCore import Qt, QTimer, pyqtSlot, pyqtSignal, QSize, QRect, QThread
 from PyQt5.QtGui import QImage, QPixmap, QIcon, QPainter, QPen, QColor, QFont, QBrush
+from utils.inference_server import InferenceServer
+from utils.postprocess import DetectionPostprocessor
+from ui.components.drone_table_model import DroneTableModel
 
 class DroneSimulator(QThread):
     """无人机模拟器，用于模拟无人机状态和视频流"""
-    update_frame = pyqtSignal(int, np.ndarray)  # 发送无人机ID和视频帧
+    frame_ready = pyqtSignal(int, QImage)  # 发送无人机ID和缩放好的预览画面
     update_status = pyqtSignal(int, dict)  # 发送无人机ID和状态信息
     update_detection = pyqtSignal(int, list)  # 发送无人机ID和检测结果
     
-    def __init__(self, drone_id, drone_type="DJI Mavic Air 2"):
+    def __init__(self, drone_id, drone_type="DJI Mavic Air 2", preview_fps=15, target_size=(640, 480)):
+        """
+        参数:
+            drone_id (int): 无人机ID
+            drone_type (str): 无人机型号
+            preview_fps (float): 预览画面的最高帧率
+            target_size (tuple): 预览画面的最大尺寸 (宽, 高)
+        """
         super().__init__()
         self.drone_id = drone_id
         self.drone_type = drone_type
@@ -43,6 +54,18 @@ class DroneSimulator(QThread):
         # 初始化帧计数
         self.frame_count = 0
         
+        # 预览画面在本线程中限速、缩放并转换成QImage，GUI线程只负责贴图
+        self.preview_interval = 1.0 / max(preview_fps, 1)
+        self.last_preview = 0
+        self.target_size = target_size
+        self.visible = True  # 标签页不可见时不生成预览
+        self.pending = False  # 上一帧预览尚未被GUI显示时不生成新的，最多一帧在途
+        
+        # 共享推理服务（由摄像头视图创建），未启动时使用模拟检测
+        self.inference_server = None
+        self.postprocessor = None  # 检测结果后处理，随推理服务一起创建
+        self.source_id = f"drone-{drone_id}"
+        
     def run(self):
         """运行无人机模拟器"""
         self.running = True
@@ -67,8 +90,8 @@ class DroneSimulator(QThread):
                 # 更新无人机状态
                 self.update_drone_status()
                 
-                # 发送帧和状态
-                self.update_frame.emit(self.drone_id, frame)
+                # 发送预览和状态
+                self.emit_preview(frame)
                 self.update_status.emit(self.drone_id, self.get_status())
                 
                 # 控制帧率
@@ -81,13 +104,10 @@ class DroneSimulator(QThread):
                     cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
                     continue
                 
-                # 添加无人机信息叠加层
-                frame = self.add_drone_info(frame)
-                
                 # 每隔一段时间生成模拟检测结果
                 self.frame_count += 1
                 if self.frame_count % 30 == 0:  # 每30帧生成一次检测结果
-                    detections = self.generate_mock_detection(frame)
+                    detections = self.detect_frame(frame)
                     self.update_detection.emit(self.drone_id, detections)
                     # 将检测结果绘制在画面上
                     frame = self.draw_detections(frame, detections)
@@ -95,8 +115,9 @@ class DroneSimulator(QThread):
                 # 更新无人机状态
                 self.update_drone_status()
                 
-                # 发送帧和状态
-                self.update_frame.emit(self.drone_id, frame)
+                # 发送预览（只在需要显示时添加信息叠加层）和状态
+                if self.preview_due():
+                    self.emit_preview(self.add_drone_info(frame))
                 self.update_status.emit(self.drone_id, self.get_status())
                 
                 # 控制帧率
@@ -104,10 +125,54 @@ class DroneSimulator(QThread):
             
             cap.release()
     
+    def preview_due(self):
+        """是否需要生成新的预览：可见、上一帧已显示、且距上一帧超过帧间隔"""
+        return self.visible and not self.pending and time.time() - self.last_preview >= self.preview_interval
+    
+    def emit_preview(self, frame):
+        """按目标尺寸等比缩放并转换成QImage后发送（代替GUI线程中的rgbSwapped和SmoothTransformation）"""
+        if not self.preview_due():
+            return
+        self.last_preview = time.time()
+        h, w = frame.shape[:2]
+        r = min(self.target_size[0] / w, self.target_size[1] / h)
+        size = max(int(w * r), 1), max(int(h * r), 1)
+        preview = cv2.resize(frame, size, interpolation=cv2.INTER_AREA if r < 1 else cv2.INTER_LINEAR)
+        preview = cv2.cvtColor(preview, cv2.COLOR_BGR2RGB)
+        height, width, _ = preview.shape
+        image = QImage(preview.data, width, height, 3 * width, QImage.Format_RGB888).copy()  # 拷贝后脱离numpy内存
+        self.pending = True
+        self.frame_ready.emit(self.drone_id, image)
+    
     def stop(self):
         """停止无人机模拟器"""
         self.running = False
         self.wait()
+        if self.inference_server is not None:
+            self.inference_server.unregister(self.source_id)
+    
+    def detect_frame(self, frame):
+        """检测一帧：优先提交到共享推理服务，服务不可用时回退到模拟检测"""
+        if self.inference_server is None:
+            self.inference_server = InferenceServer.current()
+        if self.inference_server is None:
+            return self.generate_mock_detection(frame)
+        
+        try:
+            det = self.inference_server.submit_frame(self.source_id, frame).result(InferenceServer.RESULT_TIMEOUT)
+        except Exception as e:
+            print(f"无人机 #{self.drone_id} 推理失败: {str(e)}")
+            self.inference_server = None
+            self.postprocessor = None
+            return self.generate_mock_detection(frame)
+        
+        if self.postprocessor is None:
+            self.postprocessor = DetectionPostprocessor(self.inference_server.names, conf_thres=0)
+        detections = self.postprocessor.process(det)['detections']
+        for d in detections:
+            label = d['label'].lower()
+            d['task'] = 'fire' if label in ('fire', 'smoke') else label
+        return detections
     
     def update_drone_status(self):
         """更新无人机状态"""
@@ -277,9 +342,18 @@ class DroneSimulator(QThread):
 class DroneManager(QWidget):
     """无人机管理组件，用于管理多个无人机，显示视频流和状态"""
     
-    def __init__(self, config):
+    drone_status_changed = pyqtSignal(int, dict)  # 无人机ID和最新状态（用于地图标注）
+    drone_removed = pyqtSignal(int)  # 被移除的无人机ID
+    
+    def __init__(self, config, auto_start=True):
+        """
+        参数:
+            config (dict): 配置
+            auto_start (bool): 是否自动添加初始无人机；分阶段启动时由启动编排器调用 add_initial_drones()
+        """
         super().__init__()
         self.config = config
+        self.auto_start = auto_start
         self.drones = {}  # 存储无人机模拟器，key为无人机ID
         self.drone_frames = {}  # 存储无人机视频帧
         self.drone_status = {}  # 存储无人机状态
@@ -341,16 +415,17 @@ class DroneManager(QWidget):
         self.tab_widget = QTabWidget()
         self.tab_widget.setTabPosition(QTabWidget.North)
         self.tab_widget.setStyleSheet("QTabWidget::pane { border: 0; } QTabBar::tab { background-color: #102040; color: white; padding: 6px 12px; margin-right: 2px; } QTabBar::tab:selected { background-color: #1a3a5a; }")
+        self.tab_widget.currentChanged.connect(self.update_preview_visibility)
         splitter.addWidget(self.tab_widget)
         
         # 创建无人机控制面板
         control_panel = QWidget()
         control_layout = QVBoxLayout(control_panel)
         
-        # 添加无人机状态表格
-        self.status_table = QTableWidget()
-        self.status_table.setColumnCount(9)
-        self.status_table.setHorizontalHeaderLabels(["ID", "类型", "电池", "高度", "速度", "经度", "纬度", "信号", "状态"])
+        # 添加无人机状态表格：模型按无人机ID保存各行，每帧只刷新变化的单元格
+        self.status_model = DroneTableModel(self)
+        self.status_table = QTableView()
+        self.status_table.setModel(self.status_model)
         self.status_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.status_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.status_table.setSelectionBehavior(QAbstractItemView.SelectRows)
@@ -392,7 +467,8 @@ class DroneManager(QWidget):
         splitter.setSizes([int(self.height() * 0.7), int(self.height() * 0.3)])
         
         # 添加一些初始无人机
-        QTimer.singleShot(500, self.add_initial_drones)
+        if self.auto_start:
+            QTimer.singleShot(500, self.add_initial_drones)
     
     def add_initial_drones(self):
         """添加初始无人机"""
@@ -406,8 +482,8 @@ class DroneManager(QWidget):
         drone_type = self.drone_type_combo.currentText()
         
         # 创建无人机模拟器
-        drone = DroneSimulator(drone_id, drone_type)
-        drone.update_frame.connect(self.update_drone_frame)
+        drone = DroneSimulator(drone_id, drone_type, preview_fps=self.config.get('drone_preview_fps', 15))
+        drone.frame_ready.connect(self.update_drone_frame)
         drone.update_status.connect(self.update_drone_status)
         drone.update_detection.connect(self.update_drone_detection)
         drone.start()
@@ -435,6 +511,7 @@ class DroneManager(QWidget):
         
         # 初始化视频帧
         self.drone_frames[drone_id] = frame_label
+        self.update_preview_visibility()
         
         # 更新状态表格
         self.update_status_table()
@@ -459,10 +536,12 @@ class DroneManager(QWidget):
             # 移除状态
             if drone_id in self.drone_status:
                 del self.drone_status[drone_id]
+            self.status_model.remove_drone(drone_id)
             
             # 移除检测结果
             if drone_id in self.drone_detections:
                 del self.drone_detections[drone_id]
+            self.drone_removed.emit(drone_id)
             
             # 移除标签页
             self.tab_widget.removeTab(current_index)
@@ -470,23 +549,37 @@ class DroneManager(QWidget):
             # 更新状态表格
             self.update_status_table()
     
-    def update_drone_frame(self, drone_id, frame):
-        """更新无人机视频帧"""
-        if drone_id in self.drone_frames:
-            # 转换为QImage并显示
-            height, width, channels = frame.shape
-            bytes_per_line = channels * width
-            q_image = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888).rgbSwapped()
-            self.drone_frames[drone_id].setPixmap(QPixmap.fromImage(q_image).scaled(
-                self.drone_frames[drone_id].width(), 
-                self.drone_frames[drone_id].height(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            ))
+    def update_drone_frame(self, drone_id, image):
+        """显示无人机线程送来的预览画面（已缩放、已转换颜色）"""
+        drone = self.drones.get(drone_id)
+        label = self.drone_frames.get(drone_id)
+        if drone is None or label is None:
+            return
+        label.setPixmap(QPixmap.fromImage(image))
+        drone.target_size = (label.width(), label.height())
+        drone.pending = False
+    
+    def update_preview_visibility(self, *args):
+        """只为当前显示的无人机标签页生成预览画面"""
+        current = self.tab_widget.currentWidget()
+        shown = self.isVisible()
+        for drone_id, drone in self.drones.items():
+            label = self.drone_frames.get(drone_id)
+            drone.visible = shown and label is not None and label.parentWidget() is current
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_preview_visibility()
+    
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_preview_visibility()
     
     def update_drone_status(self, drone_id, status):
         """更新无人机状态"""
         self.drone_status[drone_id] = status
+        self.status_model.update_status(drone_id, status)
+        self.drone_status_changed.emit(drone_id, status)
     
     def update_drone_detection(self, drone_id, detections):
         """更新无人机检测结果"""
@@ -499,11 +592,14 @@ class DroneManager(QWidget):
                 alert = {
                     'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                     'type': det['task'],
+                    'source': f"drone-{drone_id}",
                     'location': f"无人机 #{drone_id} 位置",
                     'detail': f"检测到{det['label']}，置信度: {det['confidence']:.2f}",
-                    'level': 'high' if det['confidence'] > 0.85 else 'medium'
+                    'level': 'high' if det['confidence'] > 0.85 else 'medium',
+                    'bbox': det.get('bbox'),
+                    'gps': dict(self.drone_status.get(drone_id, {}).get('gps') or {})
                 }
-                # 向告警面板添加告警
+                # 向告警面板添加告警，同一无人机同一位置的重复检测会合并
                 self.parent().alert_panel.add_alert(alert)
     
     def update_drone_display(self):
@@ -511,59 +607,14 @@ class DroneManager(QWidget):
         self.update_status_table()
     
     def update_status_table(self):
-        """更新状态表格"""
-        self.status_table.setRowCount(0)
-        
-        for drone_id, status in self.drone_status.items():
-            row = self.status_table.rowCount()
-            self.status_table.insertRow(row)
-            
-            # 设置ID
-            self.status_table.setItem(row, 0, QTableWidgetItem(str(drone_id)))
-            
-            # 设置类型
-            self.status_table.setItem(row, 1, QTableWidgetItem(status['type']))
-            
-            # 设置电池
-            battery_item = QTableWidgetItem(f"{int(status['battery'])}%")
-            if status['battery'] > 30:
-                battery_item.setForeground(QBrush(QColor(0, 255, 0)))
-            elif status['battery'] > 15:
-                battery_item.setForeground(QBrush(QColor(255, 165, 0)))
-            else:
-                battery_item.setForeground(QBrush(QColor(255, 0, 0)))
-            self.status_table.setItem(row, 2, battery_item)
-            
-            # 设置高度
-            self.status_table.setItem(row, 3, QTableWidgetItem(f"{int(status['altitude'])}m"))
-            
-            # 设置速度
-            self.status_table.setItem(row, 4, QTableWidgetItem(f"{status['speed']:.1f}m/s"))
-            
-            # 设置经度
-            self.status_table.setItem(row, 5, QTableWidgetItem(f"{status['gps']['lng']:.6f}"))
-            
-            # 设置纬度
-            self.status_table.setItem(row, 6, QTableWidgetItem(f"{status['gps']['lat']:.6f}"))
-            
-            # 设置信号
-            signal_item = QTableWidgetItem(f"{int(status['signal'])}%")
-            if status['signal'] > 80:
-                signal_item.setForeground(QBrush(QColor(0, 255, 0)))
-            elif status['signal'] > 60:
-                signal_item.setForeground(QBrush(QColor(255, 165, 0)))
-            else:
-                signal_item.setForeground(QBrush(QColor(255, 0, 0)))
-            self.status_table.setItem(row, 7, signal_item)
-            
-            # 设置状态
-            self.status_table.setItem(row, 8, QTableWidgetItem(status['status']))
+        """把本帧积累的状态变化刷新到状态表格（只更新变化的单元格）"""
+        self.status_model.flush()
     
     def takeoff_drone(self):
         """起飞选中的无人机"""
         selected_rows = self.status_table.selectionModel().selectedRows()
         for index in selected_rows:
-            drone_id = int(self.status_table.item(index.row(), 0).text())
+            drone_id = self.status_model.drone_id(index.row())
             if drone_id in self.drones:
                 self.drones[drone_id].status = "已起飞"
     
@@ -571,7 +622,7 @@ class DroneManager(QWidget):
         """降落选中的无人机"""
         selected_rows = self.status_table.selectionModel().selectedRows()
         for index in selected_rows:
-            drone_id = int(self.status_table.item(index.row(), 0).text())
+            drone_id = self.status_model.drone_id(index.row())
             if drone_id in self.drones:
                 self.drones[drone_id].status = "正在降落"
     
@@ -579,7 +630,7 @@ class DroneManager(QWidget):
         """返航选中的无人机"""
         selected_rows = self.status_table.selectionModel().selectedRows()
         for index in selected_rows:
-            drone_id = int(self.status_table.item(index.row(), 0).text())
+            drone_id = self.status_model.drone_id(index.row())
             if drone_id in self.drones:
                 self.drones[drone_id].status = "返航中"
     
@@ -587,7 +638,7 @@ class DroneManager(QWidget):
         """紧急停止选中的无人机"""
         selected_rows = self.status_table.selectionModel().selectedRows()
         for index in selected_rows:
-            drone_id = int(self.status_table.item(index.row(), 0).text())
+            drone_id = self.status_model.drone_id(index.row())
             if drone_id in self.drones:
                 self.drones[drone_id].status = "紧急停止"
     
@@ -0,0 +1,179 @@
+"""
+无人机状态表格模型
+
+每架无人机占一行，按 drone_id 定位。状态更新只记录到待刷新字典（同一无人机保留最新状态），
+每帧 flush() 一次：把状态格式化成单元格文本后与上次显示的内容逐格比较，
+只对变化的单元格发出一次合并的 dataChanged，不再清空表格、重建全部单元格。
+"""
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QBrush, QColor
+
+
+class DroneTableModel(QAbstractTableModel):
+    """无人机状态表格模型"""
+
+    HEADERS = ["ID", "类型", "电池", "高度", "速度", "经度", "纬度", "信号", "状态"]
+    BATTERY, SIGNAL = 2, 7  # 按数值着色的列
+    COLORS = {'good': QColor(0, 255, 0), 'warn': QColor(255, 165, 0), 'bad': QColor(255, 0, 0)}
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.drone_ids = []  # 行 -> 无人机ID
+        self.row_of = {}  # 无人机ID -> 行
+        self.cells = []  # 行 -> 单元格文本列表
+        self.levels = []  # 行 -> (电池颜色, 信号颜色)
+        self.pending = {}  # 本帧待刷新的状态：无人机ID -> 最新状态
+        self.brushes = {key: QBrush(color) for key, color in self.COLORS.items()}
+        self.changed_cells = 0  # 累计变化的单元格数
+
+    @staticmethod
+    def format_status(drone_id, status):
+        """状态 -> 单元格文本"""
+        gps = status['gps']
+        return [str(drone_id), status['type'], f"{int(status['battery'])}%", f"{int(status['altitude'])}m",
+                f"{status['speed']:.1f}m/s", f"{gps['lng']:.6f}", f"{gps['lat']:.6f}",
+                f"{int(status['signal'])}%", status['status']]
+
+    @staticmethod
+    def status_levels(status):
+        battery, signal = status['battery'], status['signal']
+        battery_level = 'good' if battery > 30 else 'warn' if battery > 15 else 'bad'
+        signal_level = 'good' if signal > 80 else 'warn' if signal > 60 else 'bad'
+        return battery_level, signal_level
+
+    # Qt模型接口
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.drone_ids)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role == Qt.DisplayRole:
+            return self.cells[row][column]
+        if role == Qt.ForegroundRole:
+            if column == self.BATTERY:
+                return self.brushes[self.levels[row][0]]
+            if column == self.SIGNAL:
+                return self.brushes[self.levels[row][1]]
+        return None
+
+    # 数据操作
+    def update_status(self, drone_id, status):
+        """记录无人机的最新状态，在下一次 flush() 时统一刷新"""
+        self.pending[drone_id] = status
+
+    def flush(self):
+        """
+        把本帧积累的状态写入表格：新无人机整批插入，已有无人机只通知变化的单元格
+
+        返回:
+            int: 本次变化的单元格数
+        """
+        if not self.pending:
+            return 0
+        pending, self.pending = self.pending, {}
+
+        new_ids = [drone_id for drone_id in pending if drone_id not in self.row_of]
+        if new_ids:
+            first = len(self.drone_ids)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_ids) - 1)
+            for drone_id in new_ids:
+                status = pending.pop(drone_id)
+                self.row_of[drone_id] = len(self.drone_ids)
+                self.drone_ids.append(drone_id)
+                self.cells.append(self.format_status(drone_id, status))
+                self.levels.append(self.status_levels(status))
+            self.endInsertRows()
+
+        # 逐格比较，记录变化单元格的行列范围，合并成一次 dataChanged
+        top = left = None
+        bottom = right = -1
+        changed = 0
+        for drone_id, status in pending.items():
+            row = self.row_of[drone_id]
+            old = self.cells[row]
+            new = self.format_status(drone_id, status)
+            levels = self.status_levels(status)
+            columns = [c for c in range(len(new)) if new[c] != old[c]]
+            if levels != self.levels[row]:
+                columns += [c for c, (a, b) in zip((self.BATTERY, self.SIGNAL), zip(levels, self.levels[row]))
+                            if a != b]
+                self.levels[row] = levels
+            if not columns:
+                continue
+            self.cells[row] = new
+            changed += len(columns)
+            top = row if top is None else min(top, row)
+            bottom = max(bottom, row)
+            left = min(columns) if left is None else min(left, min(columns))
+            right = max(right, max(columns))
+        if changed:
+            self.changed_cells += changed
+            self.dataChanged.emit(self.index(top, left), self.index(bottom, right),
+                                  [Qt.DisplayRole, Qt.ForegroundRole])
+        return changed
+
+    def remove_drone(self, drone_id):
+        """删除无人机所在行"""
+        self.pending.pop(drone_id, None)
+        row = self.row_of.pop(drone_id, None)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.drone_ids[row], self.cells[row], self.levels[row]
+        for i in range(row, len(self.drone_ids)):
+            self.row_of[self.drone_ids[i]] = i
+        self.endRemoveRows()
+
+    def drone_id(self, row):
+        """行号 -> 无人机ID"""
+        return self.drone_ids[row]
+
+
+# 测试代码
+if __name__ == "__main__":
+    import random
+    import time
+    from PyQt5.QtCore import QCoreApplication
+
+    app = QCoreApplication([])
+    model = DroneTableModel()
+    notifications = []
+    model.dataChanged.connect(lambda *args: notifications.append(args))
+
+    def make_status(i):
+        return {'type': "DJI Mavic Air 2", 'battery': 100 - i % 90, 'altitude': 120, 'speed': random.uniform(0, 8),
+                'gps': {'lat': 39.9 + i * 1e-3, 'lng': 116.3 + i * 1e-3}, 'signal': 95, 'status': "待命"}
+
+    statuses = {i: make_status(i) for i in range(1, 201)}
+    for i, status in statuses.items():
+        model.update_status(i, status)
+    model.flush()
+    print(f"添加 {model.rowCount()} 架无人机")
+
+    # 每帧每架无人机收到两次状态（20Hz状态、10Hz刷新），只有速度和少量位置变化
+    t0 = time.time()
+    frames = 50
+    for _ in range(frames):
+        for _ in range(2):
+            for i, status in statuses.items():
+                status = dict(status, speed=random.uniform(0, 8), gps=dict(status['gps']))
+                if random.random() < 0.1:
+                    status['gps']['lat'] += 1e-5
+                statuses[i] = status
+                model.update_status(i, status)
+        model.flush()
+    print(f"{frames} 帧: 平均 {(time.time() - t0) * 1000 / frames:.2f} ms/帧, "
+          f"变化单元格 {model.changed_cells / frames:.0f}/帧, dataChanged {len(notifications)} 次")
+
+    model.remove_drone(100)
+    print(f"删除后 {model.rowCount()} 行, 第100行为无人机 {model.drone_id(99)}")
@@ -1,10 +1,14 @@
 from PyQt5.QtWidgets import (QWidget, QGridLayout, QLabel, QPushButton, 
                             QVBoxLayout, QHBoxLayout, QComboBox, QMenu)
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QSize
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QSize, QThread
 from PyQt5.QtGui import QImage, QPixmap, QIcon
 import cv2
 import numpy as np
 import base64
+import time
+from utils.fire_screen import FireScreen
+from utils.inference_server import InferenceServer
+from utils.postprocess import DetectionPostprocessor
 from ..assets.icons import GRID_ICON, SINGLE_ICON, REFRESH_ICON
 
 def create_icon_from_base64(base64_str):
@@ -16,15 +20,11 @@ def create_icon_from_base64(base64_str):
 class CameraGridCell(QLabel):
     """单个摄像头格子组件"""
     clicked = pyqtSignal(int)  # 点击信号，传递格子索引
-    fire_detected = pyqtSignal(str)  # 火灾检测信号
-    animal_detected = pyqtSignal(object, str, float)  # 动物检测信号
     
     def __init__(self, index, parent=None):
         super().__init__(parent)
         self.index = index
         self.active = False
-        self.last_fire_check = 0  # 上次火情检查时间
-        self.fire_check_interval = 1.0  # 火情检查间隔（秒）
         self.setAlignment(Qt.AlignCenter)
         self.setMinimumSize(320, 240)
         self.setStyleSheet("""
@@ -45,75 +45,17 @@ class CameraGridCell(QLabel):
         super().mousePressEvent(event)
         
     def setImage(self, image, camera_info=None):
-        """设置图像并进行灾害检测"""
-        if isinstance(image, np.ndarray):
-            # 保存原始图像用于显示
-            display_image = image.copy()
-            
-            # 进行火灾检测
-            current_time = cv2.getTickCount() / cv2.getTickFrequency()
-            if current_time - self.last_fire_check >= self.fire_check_interval:
-                self.last_fire_check = current_time
-                
-                # 火灾检测
-                if self.detect_fire(image):
-                    region = camera_info['name'] if camera_info else f"摄像头 {self.index + 1}"
-                    self.fire_detected.emit(region)
-                    # 在图像上标注火灾警告
-                    cv2.putText(display_image, "火灾警告!", (10, 30),
-                              cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                
-                # 动物检测
-                animal_result = self.detect_animal(image)
-                if animal_result:
-                    species, confidence = animal_result
-                    self.animal_detected.emit(image, species, confidence)
-                    # 在图像上标注动物信息
-                    cv2.putText(display_image, f"{species} ({confidence:.2f}%)", (10, 60),
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            
-            # 转换BGR到RGB并显示
-            display_image = cv2.cvtColor(display_image, cv2.COLOR_BGR2RGB)
-            height, width, channel = display_image.shape
-            bytesPerLine = 3 * width
-            qImg = QImage(display_image.data, width, height, bytesPerLine, QImage.Format_RGB888)
-            self.setPixmap(QPixmap.fromImage(qImg).scaled(
-                self.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
-            self.active = True
-        else:
-            self.setText("摄像头未连接")
-            self.active = False
-            
-    def detect_fire(self, image):
-        """检测火灾
-        使用简单的颜色阈值方法检测火焰
-        """
-        try:
-            # 转换到HSV颜色空间
-            hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-            
-            # 定义火焰的颜色范围（红色和橙色）
-            lower_red1 = np.array([0, 120, 70])
-            upper_red1 = np.array([10, 255, 255])
-            lower_red2 = np.array([170, 120, 70])
-            upper_red2 = np.array([180, 255, 255])
-            
-            # 创建掩码
-            mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
-            mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
-            mask = cv2.bitwise_or(mask1, mask2)
-            
-            # 计算火焰像素占比
-            fire_ratio = np.sum(mask > 0) / (mask.shape[0] * mask.shape[1])
+        """清空画面（摄像头断开或关闭时调用）；画面由 CameraReader 处理后经 setFrame 显示"""
+        self.setText("摄像头未连接")
+        self.active = False
             
-            # 如果火焰像素占比超过阈值，认为检测到火灾
-            return fire_ratio > 0.01
+    def setFrame(self, image):
+        """显示后台线程已经处理、缩放好的QImage，GUI线程只负责贴图"""
+        self.setPixmap(QPixmap.fromImage(image))
+        self.active = True
             
-        except Exception as e:
-            print(f"火灾检测出错: {e}")
-            return False
-            
-    def detect_animal(self, image):
+    @staticmethod
+    def detect_animal(image):
         """检测动物
         这里使用简单的运动检测作为示例
         实际项目中应该使用更复杂的目标检测模型
@@ -128,6 +70,187 @@ class CameraGridCell(QLabel):
             print(f"动物检测出错: {e}")
             return None
 
+class CameraReader(QThread):
+    """单个摄像头的后台读取线程：读帧、灾害检测、标注、缩放并转换成QImage"""
+    frame_ready = pyqtSignal(int, QImage)  # 格子索引, 可直接显示的图像
+    disconnected = pyqtSignal(int)  # 摄像头打开或读取失败
+    animal_detected = pyqtSignal(object, str, float)
+    
+    def __init__(self, index, camera, target_size=(320, 240), parent=None):
+        """
+        参数:
+            index (int): 格子索引
+            camera (dict): 摄像头信息，包含 source/type/name
+            target_size (tuple): 输出图像的最大尺寸 (宽, 高)
+        """
+        super().__init__(parent)
+        self.index = index
+        self.camera = camera
+        self.target_size = target_size
+        self.visible = True  # 不可见时只取帧不处理
+        self.pending = False  # 上一帧尚未被GUI显示时丢弃新帧，避免事件队列堆积
+        self.running = False
+        self.last_animal_check = 0
+        self.animal_check_interval = 1.0  # 动物检查间隔（秒）
+        self.latest = None  # 最近一帧原始画面
+        self.latest_time = 0  # 最近一帧的时间
+        self.fire_warning_until = 0  # 火灾警告标注的截止时间
+        self.fire_rois = []  # 火情区域（原图坐标）
+        
+    def read_frame(self, cap):
+        """读取一帧，无人机暂未接入视频流，生成模拟画面"""
+        if self.camera['type'] == 'drone':
+            self.msleep(100)
+            if not self.visible or self.pending:
+                return True, None
+            frame = np.zeros((480, 640, 3), dtype=np.uint8)
+            cv2.putText(frame, f"无人机 {self.index - 3} 画面", (50, 240),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+            return True, frame
+        if not self.visible or self.pending:
+            return cap.grab(), None  # 丢弃缓冲中的旧帧，保持画面最新
+        return cap.read()
+        
+    def run(self):
+        """读取线程主循环"""
+        self.running = True
+        cap = None
+        if self.camera['type'] == 'ground':
+            cap = cv2.VideoCapture(self.camera['source'])
+            if not cap.isOpened():
+                print(f"连接摄像头 {self.camera['source']} 失败")
+                self.disconnected.emit(self.index)
+                return
+        try:
+            while self.running:
+                ret, frame = self.read_frame(cap)
+                if not ret:
+                    self.disconnected.emit(self.index)
+                    self.msleep(500)
+                    continue
+                if frame is None:
+                    continue
+                self.process_frame(frame)
+        except Exception as e:
+            print(f"摄像头 {self.camera['name']} 读取出错: {e}")
+            self.disconnected.emit(self.index)
+        finally:
+            if cap is not None:
+                cap.release()
+                
+    def process_frame(self, frame):
+        """灾害检测后缩放成目标尺寸的QImage并发送"""
+        display_image = frame
+        current_time = time.time()
+        self.latest = frame  # 供火情预筛线程批量取用
+        self.latest_time = current_time
+        if current_time < self.fire_warning_until or current_time - self.last_animal_check >= self.animal_check_interval:
+            display_image = frame.copy()
+            
+        # 火情由预筛线程统一检测，这里只负责标注
+        if current_time < self.fire_warning_until:
+            cv2.putText(display_image, "火灾警告!", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+            for x1, y1, x2, y2 in self.fire_rois:
+                cv2.rectangle(display_image, (x1, y1), (x2, y2), (0, 0, 255), 2)
+            
+        if current_time - self.last_animal_check >= self.animal_check_interval:
+            self.last_animal_check = current_time
+            
+            # 动物检测
+            animal_result = CameraGridCell.detect_animal(frame)
+            if animal_result:
+                species, confidence = animal_result
+                self.animal_detected.emit(frame, species, confidence)
+                cv2.putText(display_image, f"{species} ({confidence:.2f}%)", (10, 60),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        
+        # 按格子大小等比缩放（代替GUI线程中的SmoothTransformation）
+        h, w = display_image.shape[:2]
+        r = min(self.target_size[0] / w, self.target_size[1] / h)
+        size = max(int(w * r), 1), max(int(h * r), 1)
+        display_image = cv2.resize(display_image, size, interpolation=cv2.INTER_AREA if r < 1 else cv2.INTER_LINEAR)
+        display_image = cv2.cvtColor(display_image, cv2.COLOR_BGR2RGB)
+        height, width, _ = display_image.shape
+        image = QImage(display_image.data, width, height, 3 * width, QImage.Format_RGB888).copy()  # 拷贝后脱离numpy内存
+        self.pending = True
+        self.frame_ready.emit(self.index, image)
+        
+    def stop(self):
+        """停止线程，返回线程是否已退出（可能仍阻塞在cv2读取中）"""
+        self.running = False
+        return self.wait(1000)
+
+class FireScreenWorker(QThread):
+    """火情检测线程：批量颜色预筛所有摄像头的最新画面，只把候选区域送入YOLO模型确认"""
+    fire_detected = pyqtSignal(str)
+    
+    def __init__(self, interval=1.0, warning_time=3.0, max_frame_age=3.0, parent=None):
+        """
+        参数:
+            interval (float): 检查间隔（秒）
+            warning_time (float): 检测到火情后画面上保持警告的时间（秒）
+            max_frame_age (float): 超过该时间没有新画面的摄像头（断线或卡住）不再检查
+        """
+        super().__init__(parent)
+        self.interval = interval
+        self.warning_time = warning_time
+        self.max_frame_age = max_frame_age
+        self.readers = {}  # 格子索引 -> CameraReader，由GUI线程整体替换
+        self.screen = FireScreen()
+        self.server = None
+        self.postprocessor = None
+        self.source_id = f"grid-fire-{id(self)}"
+        self.stats = {'frames': 0, 'passed': 0, 'model_calls': 0}
+        self.running = False
+        
+    def confirm(self, frame, rois):
+        """用YOLO模型确认候选区域，推理服务未启动时直接采用颜色预筛结果"""
+        if self.server is None:
+            self.server = InferenceServer.current()
+            if self.server is None:
+                return rois
+            self.postprocessor = DetectionPostprocessor(self.server.names)
+        try:
+            futures = [self.server.submit_frame(self.source_id, frame[y1:y2, x1:x2]) for x1, y1, x2, y2 in rois]
+            self.stats['model_calls'] += len(futures)
+            results = [f.result(InferenceServer.RESULT_TIMEOUT) for f in futures]
+            return [roi for roi, det in zip(rois, results) if self.postprocessor.process(det)['fire']]
+        except Exception as e:
+            print(f"火情确认推理失败: {e}")
+            self.server = None
+            return rois
+        
+    def run(self):
+        """检测线程主循环"""
+        self.running = True
+        while self.running:
+            start = time.time()
+            # 只检查可见且画面仍在更新的摄像头
+            readers = [r for r in self.readers.values()
+                       if r.visible and r.latest is not None and start - r.latest_time <= self.max_frame_age]
+            if readers:
+                frames = [r.latest for r in readers]
+                results = self.screen.screen(frames)
+                self.stats['frames'] += len(frames)
+                for reader, frame, result in zip(readers, frames, results):
+                    if not result['fire']:
+                        continue
+                    self.stats['passed'] += 1
+                    rois = self.confirm(frame, result['rois'])
+                    if rois:
+                        reader.fire_rois = rois
+                        reader.fire_warning_until = time.time() + self.warning_time
+                        self.fire_detected.emit(reader.camera['name'])
+            self.msleep(max(int((self.interval - (time.time() - start)) * 1000), 10))
+            
+    def stop(self):
+        """停止线程"""
+        self.running = False
+        self.wait(2000)
+        if self.server is not None:
+            self.server.unregister(self.source_id)
+
 class GridCameraView(QWidget):
     """九宫格摄像头视图"""
     
@@ -135,8 +258,14 @@ class GridCameraView(QWidget):
     fire_detected = pyqtSignal(str)  # 火灾检测信号
     animal_detected = pyqtSignal(object, str, float)  # 动物检测信号
     
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, auto_start=True):
+        """
+        参数:
+            auto_start (bool): 是否立即打开摄像头；分阶段启动时由启动编排器探测摄像头后调用 set_available_sources()
+        """
         super().__init__(parent)
+        self.auto_start = auto_start
+        self.available_sources = None  # 启动时探测到的可用地面摄像头，只用于首次打开，None表示不过滤
         self.cameras = {}  # 存储摄像头对象
         self.current_layout = "grid"  # grid或single
         self.active_cell = None
@@ -193,21 +322,23 @@ class GridCameraView(QWidget):
         for i in range(9):
             cell = CameraGridCell(i)
             cell.clicked.connect(self.on_cell_clicked)
-            # 连接灾害检测信号
-            cell.fire_detected.connect(self.fire_detected)
-            cell.animal_detected.connect(self.animal_detected)
             self.cells.append(cell)
             self.grid_layout.addWidget(cell, i // 3, i % 3)
             
         self.main_layout.addWidget(self.grid_container)
         
-        # 创建定时器用于更新画面
-        self.update_timer = QTimer(self)
-        self.update_timer.timeout.connect(self.update_frames)
-        self.update_timer.start(33)  # 约30fps
+        # 每个摄像头一个后台读取线程，GUI线程只负责显示
+        self.readers = {}
+        self.stopping = set()  # 已停止但仍未退出的读取线程，退出前保持引用
+        
+        # 所有摄像头共用一个火情预筛线程
+        self.fire_screen = FireScreenWorker()
+        self.fire_screen.fire_detected.connect(self.fire_detected)
+        self.fire_screen.start()
         
         # 初始化摄像头
-        self.refresh_cameras()
+        if self.auto_start:
+            self.refresh_cameras()
         
     def toggle_layout(self):
         """切换布局模式"""
@@ -217,12 +348,14 @@ class GridCameraView(QWidget):
             # 隐藏除了活动格子之外的所有格子
             for i, cell in enumerate(self.cells):
                 cell.setVisible(i == self.active_cell if self.active_cell is not None else i == 0)
+            self.update_reader_visibility()
         else:
             self.current_layout = "grid"
             self.layout_btn.setIcon(self.grid_icon)
             # 显示所有格子
             for cell in self.cells:
                 cell.setVisible(True)
+            self.update_reader_visibility()
                 
     def on_cell_clicked(self, index):
         """处理格子点击事件"""
@@ -238,66 +371,100 @@ class GridCameraView(QWidget):
         """刷新摄像头列表"""
         # 这里应该实现摄像头检测和连接逻辑
         # 示例：模拟9个摄像头
+        self.stop_readers()
         self.cameras.clear()
         camera_type = self.camera_combo.currentText()
         
         if camera_type in ["所有摄像头", "地面摄像头"]:
-            # 添加4个地面摄像头
+            # 添加4个地面摄像头，由读取线程负责打开，避免阻塞界面
             for i in range(4):
-                try:
-                    cap = cv2.VideoCapture(i)
-                    if cap.isOpened():
-                        self.cameras[i] = {
-                            'capture': cap,
-                            'type': 'ground',
-                            'name': f'地面摄像头 {i+1}'
-                        }
-                except Exception as e:
-                    print(f"连接摄像头 {i} 失败: {e}")
+                self.cameras[i] = {
+                    'source': i,
+                    'type': 'ground',
+                    'name': f'地面摄像头 {i+1}'
+                }
                     
         if camera_type in ["所有摄像头", "无人机摄像头"]:
             # 模拟5个无人机摄像头
             for i in range(5):
                 self.cameras[i+4] = {
-                    'capture': None,  # 实际项目中应该连接到无人机视频流
+                    'source': None,  # 实际项目中应该连接到无人机视频流
                     'type': 'drone',
                     'name': f'无人机 {i+1}'
                 }
-                
-    def update_frames(self):
-        """更新所有摄像头画面"""
-        if self.current_layout == "single" and self.active_cell is not None:
-            # 单视图模式只更新活动格子
-            self.update_cell(self.active_cell)
-        else:
-            # 网格模式更新所有格子
-            for i in range(9):
-                self.update_cell(i)
-                
-    def update_cell(self, index):
-        """更新单个格子的画面"""
-        if index in self.cameras:
+        
+        for index in range(9):
+            if index not in self.cameras:
+                self.cells[index].setImage(None)
+                continue
+            cell = self.cells[index]
             camera = self.cameras[index]
-            if camera['type'] == 'ground' and camera['capture'] is not None:
-                ret, frame = camera['capture'].read()
-                if ret:
-                    self.cells[index].setImage(frame, camera)
-                    return
-            elif camera['type'] == 'drone':
-                # 模拟无人机画面
-                frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                cv2.putText(frame, f"无人机 {index-3} 画面", (50, 240),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                self.cells[index].setImage(frame, camera)
-                return
-                
-        # 如果没有摄像头或获取画面失败
+            if (camera['type'] == 'ground' and self.available_sources is not None
+                    and camera['source'] not in self.available_sources):
+                cell.setImage(None)
+                continue
+            reader = CameraReader(index, self.cameras[index], (cell.width(), cell.height()))
+            reader.frame_ready.connect(self.on_frame_ready)
+            reader.disconnected.connect(self.on_camera_disconnected)
+            reader.animal_detected.connect(self.animal_detected)
+            self.readers[index] = reader
+            reader.start()
+        self.update_reader_visibility()
+        self.fire_screen.readers = dict(self.readers)
+        
+    def set_available_sources(self, sources):
+        """按启动时的探测结果首次打开摄像头，未探测到的格子直接显示未连接；之后刷新时重新尝试所有摄像头"""
+        self.available_sources = set(sources)
+        try:
+            self.refresh_cameras()
+        finally:
+            self.available_sources = None
+        
+    def update_reader_visibility(self):
+        """单视图模式下只处理活动格子的画面"""
+        for index, reader in self.readers.items():
+            reader.visible = not self.cells[index].isHidden()
+            
+    def on_frame_ready(self, index, image):
+        """显示后台线程送来的画面"""
+        reader = self.readers.get(index)
+        if reader is None:
+            return
+        cell = self.cells[index]
+        cell.setFrame(image)
+        reader.target_size = (cell.width(), cell.height())
+        reader.pending = False
+        
+    def on_camera_disconnected(self, index):
+        """摄像头未连接或获取画面失败"""
         self.cells[index].setImage(None)
         
+    def stop_readers(self):
+        """停止所有读取线程并释放摄像头"""
+        self.fire_screen.readers = {}
+        for reader in self.readers.values():
+            reader.running = False
+        for reader in self.readers.values():
+            reader.frame_ready.disconnect()
+            reader.disconnected.disconnect()
+            reader.animal_detected.disconnect()
+            if reader.stop():
+                reader.deleteLater()
+            else:
+                # 仍阻塞在cv2中的线程不能随最后一个引用销毁，等finished后再释放
+                self.stopping.add(reader)
+                reader.finished.connect(self.release_stopped_readers)
+        self.readers.clear()
+        self.release_stopped_readers()
+        
+    def release_stopped_readers(self):
+        """释放已经退出的读取线程"""
+        for reader in [r for r in self.stopping if r.isFinished()]:
+            self.stopping.discard(reader)
+            reader.deleteLater()
+        
     def closeEvent(self, event):
         """关闭时释放摄像头资源"""
-        self.update_timer.stop()
-        for camera in self.cameras.values():
-            if camera['type'] == 'ground' and camera['capture'] is not None:
-                camera['capture'].release()
-        super().closeEvent(event) 
\ No newline at end of file
+        self.fire_screen.stop()
+        self.stop_readers()
+        super().closeEvent(event)
@@ -0,0 +1,46 @@
+"""
+延迟构建的标签页
+
+标签页先放一个占位控件，第一次显示时才调用工厂函数构建真正的组件（连同其模块导入），
+构建完成后发出 created 信号，由主窗口连接组件的信号。
+"""
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+
+
+class LazyTab(QWidget):
+    """第一次显示时才构建内容的标签页"""
+
+    created = pyqtSignal(object)  # 构建好的组件
+
+    def __init__(self, factory, placeholder="加载中...", parent=None):
+        """
+        参数:
+            factory (callable): 无参数，返回要放进标签页的组件
+            placeholder (str): 构建前显示的文字
+        """
+        super().__init__(parent)
+        self.factory = factory
+        self.content = None  # 构建好的组件，未构建时为None
+
+        self.content_layout = QVBoxLayout(self)
+        self.content_layout.setContentsMargins(0, 0, 0, 0)
+        self.placeholder = QLabel(placeholder)
+        self.placeholder.setAlignment(Qt.AlignCenter)
+        self.placeholder.setStyleSheet("color: #8899aa; font-size: 14px;")
+        self.content_layout.addWidget(self.placeholder)
+
+    def ensure(self):
+        """构建内容（已构建时直接返回）"""
+        if self.content is None:
+            self.content = self.factory()
+            self.content_layout.removeWidget(self.placeholder)
+            self.placeholder.deleteLater()
+            self.content_layout.addWidget(self.content)
+            self.created.emit(self.content)
+        return self.content
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.content is None:
+            QTimer.singleShot(0, self.ensure)  # 先把占位文字画出来，再构建
@@ -0,0 +1,136 @@
+"""
+地图标注的QWebChannel桥接
+
+Python端把标注的新增/更新/删除和地图控制命令先放进队列，每帧最多合并成一条JSON消息发给页面；
+同一标注在一帧内的多次修改只发送最后状态。页面端把所有标注画在一个聚合图层上，不为每个点创建覆盖物。
+页面在地图移动/缩放后回报视野范围，Python端据此只推送视野内的点（或低缩放级别下的聚合点）。
+"""
+import json
+import time
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+
+class MapBridge(QObject):
+    """注册到QWebChannel的地图桥接对象（页面中名为 bridge）"""
+
+    batchReady = pyqtSignal(str)  # 一帧的合并消息（JSON），页面端 applyBatch 处理
+    viewportChanged = pyqtSignal(float, float, float, float, float)  # 页面回报的视野：南, 西, 北, 东, 缩放级别
+
+    def __init__(self, fps=30, parent=None):
+        """
+        参数:
+            fps (float): 每秒最多发送的消息数
+        """
+        super().__init__(parent)
+        self.markers = {}  # 标注id -> [id, 纬度, 经度, 类别, 等级, 标题, 数量]，页面重载时整体重发
+        self.pending = {}  # 本帧待发送的标注变化：id -> 标注，None表示删除
+        self.commands = []  # 本帧待执行的地图命令 [函数名, 参数...]
+        self.page_ready = False
+        self.messages = 0
+        self.ops = 0
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(int(1000 / max(fps, 1)))
+        self.flush_timer.timeout.connect(self.flush)
+
+    def schedule(self):
+        if self.page_ready and not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def set_marker(self, marker_id, lat, lng, kind='alert', level='medium', title='', count=1):
+        """新增或更新标注（count大于1表示聚合点）"""
+        marker = [marker_id, round(lat, 6), round(lng, 6), kind, level, title, count]
+        if self.markers.get(marker_id) == marker:
+            return
+        self.markers[marker_id] = marker
+        self.pending[marker_id] = marker
+        self.schedule()
+
+    def remove_marker(self, marker_id):
+        """删除标注"""
+        if self.markers.pop(marker_id, None) is not None:
+            self.pending[marker_id] = None
+            self.schedule()
+
+    def clear_markers(self, kind=None):
+        """删除全部（或某一类别的）标注"""
+        for marker_id in [m[0] for m in self.markers.values() if kind is None or m[3] == kind]:
+            self.remove_marker(marker_id)
+
+    def sync(self, markers):
+        """
+        让页面上的标注与给定列表一致：只发送新增、变化和消失的标注
+
+        参数:
+            markers (list[tuple]): 每项为 (id, 纬度, 经度, 类别, 等级, 标题, 数量)
+        """
+        keep = set()
+        for marker in markers:
+            self.set_marker(*marker)
+            keep.add(marker[0])
+        for marker_id in [i for i in self.markers if i not in keep]:
+            self.remove_marker(marker_id)
+
+    def command(self, name, *args):
+        """调用页面端 mapFunctions 中的函数，与标注变化在同一帧发送"""
+        self.commands.append([name, *args])
+        self.schedule()
+
+    def flush(self):
+        """把本帧积累的变化合并成一条消息发送"""
+        if not self.pending and not self.commands:
+            return
+        upsert = [m for m in self.pending.values() if m is not None]
+        remove = [i for i, m in self.pending.items() if m is None]
+        message = {'upsert': upsert, 'remove': remove, 'commands': self.commands}
+        self.ops += len(self.pending) + len(self.commands)
+        self.pending, self.commands = {}, []
+        self.messages += 1
+        self.batchReady.emit(json.dumps(message, ensure_ascii=False, separators=(',', ':')))
+
+    @pyqtSlot()
+    def ready(self):
+        """页面（重新）加载完成：发送全部标注的快照，之后只发送增量"""
+        self.page_ready = True
+        self.pending = {}
+        self.messages += 1
+        self.batchReady.emit(json.dumps({'reset': True, 'upsert': list(self.markers.values()),
+                                         'remove': [], 'commands': []},
+                                        ensure_ascii=False, separators=(',', ':')))
+        self.schedule()  # 页面就绪前积累的命令
+
+    @pyqtSlot(float, float, float, float, float)
+    def reportViewport(self, south, west, north, east, zoom):
+        """页面端在地图移动/缩放结束后调用"""
+        self.viewportChanged.emit(south, west, north, east, zoom)
+
+    def reset(self):
+        """页面开始重新加载，等待页面再次就绪"""
+        self.page_ready = False
+        self.flush_timer.stop()
+
+    def stats(self):
+        return {'markers': len(self.markers), 'messages': self.messages, 'ops': self.ops}
+
+
+# 测试代码
+if __name__ == "__main__":
+    import random
+    from PyQt5.QtCore import QCoreApplication
+
+    app = QCoreApplication([])
+    bridge = MapBridge()
+    sizes = []
+    bridge.batchReady.connect(lambda msg: sizes.append(len(msg)))
+    bridge.ready()
+
+    t0 = time.time()
+    for i in range(10000):
+        bridge.set_marker(f"alert-{i}", 30 + random.random(), 120 + random.random(), 'alert', 'high', f"告警{i}")
+    for i in range(0, 10000, 2):
+        bridge.remove_marker(f"alert-{i}")
+    bridge.flush()
+    print(f"10000次新增+5000次删除 -> {len(sizes) - 1} 条消息, {sizes[-1] / 1024:.0f} KB, "
+          f"{(time.time() - t0) * 1000:.1f} ms, {bridge.stats()}")
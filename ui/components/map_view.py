@@ -1,11 +1,21 @@
 import os
+import threading
+import time
+from urllib.parse import urlencode
+
 import requests
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
                             QLabel, QComboBox, QGroupBox, QToolBar, QAction, QGridLayout)
-from PyQt5.QtCore import Qt, QUrl, pyqtSlot, QSize
+from PyQt5.QtCore import Qt, QUrl, pyqtSlot, pyqtSignal, QSize, QTimer
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage, QWebEngineProfile, QWebEngineSettings
 from PyQt5.QtWebEngineCore import QWebEngineUrlRequestInterceptor
+from PyQt5.QtWebChannel import QWebChannel
+from ui.components.map_bridge import MapBridge
+from utils.spatial_index import SpatialIndex
+from utils.tile_cache import TileCache, TileServer
+
+MAP_ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets', 'map')
 
 class RequestInterceptor(QWebEngineUrlRequestInterceptor):
     """网络请求拦截器，用于调试地图加载问题"""
@@ -15,6 +25,15 @@ class RequestInterceptor(QWebEngineUrlRequestInterceptor):
         print(f"请求头: {info.requestHeaders()}")
 
 class CustomWebEnginePage(QWebEnginePage):
+    offline_requested = pyqtSignal()  # 在线地图不可用，页面请求切换到离线地图
+
+    def acceptNavigationRequest(self, url, nav_type, is_main_frame):
+        # 没有瓦片地址的离线页面是在线地图的备用页面，由Python端启动瓦片服务后再加载
+        if is_main_frame and url.fileName() == 'offline.html' and 'tiles=' not in url.query():
+            self.offline_requested.emit()
+            return False
+        return super().acceptNavigationRequest(url, nav_type, is_main_frame)
+
     def javaScriptConsoleMessage(self, level, message, line, source):
         level_str = {
             0: "INFO",
@@ -26,9 +45,20 @@ class CustomWebEnginePage(QWebEnginePage):
 class MapView(QWidget):
     """地图视图组件，用于在地理信息系统上显示监测区域和告警位置"""
     
-    def __init__(self, config):
+    def __init__(self, config, auto_load=True):
+        """
+        参数:
+            config (dict): 配置
+            auto_load (bool): 是否立即加载地图页面；分阶段启动时由启动编排器调用 load_map()
+        """
         super().__init__()
         self.config = config
+        self.auto_load = auto_load
+        # 告警和无人机位置的空间索引，只把视野内的点（或聚合点）推送给页面
+        self.index = SpatialIndex(max_points=config.get('map_max_points', 2000))
+        self.viewport = ((-90.0, -180.0, 90.0, 180.0), config.get('map_zoom', 15))  # 页面回报视野前使用全图
+        self.tile_server = None  # 离线地图的本地瓦片服务，首次需要时启动
+        self.prefetch_stop = threading.Event()
         self.init_ui()
         
     def init_ui(self):
@@ -122,410 +152,49 @@ class MapView(QWidget):
         
         # 设置页面
         page = CustomWebEnginePage(self.web_view)
+        page.offline_requested.connect(self.load_offline_map, Qt.QueuedConnection)
         self.web_view.setPage(page)
         map_layout.addWidget(self.web_view)
         
+        # 通过QWebChannel与页面通信：标注变化和地图命令每帧合并成一条消息
+        self.bridge = MapBridge(fps=self.config.get('ui_refresh_fps', 30), parent=self)
+        self.channel = QWebChannel(page)
+        self.channel.registerObject('bridge', self.bridge)
+        page.setWebChannel(self.channel)
+        self.web_view.loadStarted.connect(self.bridge.reset)
+        self.bridge.viewportChanged.connect(self.on_viewport_changed)
+        
+        # 索引变化后按帧合并，同一帧内的多次变化只查询一次
+        self.sync_timer = QTimer(self)
+        self.sync_timer.setSingleShot(True)
+        self.sync_timer.setInterval(self.bridge.flush_timer.interval())
+        self.sync_timer.timeout.connect(self.sync_markers)
+        
         # 将地图容器添加到主布局
         layout.addWidget(map_container)
         
         # 加载初始地图
-        self.load_map()
+        if self.auto_load:
+            self.load_map()
         
     def load_map(self):
-        """加载百度地图"""
-        try:
-            # 获取地图配置
-            center = self.config.get('map_center', [39.915, 116.404])
-            zoom = self.config.get('map_zoom', 15)
-            
-            # 使用临时文件加载地图
-            import tempfile
-            temp_path = os.path.join(tempfile.gettempdir(), "map_temp.html")
-            
-            # 构建HTML
-            html = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8" />
-    <meta http-equiv="Content-Type" content="text/html; charset=utf-8" />
-    <meta name="viewport" content="initial-scale=1.0, user-scalable=no" />
-    <title>森林监测地图</title>
-    <script type="text/javascript" src="https://api.map.baidu.com/api?v=3.0&ak={self.config.get('baidu_map_key', '')}&type=webgl"></script>
-    <style type="text/css">
-        html, body, #map {{
-            height: 100%;
-            width: 100%;
-            margin: 0;
-            padding: 0;
-        }}
-        .loading {{
-            position: absolute;
-            top: 50%;
-            left: 50%;
-            transform: translate(-50%, -50%);
-            text-align: center;
-            font-family: Arial, sans-serif;
-        }}
-        .offline-map {{
-            width: 100%;
-            height: 100%;
-            background-color: #eee;
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-            font-family: Arial, sans-serif;
-        }}
-        .info-window {{
-            padding: 5px;
-            min-width: 150px;
-        }}
-        .info-window .title {{
-            font-weight: bold;
-            margin-bottom: 5px;
-            color: #3a8ee6;
-        }}
-    </style>
-</head>
-<body>
-    <div id="map">
-        <div class="loading">加载百度地图中...</div>
-    </div>
-    
-    <script type="text/javascript">
-        // 全局变量
-        var map;
-        var alertMarkers = [];
-        var isMapLoaded = false;
-        
-        // 初始化函数
-        function initMap() {{
-            try {{
-                console.log("开始初始化地图...");
-                
-                // 检查BMap对象是否存在
-                if (typeof BMapGL === "undefined") {{
-                    throw new Error("BMapGL未定义，百度地图API未正确加载");
-                }}
-                
-                console.log("创建地图实例...");
-                // 创建地图实例
-                map = new BMapGL.Map("map");
-                
-                console.log("设置地图中心点...");
-                // 创建点坐标（注意经纬度顺序：经度在前，纬度在后）
-                var point = new BMapGL.Point({center[1]}, {center[0]});
-                
-                console.log("初始化地图视图...");
-                // 初始化地图
-                map.centerAndZoom(point, {zoom});
-                
-                // 设置默认地图类型为卫星图
-                map.setMapType(BMAP_SATELLITE_MAP);
-                
-                // 设置默认显示选项，隐藏POI图标
-                map.setDisplayOptions({{
-                    poi: false,  // 隐藏POI图标
-                    poiText: false,  // 隐藏POI文字
-                    building: false  // 隐藏3D建筑物
-                }});
-                
-                // 开启鼠标滚轮缩放
-                map.enableScrollWheelZoom(true);
-                
-                console.log("添加地图控件...");
-                // 添加地图控件
-                map.addControl(new BMapGL.NavigationControl());    // 导航控件
-                map.addControl(new BMapGL.ScaleControl());         // 比例尺控件
-                map.addControl(new BMapGL.ZoomControl());          // 缩放控件
-                map.addControl(new BMapGL.LocationControl());      // 定位控件
-                
-                // 地图初始化成功标记
-                isMapLoaded = true;
-                console.log("地图初始化完成");
-
-                // 自动定位到当前位置
-                setTimeout(function() {{
-                    // 定义错误状态处理函数
-                    function handleLocationError(status) {{
-                        var errorMsg = "";
-                        switch(status) {{
-                            case 6:
-                                errorMsg = "定位权限被拒绝，请在浏览器设置中允许获取位置信息";
-                                break;
-                            case 2:
-                            case 8:
-                                errorMsg = "定位不可用或超时，尝试使用IP定位";
-                                break;
-                            default:
-                                errorMsg = "定位失败(错误码:" + status + ")，尝试使用IP定位";
-                        }}
-                        console.error(errorMsg);
-                        return errorMsg;
-                    }}
-
-                    // 显示定位结果的函数
-                    function showLocationResult(point, accuracy, address, locationType, errorMsg) {{
-                        var marker = new BMapGL.Marker(point);
-                        map.addOverlay(marker);
-                        map.centerAndZoom(point, locationType === 'ip' ? 12 : 18);
-
-                        // 如果是精确定位，显示精度圈
-                        if (accuracy && locationType !== 'ip') {{
-                            var circle = new BMapGL.Circle(point, accuracy, {{
-                                strokeColor: "#1E90FF",
-                                strokeWeight: 1,
-                                strokeOpacity: 0.5,
-                                fillColor: "#1E90FF",
-                                fillOpacity: 0.1
-                            }});
-                            map.addOverlay(circle);
-                        }}
-
-                        var locationTypeText = {{
-                            'sdk': '手机GPS',
-                            'h5': '浏览器定位',
-                            'ip': 'IP定位'
-                        }}[locationType] || '未知方式';
-
-                        var infoWindow = new BMapGL.InfoWindow(
-                            '<div class="info-window">' +
-                            '<div class="title">当前位置</div>' +
-                            '<div>定位方式: ' + locationTypeText + '</div>' +
-                            '<div>经度: ' + point.lng.toFixed(6) + '</div>' +
-                            '<div>纬度: ' + point.lat.toFixed(6) + '</div>' +
-                            '<div>地址: ' + address + '</div>' +
-                            (accuracy && locationType !== 'ip' ? '<div>定位精度: ' + accuracy.toFixed(1) + '米</div>' : '') +
-                            (errorMsg ? '<div style="color: #ff9900;">' + errorMsg + '</div>' : '') +
-                            '</div>'
-                        );
-                        marker.openInfoWindow(infoWindow);
-                    }}
-
-                    // 先尝试SDK定位
-                    var geolocation = new BMapGL.Geolocation();
-                    geolocation.enableSDKLocation();
-                    geolocation.getCurrentPosition(function(r) {{
-                        if(this.getStatus() == BMAP_STATUS_SUCCESS) {{
-                            // SDK定位成功
-                            var geoc = new BMapGL.Geocoder();
-                            geoc.getLocation(r.point, function(rs) {{
-                                var addComp = rs.addressComponents;
-                                var address = addComp.province + addComp.city + 
-                                            addComp.district + addComp.street + 
-                                            addComp.streetNumber;
-                                showLocationResult(r.point, r.accuracy, address, 'sdk');
-                            }});
-                        }} else {{
-                            // SDK定位失败，尝试浏览器H5定位
-                            var h5geolocation = new BMapGL.Geolocation();
-                            h5geolocation.getCurrentPosition(function(r) {{
-                                if(this.getStatus() == BMAP_STATUS_SUCCESS) {{
-                                    // H5定位成功
-                                    var geoc = new BMapGL.Geocoder();
-                                    geoc.getLocation(r.point, function(rs) {{
-                                        var addComp = rs.addressComponents;
-                                        var address = addComp.province + addComp.city + 
-                                                    addComp.district + addComp.street + 
-                                                    addComp.streetNumber;
-                                        showLocationResult(r.point, r.accuracy, address, 'h5');
-                                    }});
-                                }} else {{
-                                    // H5定位也失败，使用IP定位
-                                    var errorMsg = handleLocationError(this.getStatus());
-                                    var myCity = new BMapGL.LocalCity();
-                                    myCity.get(function(result) {{
-                                        var geoc = new BMapGL.Geocoder();
-                                        geoc.getLocation(result.center, function(rs) {{
-                                            var addComp = rs.addressComponents;
-                                            var address = addComp.province + addComp.city + 
-                                                        addComp.district + addComp.street + 
-                                                        addComp.streetNumber;
-                                            showLocationResult(result.center, null, address, 'ip', 
-                                                '注意：由于无法获取精确位置，已切换到IP定位（精度较低）');
-                                        }});
-                                    }});
-                                }}
-                            }}, {{
-                                enableHighAccuracy: true,
-                                timeout: 5000,
-                                maximumAge: 0
-                            }});
-                        }}
-                    }}, {{
-                        enableHighAccuracy: true,
-                        timeout: 5000,
-                        maximumAge: 0,
-                        SDKLocation: true,
-                        coordType: 'bd09ll',
-                        poiDistance: true,
-                        poiNumber: 1
-                    }});
-                }}, 1000);
-                
-                // 定义对外接口
-                window.mapFunctions = {{
-                    setMapType: function(type) {{
-                        if (!isMapLoaded) return false;
-                        try {{
-                            switch(type) {{
-                                case 0: // 卫星图
-                                    map.setMapType(BMAP_SATELLITE_MAP);
-                                    map.setDisplayOptions({{
-                                        poi: false,
-                                        poiText: false,
-                                        building: false
-                                    }});
-                                    map.setTilt(0);
-                                    break;
-                                case 1: // 地形图
-                                    map.setMapType(BMAP_NORMAL_MAP);
-                                    map.setDisplayOptions({{
-                                        poi: false,
-                                        poiText: false,
-                                        building: false
-                                    }});
-                                    break;
-                                case 2: // 道路图
-                                    map.setMapType(BMAP_NORMAL_MAP);
-                                    map.setDisplayOptions({{
-                                        poi: false,
-                                        poiText: false,
-                                        building: false
-                                    }});
-                                    break;
-                                case 3: // 混合图
-                                    map.setMapType(BMAP_SATELLITE_MAP);
-                                    map.setDisplayOptions({{
-                                        poi: false,
-                                        poiText: false,
-                                        building: true
-                                    }});
-                                    break;
-                            }}
-                            return true;
-                        }} catch(e) {{
-                            console.error("切换地图类型出错:", e);
-                            return false;
-                        }}
-                    }},
-                    
-                    zoomIn: function() {{
-                        if (!isMapLoaded) return false;
-                        try {{
-                            map.zoomIn();
-                            return true;
-                        }} catch(e) {{
-                            console.error("地图放大出错:", e);
-                            return false;
-                        }}
-                    }},
-                    
-                    zoomOut: function() {{
-                        if (!isMapLoaded) return false;
-                        try {{
-                            map.zoomOut();
-                            return true;
-                        }} catch(e) {{
-                            console.error("地图缩小出错:", e);
-                            return false;
-                        }}
-                    }},
-                    
-                    panTo: function(lat, lng) {{
-                        if (!isMapLoaded) return false;
-                        try {{
-                            var point = new BMapGL.Point(lng, lat);
-                            map.panTo(point);
-                            return true;
-                        }} catch(e) {{
-                            console.error("地图平移出错:", e);
-                            return false;
-                        }}
-                    }},
-                    
-                    toggleAlerts: function(show) {{
-                        if (!isMapLoaded) return false;
-                        try {{
-                            if (alertMarkers.length > 0) {{
-                                alertMarkers.forEach(function(marker) {{
-                                    if (show) marker.show();
-                                    else marker.hide();
-                                }});
-                            }}
-                            return true;
-                        }} catch(e) {{
-                            console.error("切换告警显示出错:", e);
-                            return false;
-                        }}
-                    }},
-                    
-                    locateCurrentPosition: function() {{
-                        if (!isMapLoaded) {{
-                            console.error('地图未加载完成');
-                            return false;
-                        }}
-                        
-                        // 创建定位控件
-                        var locationControl = new BMapGL.LocationControl();
-                        locationControl.addEventListener("locationSuccess", function(e){{
-                            var address = '';
-                            address += e.addressComponent.province;
-                            address += e.addressComponent.city;
-                            address += e.addressComponent.district;
-                            address += e.addressComponent.street;
-                            address += e.addressComponent.streetNumber;
-                            
-                            // 在marker上显示信息窗口
-                            var infoWindow = new BMapGL.InfoWindow(
-                                '<div class="info-window">' +
-                                '<div class="title">当前位置</div>' +
-                                '<div>经度: ' + e.point.lng + '</div>' +
-                                '<div>纬度: ' + e.point.lat + '</div>' +
-                                '<div>地址: ' + address + '</div>' +
-                                '</div>'
-                            );
-                            var marker = new BMapGL.Marker(e.point);
-                            map.addOverlay(marker);
-                            marker.openInfoWindow(infoWindow);
-                            
-                            console.log('定位成功');
-                        }});
-                        locationControl.addEventListener("locationError", function(e){{
-                            console.error('定位失败：' + e.message);
-                        }});
-                        locationControl.location();
-                        return true;
-                    }}
-                }};
-                
-            }} catch (e) {{
-                console.error("地图初始化失败:", e);
-                document.getElementById("map").innerHTML = 
-                    '<div class="offline-map"><h2>百度地图初始化失败</h2><p>错误信息: ' + e.message + '</p></div>';
-            }}
-        }}
-        
-        // 添加示例告警点
-        function addExampleAlerts() {{
-            // 清空告警点数组
-            alertMarkers = [];
-            // 暂时不添加示例告警点
-        }}
+        """
+        加载地图页面（ui/assets/map 下的静态页面，参数通过URL查询串传入，不再每次生成HTML）
 
-        // 页面加载完成后初始化地图
-        window.onload = initMap;
-    </script>
-</body>
-</html>"""
-            
-            # 将HTML保存到临时文件
-            with open(temp_path, "w", encoding="utf-8") as f:
-                f.write(html)
-            
-            # 从本地文件加载
-            self.web_view.load(QUrl.fromLocalFile(temp_path))
-            print("正在从本地文件加载百度地图...")
+        map_mode: online 只用百度地图；offline 只用本地瓦片缓存；auto 百度地图API加载失败时切换到离线地图，
+        本地瓦片服务和瓦片预取只在真正切换时才启动
+        """
+        try:
+            mode = self.config.get('map_mode', 'auto')
+            if mode == 'offline':
+                url = self.offline_map_url()
+            else:
+                params = {'ak': self.config.get('baidu_map_key', '')}
+                if mode == 'auto':
+                    params['fallback'] = self.map_url('offline.html').toString()
+                url = self.map_url('online.html', **params)
+            self.web_view.load(url)
+            print(f"正在加载地图（{mode}）...")
             
         except Exception as e:
             print(f"地图加载失败: {e}")
@@ -546,152 +215,131 @@ class MapView(QWidget):
             </html>
             """
             self.web_view.setHtml(error_html)
+            
+    def map_url(self, page, **params):
+        """本地地图页面的URL，附带地图中心、缩放级别等参数"""
+        center = self.config.get('map_center', [39.915, 116.404])
+        query = {'lat': center[0], 'lng': center[1], 'zoom': self.config.get('map_zoom', 15), **params}
+        url = QUrl.fromLocalFile(os.path.join(MAP_ASSETS_DIR, page))
+        url.setQuery(urlencode(query))
+        return url
+        
+    def offline_map_url(self):
+        """离线地图页面的URL（需要时启动本地瓦片服务）"""
+        return self.map_url('offline.html', tiles=self.start_tile_server().tile_url)
+        
+    def load_offline_map(self):
+        """在线地图不可用时切换到离线地图"""
+        print("百度地图不可用，切换到离线地图")
+        self.web_view.load(self.offline_map_url())
+        
+    def start_tile_server(self):
+        """启动本地瓦片服务，并在后台预取监测区域周围的瓦片"""
+        if self.tile_server is None:
+            cache = TileCache(self.config.get('map_tile_cache', 'cache/tiles.mbtiles'),
+                              memory_tiles=self.config.get('map_tile_memory', 512),
+                              tile_url=self.config.get('map_tile_url') or None)
+            self.tile_server = TileServer(cache).start()
+            zooms = self.config.get('map_prefetch_zooms')
+            if zooms and cache.tile_url:
+                threading.Thread(target=self.prefetch_tiles, args=(cache, zooms), name='TilePrefetch',
+                                 daemon=True).start()
+        return self.tile_server
+        
+    def prefetch_tiles(self, cache, zooms):
+        """预取瓦片（后台线程）"""
+        t0 = time.time()
+        fetched = cache.prefetch(self.config.get('monitor_regions', []), zooms,
+                                 max_tiles=self.config.get('map_prefetch_max', 5000), stop=self.prefetch_stop)
+        print(f"预取地图瓦片 {fetched} 个，耗时 {time.time() - t0:.1f}s，缓存共 {cache.count()} 个")
+        
+    def shutdown(self):
+        """停止预取和本地瓦片服务"""
+        self.prefetch_stop.set()
+        if self.tile_server is not None:
+            self.tile_server.stop()
+            self.tile_server = None
       
     @pyqtSlot(int)
     def change_map_type(self, index):
         """改变地图类型"""
-        # 通过JS调用地图函数
-        script = f"""
-            try {{
-                console.log('调用地图类型切换，类型索引:', {index});
-                if (window.mapFunctions && typeof window.mapFunctions.setMapType === 'function') {{
-                    window.mapFunctions.setMapType({index});
-                    return true;
-                }} else {{
-                    console.error('地图类型切换函数不可用');
-                    return false;
-                }}
-            }} catch(e) {{
-                console.error('执行地图类型切换时出错:', e);
-                return false;
-            }}
-        """
-        self.web_view.page().runJavaScript(script)
+        self.bridge.command('setMapType', index)
         
     @pyqtSlot(int)
     def change_region(self, index):
         """改变监测区域"""
         if index >= 0 and index < len(self.config.get('monitor_regions', [])):
             region = self.config['monitor_regions'][index]
-            # 通过JS调用地图函数
-            script = """
-                try {
-                    if (window.mapFunctions && typeof window.mapFunctions.panTo === 'function') {
-                        window.mapFunctions.panTo(0, 0);
-                        return true;
-                    } else {
-                        console.error('地图平移函数不可用');
-                        return false;
-                    }
-                } catch(e) {
-                    console.error('平移到区域时出错:', e);
-                    return false;
-                }
-            """
-            self.web_view.page().runJavaScript(script)
+            self.bridge.command('panTo', region['latitude'], region['longitude'])
         
     @pyqtSlot()
     def zoom_in(self):
         """地图放大"""
-        script = """
-            try {
-                if (window.mapFunctions && typeof window.mapFunctions.zoomIn === 'function') {
-                    window.mapFunctions.zoomIn();
-                    return true;
-                } else {
-                    console.error('地图放大函数不可用');
-                    return false;
-                }
-            } catch(e) {
-                console.error('地图放大时出错:', e);
-                return false;
-            }
-        """
-        self.web_view.page().runJavaScript(script)
+        self.bridge.command('zoomIn')
         
     @pyqtSlot()
     def zoom_out(self):
         """地图缩小"""
-        script = """
-            try {
-                if (window.mapFunctions && typeof window.mapFunctions.zoomOut === 'function') {
-                    window.mapFunctions.zoomOut();
-                    return true;
-                } else {
-                    console.error('地图缩小函数不可用');
-                    return false;
-                }
-            } catch(e) {
-                console.error('地图缩小时出错:', e);
-                return false;
-            }
-        """
-        self.web_view.page().runJavaScript(script)
+        self.bridge.command('zoomOut')
         
     @pyqtSlot(bool)
     def toggle_alerts(self, checked):
         """切换告警点显示状态"""
-        script = f"""
-            try {{
-                if (window.mapFunctions && typeof window.mapFunctions.toggleAlerts === 'function') {{
-                    window.mapFunctions.toggleAlerts({str(checked).lower()});
-                    return true;
-                }} else {{
-                    console.error('告警点切换函数不可用');
-                    return false;
-                }}
-            }} catch(e) {{
-                console.error('切换告警点时出错:', e);
-                return false;
-            }}
-        """
-        self.web_view.page().runJavaScript(script)
+        self.bridge.command('toggleAlerts', checked)
         
     def locate_current_position(self):
         """定位当前位置"""
-        script = """
-            try {
-                if (!isMapLoaded) {
-                    console.error('地图未加载完成');
-                    return false;
-                }
-                
-                // 创建定位控件
-                var locationControl = new BMapGL.LocationControl();
-                locationControl.addEventListener("locationSuccess", function(e){{
-                    var address = '';
-                    address += e.addressComponent.province;
-                    address += e.addressComponent.city;
-                    address += e.addressComponent.district;
-                    address += e.addressComponent.street;
-                    address += e.addressComponent.streetNumber;
-                    
-                    // 在marker上显示信息窗口
-                    var infoWindow = new BMapGL.InfoWindow(
-                        '<div class="info-window">' +
-                        '<div class="title">当前位置</div>' +
-                        '<div>经度: ' + e.point.lng + '</div>' +
-                        '<div>纬度: ' + e.point.lat + '</div>' +
-                        '<div>地址: ' + address + '</div>' +
-                        '</div>'
-                    );
-                    var marker = new BMapGL.Marker(e.point);
-                    map.addOverlay(marker);
-                    marker.openInfoWindow(infoWindow);
-                    
-                    console.log('定位成功');
-                }});
-                locationControl.addEventListener("locationError", function(e){{
-                    console.error('定位失败：' + e.message);
-                }});
-                locationControl.location();
-                return true;
-            } catch(e) {
-                console.error('执行定位时出错:', e);
-                return false;
-            }
-        """
-        self.web_view.page().runJavaScript(script)
+        self.bridge.command('locateCurrentPosition')
+        
+    def alert_position(self, alert):
+        """告警的经纬度：告警自带坐标，或位置名称对应的监测区域；都没有时返回None"""
+        if 'latitude' in alert and 'longitude' in alert:
+            return alert['latitude'], alert['longitude']
+        gps = alert.get('gps')
+        if gps:
+            return gps['lat'], gps['lng']
+        for region in self.config.get('monitor_regions', []):
+            if region['name'] == alert.get('location'):
+                return region['latitude'], region['longitude']
+        return None
+        
+    def show_alert(self, alert):
+        """在地图上显示/更新告警点，已处理的告警移除"""
+        marker_id = f"alert-{alert.get('id', id(alert))}"
+        position = self.alert_position(alert)
+        if position is None or alert.get('level') == 'processed':
+            self.index.remove(marker_id)
+        else:
+            self.index.insert(marker_id, position[0], position[1], 'alert', alert.get('level', 'medium'),
+                              alert.get('location', ''))
+        self.schedule_sync()
+        
+    def update_drone(self, drone_id, status):
+        """更新无人机位置"""
+        gps = status.get('gps')
+        if gps:
+            self.index.insert(f"drone-{drone_id}", gps['lat'], gps['lng'], 'drone', 'low', f"#{drone_id}")
+            self.schedule_sync()
+        
+    def remove_drone(self, drone_id):
+        """移除无人机标注"""
+        self.index.remove(f"drone-{drone_id}")
+        self.schedule_sync()
+        
+    def schedule_sync(self):
+        if not self.sync_timer.isActive():
+            self.sync_timer.start()
+        
+    def sync_markers(self):
+        """按当前视野查询空间索引，只把变化的点推送给页面"""
+        bounds, zoom = self.viewport
+        self.bridge.sync(self.index.query(bounds, zoom))
+        
+    def on_viewport_changed(self, south, west, north, east, zoom):
+        """页面视野变化：立即按新视野重新推送"""
+        self.viewport = ((south, west, north, east), zoom)
+        self.sync_timer.stop()
+        self.sync_markers()
         
     def update_view(self):
         """更新地图视图"""
@@ -0,0 +1,150 @@
+"""
+界面刷新调度器
+
+各组件把自己标记为"需要刷新"（脏），调度器按帧合并：同一帧内多次标记只刷新一次，
+不可见的组件（如未选中的标签页）跳过，等显示出来后再刷新；
+每帧的刷新总耗时不超过预算，超出的组件顺延到下一帧。每个组件的刷新耗时都有统计。
+"""
+import time
+
+from PyQt5.QtCore import QObject, QTimer, QEvent
+
+
+class RefreshComponent:
+    """调度器中的一个组件及其耗时统计"""
+
+    def __init__(self, name, callback, widget=None):
+        self.name = name
+        self.callback = callback
+        self.widget = widget  # 用于判断是否可见，None表示始终刷新
+        self.dirty = False
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+        self.skipped = 0  # 因不可见而跳过的次数
+
+    def visible(self):
+        return self.widget is None or self.widget.isVisible()
+
+    def stats(self):
+        return {'count': self.count, 'skipped': self.skipped, 'last_ms': self.last_ms, 'max_ms': self.max_ms,
+                'avg_ms': self.total_ms / self.count if self.count else 0.0}
+
+
+class RefreshScheduler(QObject):
+    """按帧合并的脏标记刷新调度器（只在GUI线程使用）"""
+
+    def __init__(self, fps=30, budget_ms=8, parent=None):
+        """
+        参数:
+            fps (float): 最高刷新帧率，同一帧内的多次标记合并为一次刷新
+            budget_ms (float): 每帧刷新的耗时预算（毫秒）
+        """
+        super().__init__(parent)
+        self.frame_ms = 1000 / max(fps, 1)
+        self.budget_ms = budget_ms
+        self.components = {}  # 名称 -> RefreshComponent，按注册顺序
+        self.widgets = {}  # 控件 -> 组件名列表，控件显示时刷新积压的组件
+        self.timers = []
+        self.last_frame = 0
+        self.cursor = 0  # 轮转起点，预算不足时避免后面的组件一直得不到刷新
+        self.frames = 0
+        self.over_budget = 0  # 耗时超出预算的帧数
+
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.timeout.connect(self.run_frame)
+
+    def register(self, name, callback, widget=None, interval=None):
+        """
+        注册组件
+
+        参数:
+            name (str): 组件名
+            callback (callable): 刷新函数
+            widget (QWidget, optional): 组件对应的控件，不可见时跳过刷新
+            interval (int, optional): 定期标记为脏的间隔（毫秒），用于没有数据变化通知的组件
+        """
+        self.components[name] = RefreshComponent(name, callback, widget)
+        if widget is not None:
+            if widget not in self.widgets:
+                self.widgets[widget] = []
+                widget.installEventFilter(self)
+            self.widgets[widget].append(name)
+        if interval:
+            timer = QTimer(self)
+            timer.timeout.connect(lambda: self.mark_dirty(name))
+            timer.start(interval)
+            self.timers.append(timer)
+
+    def mark_dirty(self, *names):
+        """把组件标记为需要刷新，在下一帧统一刷新"""
+        for name in names:
+            self.components[name].dirty = True
+        self.schedule()
+
+    def schedule(self):
+        """安排下一帧（已安排时不重复安排），保证两帧之间至少间隔一个帧时长"""
+        if self.frame_timer.isActive():
+            return
+        elapsed = (time.perf_counter() - self.last_frame) * 1000
+        self.frame_timer.start(int(max(self.frame_ms - elapsed, 0)))
+
+    def run_frame(self):
+        """刷新可见的脏组件，直到用完本帧预算"""
+        start = time.perf_counter()
+        self.last_frame = start
+        self.frames += 1
+        components = list(self.components.values())
+        n = len(components)
+        pending = False
+        for i in range(n):
+            component = components[(self.cursor + i) % n]
+            if not component.dirty:
+                continue
+            if not component.visible():
+                component.skipped += 1
+                continue  # 保持脏标记，控件显示时再刷新
+            if (time.perf_counter() - start) * 1000 >= self.budget_ms:
+                self.cursor = (self.cursor + i) % n  # 下一帧从这里继续
+                pending = True
+                break
+            component.dirty = False
+            t0 = time.perf_counter()
+            try:
+                component.callback()
+            except Exception as e:
+                print(f"刷新组件 {component.name} 出错: {e}")
+            cost = (time.perf_counter() - t0) * 1000
+            component.count += 1
+            component.total_ms += cost
+            component.last_ms = cost
+            component.max_ms = max(component.max_ms, cost)
+        if (time.perf_counter() - start) * 1000 > self.budget_ms:
+            self.over_budget += 1
+        if pending:
+            self.schedule()
+
+    def eventFilter(self, obj, event):
+        """控件显示时刷新它积压的脏组件"""
+        if event.type() == QEvent.Show and obj in self.widgets:
+            if any(self.components[name].dirty for name in self.widgets[obj]):
+                self.schedule()
+        return False
+
+    def stats(self):
+        """各组件的刷新次数和耗时（毫秒）"""
+        return {name: component.stats() for name, component in self.components.items()}
+
+    def format_stats(self):
+        lines = [f"帧数 {self.frames}，超出预算 {self.over_budget} 帧（预算 {self.budget_ms}ms）"]
+        for name, s in self.stats().items():
+            lines.append(f"{name}: 刷新{s['count']}次 跳过{s['skipped']}次 "
+                         f"平均{s['avg_ms']:.2f}ms 最大{s['max_ms']:.2f}ms")
+        return '\n'.join(lines)
+
+    def stop(self):
+        self.frame_timer.stop()
+        for timer in self.timers:
+            timer.stop()
@@ -0,0 +1,245 @@
+"""
+统计图表视图
+
+图表的系列、切片和坐标轴只在创建时构建一次，之后 refresh() 从统计面板取最新数据，
+用 setValue()/replace() 原地更新，不再每次重建 QChartView。
+隐藏的图表不刷新，显示时（showEvent）再补一次刷新。
+"""
+from PyQt5.QtCore import Qt, QPointF, QMargins, QDateTime
+from PyQt5.QtGui import QFont, QPainter, QColor
+from PyQt5.QtChart import (QChart, QChartView, QLineSeries, QBarSet, QBarSeries, QPieSeries,
+                           QValueAxis, QDateTimeAxis, QBarCategoryAxis, QLegend)
+
+
+def style_chart(chart, title):
+    """统一的暗色图表样式"""
+    chart.setTitle(title)
+    chart.setAnimationOptions(QChart.SeriesAnimations)
+    chart.setBackgroundBrush(QColor("#0a1a2a"))
+    chart.setTitleBrush(QColor("white"))
+    chart.setTitleFont(QFont("Microsoft YaHei", 10, QFont.Bold))
+
+
+def style_axis(axis, title):
+    axis.setTitleText(title)
+    axis.setTitleBrush(QColor("white"))
+    axis.setLabelsColor(QColor("white"))
+    axis.setLabelsFont(QFont("Microsoft YaHei", 8))
+    axis.setTitleFont(QFont("Microsoft YaHei", 9, QFont.Bold))
+
+
+class LiveChartView(QChartView):
+    """原地刷新的图表视图基类"""
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()  # 隐藏期间跳过了刷新
+
+    def refresh(self):
+        raise NotImplementedError
+
+
+class PieChartView(LiveChartView):
+    """告警类型分布饼图，切片常驻，刷新时只改数值"""
+
+    TYPES = [('fire', "火灾告警", QColor(255, 100, 100)),
+             ('animal', "动物告警", QColor(100, 255, 100)),
+             ('landslide', "滑坡告警", QColor(100, 100, 255)),
+             ('pest', "病虫害告警", QColor(180, 100, 200))]
+
+    def __init__(self, panel, parent=None):
+        """
+        参数:
+            panel (StatisticsPanel): 提供 alert_stats 的统计面板
+        """
+        chart = QChart()
+        style_chart(chart, "告警类型分布")
+        super().__init__(chart, parent)
+        self.panel = panel
+
+        self.series = QPieSeries()
+        self.slices = {}
+        for key, name, color in self.TYPES:
+            pie_slice = self.series.append(name, 0)
+            pie_slice.setBrush(color)
+            pie_slice.setLabelColor(QColor("white"))
+            pie_slice.setLabelFont(QFont("Microsoft YaHei", 9))
+            self.slices[key] = pie_slice
+        self.slices['fire'].setExploded(True)  # 突出显示火灾切片
+
+        # 没有数据时显示的占位切片
+        self.placeholder = self.series.append("无告警数据", 0)
+        self.placeholder.setBrush(QColor(100, 100, 100))  # 灰色
+        self.placeholder.setLabelColor(QColor("white"))
+        self.placeholder.setLabelFont(QFont("Microsoft YaHei", 9))
+
+        chart.addSeries(self.series)
+        chart.legend().setLabelColor(QColor("white"))
+        self.setRenderHint(QPainter.Antialiasing)
+        self.setBackgroundBrush(QColor("#0a1a2a"))
+
+        self.values = None  # 上次显示的数值，没有变化时不触发重绘
+        self.refresh()
+
+    def refresh(self):
+        values = tuple(self.panel.alert_stats[key] for key, _, _ in self.TYPES)
+        if values == self.values:
+            return
+        self.values = values
+        empty = sum(values) == 0
+        for (key, _, _), value in zip(self.TYPES, values):
+            self.slices[key].setValue(value)
+        self.slices['fire'].setLabelVisible(not empty)
+        self.placeholder.setValue(1 if empty else 0)
+        self.placeholder.setLabelVisible(empty)
+        markers = self.chart().legend().markers(self.series)
+        if markers:
+            markers[-1].setVisible(empty)
+
+
+class TrendChartView(LiveChartView):
+    """告警趋势折线图，系列和坐标轴常驻，刷新时整体 replace() 数据点"""
+
+    TYPES = [('fire', "火灾告警", QColor(255, 100, 100)),
+             ('animal', "动物告警", QColor(100, 255, 100)),
+             ('landslide', "滑坡告警", QColor(100, 100, 255)),
+             ('pest', "病虫害告警", QColor(180, 100, 200))]
+
+    def __init__(self, panel, parent=None):
+        """
+        参数:
+            panel (StatisticsPanel): 提供 trend_range() 的统计面板
+        """
+        chart = QChart()
+        style_chart(chart, "24小时告警趋势")
+        chart.setMargins(QMargins(10, 10, 10, 20))  # 增加底部和左侧空间显示坐标文字
+        super().__init__(chart, parent)
+        self.panel = panel
+        self.range_index = 0  # 时间范围下拉框的序号
+
+        # X轴(时间轴)和Y轴
+        self.axis_x = QDateTimeAxis()
+        self.axis_x.setFormat("HH:mm")
+        self.axis_x.setTickCount(8)
+        style_axis(self.axis_x, "时间")
+        self.axis_y = QValueAxis()
+        self.axis_y.setLabelFormat("%d")
+        self.axis_y.setRange(0, 15)
+        self.axis_y.setTickCount(6)
+        style_axis(self.axis_y, "告警数量")
+        chart.addAxis(self.axis_x, Qt.AlignBottom)
+        chart.addAxis(self.axis_y, Qt.AlignLeft)
+
+        self.series = {}
+        for key, name, color in self.TYPES:
+            series = QLineSeries()
+            series.setName(name)
+            series.setColor(color)
+            chart.addSeries(series)
+            series.attachAxis(self.axis_x)
+            series.attachAxis(self.axis_y)
+            self.series[key] = series
+
+        # 设置图例位置和样式
+        chart.legend().setVisible(True)
+        chart.legend().setAlignment(Qt.AlignBottom)
+        chart.legend().setLabelColor(QColor("white"))
+        chart.legend().setMarkerShape(QLegend.MarkerShapeCircle)
+        chart.legend().setFont(QFont("Microsoft YaHei", 8))
+
+        self.setRenderHint(QPainter.Antialiasing)
+        self.setMinimumHeight(280)
+        self.setBackgroundBrush(QColor("#0a1a2a"))
+
+        self.key = None  # 上次显示的数据，没有变化时不触发重绘
+        self.refresh()
+
+    def set_time_range(self, index):
+        """切换时间范围（时间范围下拉框的序号）"""
+        self.range_index = index
+        self.refresh()
+
+    def refresh(self):
+        title, data, date_format, tick_count = self.panel.trend_range(self.range_index)
+        if not data:
+            return
+        key = (title, tuple(tuple(d[k] for k, _, _ in self.TYPES) + (d['time'],) for d in data))
+        if key == self.key:
+            return
+        self.key = key
+
+        for name, series in self.series.items():
+            series.replace([QPointF(d['time'].timestamp() * 1000, d[name]) for d in data])
+
+        self.chart().setTitle(title)
+        self.axis_x.setFormat(date_format)
+        self.axis_x.setTickCount(tick_count)
+        self.axis_x.setRange(QDateTime(data[0]['time']), QDateTime(data[-1]['time']))
+
+        # Y轴至少有一些高度，上浮20%以便更好地查看
+        max_value = max(max(max(d[k] for k in self.panel.TREND_TYPES) for d in data), 1)
+        self.axis_y.setRange(0, max_value * 1.2)
+        self.axis_y.setTickCount(int(max_value) + 1 if max_value <= 5 else 6)
+
+
+class RegionChartView(LiveChartView):
+    """区域统计柱状图，柱子常驻，刷新时只替换变化的数值"""
+
+    DEFAULT_REGIONS = ['东北区', '西北区', '中部区', '东南区', '西南区']
+
+    def __init__(self, panel, parent=None):
+        """
+        参数:
+            panel (StatisticsPanel): 提供 region_stats 的统计面板
+        """
+        chart = QChart()
+        style_chart(chart, "区域统计")
+        chart.setMargins(QMargins(10, 10, 10, 20))
+        super().__init__(chart, parent)
+        self.panel = panel
+
+        self.barset = QBarSet("告警数量")
+        self.barset.setColor(QColor(100, 200, 255))
+        self.series = QBarSeries()
+        self.series.append(self.barset)
+        self.series.setLabelsVisible(True)
+        self.series.setLabelsPosition(QBarSeries.LabelsInsideEnd)  # 标签位置在柱内端
+        chart.addSeries(self.series)
+
+        self.axis_x = QBarCategoryAxis()
+        style_axis(self.axis_x, "区域")
+        self.axis_y = QValueAxis()
+        self.axis_y.setLabelFormat("%d")
+        self.axis_y.setTickCount(6)
+        style_axis(self.axis_y, "告警数量")
+        chart.addAxis(self.axis_x, Qt.AlignBottom)
+        chart.addAxis(self.axis_y, Qt.AlignLeft)
+        self.series.attachAxis(self.axis_x)
+        self.series.attachAxis(self.axis_y)
+        chart.legend().setVisible(False)  # 隐藏图例
+
+        self.setRenderHint(QPainter.Antialiasing)
+        self.setMinimumHeight(280)
+        self.setBackgroundBrush(QColor("#0a1a2a"))
+
+        self.regions = []
+        self.values = []
+        self.refresh()
+
+    def refresh(self):
+        regions = list(self.panel.region_stats.keys()) or self.DEFAULT_REGIONS
+        values = [self.panel.region_stats.get(region, 0) for region in regions]
+        if regions != self.regions:
+            # 区域列表变化（很少发生）时才重建柱子和分类轴
+            self.barset.remove(0, self.barset.count())
+            self.barset.append(values)
+            self.axis_x.setCategories(regions)
+            self.regions = regions
+        else:
+            for i, (old, new) in enumerate(zip(self.values, values)):
+                if old != new:
+                    self.barset.replace(i, new)
+        if values != self.values:
+            # 最大值上浮20%，并确保至少有高度
+            self.axis_y.setRange(0, max(max(values), 1) * 1.2 + 1)
+        self.values = values
@@ -1,15 +1,19 @@
 import os
 import random
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QSlider,
                               QTabWidget, QGroupBox, QComboBox, QPushButton, QTableWidget, QTableWidgetItem, QHeaderView)
-from PyQt5.QtCore import Qt, pyqtSlot, QTimer, QMargins
-from PyQt5.QtGui import QFont, QPainter, QPen, QColor
-from PyQt5.QtChart import QChart, QChartView, QLineSeries, QBarSet, QBarSeries, QPieSeries, QValueAxis, QDateTimeAxis, QBarCategoryAxis, QLegend
+from PyQt5.QtCore import Qt, pyqtSlot, QTimer
+from PyQt5.QtGui import QFont, QColor
+from utils.time_series import AlertTimeSeries
+from ui.components.stat_charts import PieChartView, TrendChartView, RegionChartView
 
 class StatisticsPanel(QWidget):
     """统计面板组件，显示各类灾害检测统计信息和趋势图表"""
     
+    TREND_TYPES = ['fire', 'animal', 'landslide', 'forest_degradation', 'pest']
+    
     def __init__(self, config, parent=None):
         super().__init__(parent)
         self.config = config
@@ -38,12 +42,19 @@ class StatisticsPanel(QWidget):
         # 模拟数据
         self.init_mock_data()
         
+        # 所有由本面板创建的图表视图（包括主窗口中的），刷新时原地更新数据
+        self.chart_views = []
+        
+        # 图表重绘合并：短时间内的多次数据变化只触发一次重绘，每秒最多 chart_max_fps 次
+        self.redraw_interval = int(1000 / max(config.get('chart_max_fps', 2), 0.1))
+        self.last_redraw = 0
+        self.redraw_timer = QTimer(self)
+        self.redraw_timer.setSingleShot(True)
+        self.redraw_timer.timeout.connect(self.update_current_tab)
+        
         # 初始化UI
         self.init_ui()
         
-        # 创建并保存趋势图视图的引用
-        self.trend_chart_view = self.create_trend_chart_view()
-        
         # 设置自动更新定时器
         self.update_timer = QTimer(self)
         self.update_timer.timeout.connect(self.auto_update_statistics)
@@ -71,45 +82,26 @@ class StatisticsPanel(QWidget):
                 '西南区': 0
             }
         
-        # 模拟24小时数据
-        self.hour_data = []
-        now = datetime.now()
-        for i in range(24):
-            time_point = now - timedelta(hours=23-i)
-            self.hour_data.append({
-                'time': time_point,
-                'fire': 0,
-                'animal': 0,
-                'landslide': 0,
-                'forest_degradation': 0,
-                'pest': 0
-            })
-        
-        # 模拟7天数据
-        self.day_data = []
-        for i in range(7):
-            time_point = now - timedelta(days=6-i)
-            self.day_data.append({
-                'time': time_point,
-                'fire': 0,
-                'animal': 0,
-                'landslide': 0,
-                'forest_degradation': 0,
-                'pest': 0
-            })
-        
-        # 模拟30天数据
-        self.month_data = []
-        for i in range(30):
-            time_point = now - timedelta(days=29-i)
-            self.month_data.append({
-                'time': time_point,
-                'fire': 0,
-                'animal': 0,
-                'landslide': 0,
-                'forest_degradation': 0,
-                'pest': 0
-            })
+        # 趋势数据：按分钟/小时/天分桶的环形缓冲区，新告警O(1)计入，查询不遍历
+        self.time_series = AlertTimeSeries(self.TREND_TYPES)
+        
+    def trend_data(self, resolution, n):
+        """最近n个桶的趋势数据
+        
+        Args:
+            resolution (str): 'minute'、'hour' 或 'day'
+            n (int): 桶数
+        
+        Returns:
+            list[dict]: 每个桶一项，包含 'time' (datetime) 和各告警类型的数量
+        """
+        starts, counts = self.time_series.series(resolution, n)
+        data = []
+        for start, row in zip(starts.tolist(), counts.tolist()):
+            item = dict(zip(self.TREND_TYPES, row))
+            item['time'] = datetime.fromtimestamp(start)
+            data.append(item)
+        return data
         
     def init_ui(self):
         """初始化UI"""
@@ -208,96 +200,9 @@ class StatisticsPanel(QWidget):
         tab.setObjectName("trend_tab")  # 添加对象名称
         layout = QVBoxLayout(tab)
         
-        # 24小时趋势图
-        trend_chart = QChart()
-        trend_chart.setTitle("24小时告警趋势")
-        trend_chart.setAnimationOptions(QChart.SeriesAnimations)
-        trend_chart.setBackgroundBrush(QColor("#0a1a2a"))
-        trend_chart.setTitleBrush(QColor("white"))
-        trend_chart.setTitleFont(QFont("Microsoft YaHei", 10, QFont.Bold))
-        
-        # 创建折线系列 - 火灾
-        fire_series = QLineSeries()
-        fire_series.setName("火灾告警")
-        fire_series.setColor(QColor(255, 100, 100))
-        
-        # 创建折线系列 - 动物
-        animal_series = QLineSeries()
-        animal_series.setName("动物告警")
-        animal_series.setColor(QColor(100, 255, 100))
-        
-        # 创建折线系列 - 滑坡
-        landslide_series = QLineSeries()
-        landslide_series.setName("滑坡告警")
-        landslide_series.setColor(QColor(100, 100, 255))
-        
-        # 创建折线系列 - 病虫害
-        pest_series = QLineSeries()
-        pest_series.setName("病虫害告警")
-        pest_series.setColor(QColor(180, 100, 200))
-        
-        # 添加数据点
-        for i, data in enumerate(self.hour_data):
-            timestamp = data['time'].timestamp() * 1000  # 转换为毫秒
-            fire_series.append(timestamp, data['fire'])
-            animal_series.append(timestamp, data['animal'])
-            landslide_series.append(timestamp, data['landslide'])
-            pest_series.append(timestamp, data['pest'])
-        
-        # 添加系列到图表
-        trend_chart.addSeries(fire_series)
-        trend_chart.addSeries(animal_series)
-        trend_chart.addSeries(landslide_series)
-        trend_chart.addSeries(pest_series)
-        
-        # 创建X轴(时间轴)
-        axis_x = QDateTimeAxis()
-        axis_x.setFormat("HH:mm")
-        axis_x.setTitleText("时间")
-        axis_x.setTickCount(8)  # 显示8个刻度
-        axis_x.setRange(
-            self.hour_data[0]['time'],
-            self.hour_data[-1]['time']
-        )
-        axis_x.setTitleBrush(QColor("white"))
-        axis_x.setLabelsColor(QColor("white"))
-        
-        # 创建Y轴
-        axis_y = QValueAxis()
-        axis_y.setLabelFormat("%d")
-        axis_y.setTitleText("告警数量")
-        axis_y.setRange(0, 15)  # 增大Y轴范围，避免文字被裁剪
-        axis_y.setTickCount(6)  # 增加刻度数量以更好显示
-        axis_y.setTitleBrush(QColor("white"))
-        axis_y.setLabelsColor(QColor("white"))
-        
-        # 添加坐标轴到图表
-        trend_chart.addAxis(axis_x, Qt.AlignBottom)
-        trend_chart.addAxis(axis_y, Qt.AlignLeft)
-        
-        # 将所有系列依附到坐标轴
-        fire_series.attachAxis(axis_x)
-        fire_series.attachAxis(axis_y)
-        animal_series.attachAxis(axis_x)
-        animal_series.attachAxis(axis_y)
-        landslide_series.attachAxis(axis_x)
-        landslide_series.attachAxis(axis_y)
-        pest_series.attachAxis(axis_x)
-        pest_series.attachAxis(axis_y)
-        
-        # 设置图例位置和样式
-        trend_chart.legend().setVisible(True)
-        trend_chart.legend().setAlignment(Qt.AlignBottom)
-        trend_chart.legend().setLabelColor(QColor("white"))
-        trend_chart.legend().setMarkerShape(QLegend.MarkerShapeCircle)  
-        
-        # 创建图表视图
-        chart_view = QChartView(trend_chart)
-        chart_view.setRenderHint(QPainter.Antialiasing)
-        chart_view.setMinimumHeight(250)  # 增加最小高度
-        chart_view.setBackgroundBrush(QColor("#0a1a2a"))
-        
-        layout.addWidget(chart_view)
+        # 趋势图（时间范围由底部下拉框切换）
+        self.trend_chart_view = self.create_trend_chart_view()
+        layout.addWidget(self.trend_chart_view)
         
         return tab
         
@@ -377,138 +282,52 @@ class StatisticsPanel(QWidget):
     @pyqtSlot(int)
     def change_time_range(self, index):
         """切换时间范围"""
-        # 获取当前选择的时间范围
-        time_range = self.time_range_combo.currentText()
-        
-        # 更新趋势图
-        if time_range == "最近24小时":
-            self.update_trend_chart(self.hour_data, "HH:mm", 8)
-        elif time_range == "最近7天":
-            self.update_trend_chart(self.day_data[:7], "MM-dd", 7)
-        elif time_range == "最近30天":
-            self.update_trend_chart(self.day_data, "MM-dd", 10)
-        elif time_range == "本月":
-            # 筛选本月数据
-            now = datetime.now()
-            month_data = [d for d in self.day_data if d['time'].month == now.month]
-            self.update_trend_chart(month_data, "MM-dd", 10)
-        elif time_range == "本年":
-            # 筛选本年数据 (这里使用全部数据模拟)
-            self.update_trend_chart(self.day_data, "MM-dd", 10)
-            
-    def update_trend_chart(self, data, date_format, tick_count):
-        """更新趋势图"""
-        if not data:
-            return
-            
-        # 获取当前标签页中的图表
-        chart = self.trend_chart_view.chart()
-        
-        # 清除所有系列
-        chart.removeAllSeries()
-        
-        # 创建新系列
-        fire_series = QLineSeries()
-        fire_series.setName("火灾告警")
-        fire_series.setColor(QColor(255, 100, 100))
-        
-        animal_series = QLineSeries()
-        animal_series.setName("动物告警")
-        animal_series.setColor(QColor(100, 255, 100))
-        
-        landslide_series = QLineSeries()
-        landslide_series.setName("滑坡告警")
-        landslide_series.setColor(QColor(100, 100, 255))
-        
-        pest_series = QLineSeries()
-        pest_series.setName("病虫害告警")
-        pest_series.setColor(QColor(180, 100, 200))
-        
-        # 添加数据点
-        for i, d in enumerate(data):
-            timestamp = d['time'].timestamp() * 1000  # 转换为毫秒
-            fire_series.append(timestamp, d['fire'])
-            animal_series.append(timestamp, d['animal'])
-            landslide_series.append(timestamp, d['landslide'])
-            pest_series.append(timestamp, d['pest'])
-        
-        # 添加系列到图表
-        chart.addSeries(fire_series)
-        chart.addSeries(animal_series)
-        chart.addSeries(landslide_series)
-        chart.addSeries(pest_series)
-        
-        # 更新图表标题
-        chart.setTitle(f"{self.time_range_combo.currentText()}告警趋势")
-        
-        # 创建/更新坐标轴
-        chart.createDefaultAxes()
-        
-        # 更新X轴
-        x_axis = chart.axes(Qt.Horizontal)[0]
-        if isinstance(x_axis, QDateTimeAxis):
-            x_axis.setFormat(date_format)
-            x_axis.setTickCount(tick_count)
-            x_axis.setRange(data[0]['time'], data[-1]['time'])
-        
-        # 更新Y轴
-        y_axis = chart.axes(Qt.Vertical)[0]
-        if isinstance(y_axis, QValueAxis):
-            # 寻找最大值
-            max_value = 0
-            for d in data:
-                for t in ['fire', 'animal', 'landslide', 'forest_degradation', 'pest']:
-                    max_value = max(max_value, d[t])
-                    
-            # 确保Y轴至少有一些高度，即使没有数据
-            if max_value < 1:
-                max_value = 1
-                
-            # 设置Y轴范围，上浮20%以便更好地查看
-            y_axis.setRange(0, max_value * 1.2)
-            
-            # 根据数据范围确定合适的刻度数量
-            if max_value <= 5:
-                y_axis.setTickCount(max_value + 1)  # 每个值一个刻度
-            else:
-                y_axis.setTickCount(6)  # 较大范围使用5-6个刻度
+        self.trend_chart_view.set_time_range(index)
+        
+    def trend_range(self, index):
+        """时间范围下拉框序号对应的趋势数据
+        
+        Returns:
+            tuple: (标题, 趋势数据, X轴日期格式, X轴刻度数)
+        """
+        # 直接按桶号取对应范围，不筛选数据
+        now = datetime.now()
+        ranges = [
+            ("最近24小时", 'hour', 24, "HH:mm", 8),
+            ("最近7天", 'day', 7, "MM-dd", 7),
+            ("最近30天", 'day', 30, "MM-dd", 10),
+            ("本月", 'day', now.day, "MM-dd", 10),
+            ("本年", 'day', now.timetuple().tm_yday, "MM-dd", 10),
+        ]
+        name, resolution, n, date_format, tick_count = ranges[index if 0 <= index < len(ranges) else 0]
+        return f"{name}告警趋势", self.trend_data(resolution, n), date_format, tick_count
         
     @pyqtSlot()
     def refresh_statistics(self):
         """刷新统计数据"""
         # 不重置数据，只刷新UI
-        # 更新当前标签页
-        current_tab = self.tab_widget.currentIndex()
-        if current_tab == 0:
-            # 更新概览标签页
-            overview_tab = self.create_overview_tab()
-            self.tab_widget.removeTab(0)
-            self.tab_widget.insertTab(0, overview_tab, "概览")
-        elif current_tab == 1:
-            # 更新趋势图标签页
-            self.change_time_range(self.time_range_combo.currentIndex())
-        elif current_tab == 2:
-            # 更新区域统计标签页
-            region_tab = self.create_region_tab()
-            self.tab_widget.removeTab(2)
-            self.tab_widget.insertTab(2, region_tab, "区域统计")
-            
-        # 切换回当前标签页
-        self.tab_widget.setCurrentIndex(current_tab)
+        self.update_current_tab()
         
         print("已刷新统计面板显示")
     
     @pyqtSlot()
     def auto_update_statistics(self):
         """自动更新统计数据（由定时器调用）"""
-        # 更新数据
+        # 更新数据并合并刷新UI
         self.update_statistics()
         
-        # 动态更新UI
-        self.update_current_tab()
+    def schedule_redraw(self):
+        """请求刷新图表：与上次重绘间隔不足 redraw_interval 时推迟，期间的请求合并为一次"""
+        if self.redraw_timer.isActive():
+            return
+        elapsed = (time.time() - self.last_redraw) * 1000
+        self.redraw_timer.start(int(max(self.redraw_interval - elapsed, 0)))
         
     def update_current_tab(self):
         """更新所有标签页的UI，确保数据及时刷新"""
+        self.redraw_timer.stop()
+        self.last_redraw = time.time()
+        
         # 更新概览标签页上的告警统计
         overview_tab = self.tab_widget.widget(0)
         if overview_tab:
@@ -526,316 +345,46 @@ class StatisticsPanel(QWidget):
                     if label:
                         label.setText(f"{key.capitalize()}告警: {self.alert_stats[key]}")
             
-            # 更新饼图
-            chart_view = overview_tab.findChild(QChartView)
-            if chart_view:
-                # 创建新饼图
-                new_chart_view = self.create_pie_chart()
-                # 替换旧饼图
-                layout = overview_tab.layout()
-                layout.replaceWidget(chart_view, new_chart_view)
-                chart_view.deleteLater()
-                
-        # 更新趋势图
-        self.change_time_range(self.time_range_combo.currentIndex())
-        
-        # 保存当前区域图表视图的引用，便于后续更新
-        if not hasattr(self, 'region_chart_view'):
-            self.region_chart_view = self.create_region_chart_view()
+        # 原地更新可见的图表，隐藏的图表在显示时再刷新
+        for chart_view in self.chart_views:
+            if chart_view.isVisible():
+                chart_view.refresh()
             
-        # 更新区域统计图
+        # 更新病虫害类型表格
         region_tab = self.tab_widget.widget(2)
         if region_tab:
-            chart_view = region_tab.findChild(QChartView)
-            if chart_view:
-                # 创建新区域图
-                new_chart_view = self.create_region_chart_view()
-                # 替换旧区域图
-                layout = region_tab.layout()
-                layout.replaceWidget(chart_view, new_chart_view)
-                chart_view.deleteLater()
-                
-                # 更新病虫害类型表格
-                table = region_tab.findChild(QTableWidget)
-                if table:
-                    for row, (pest_type, count) in enumerate(self.pest_type_stats.items()):
-                        if row < table.rowCount() and count > 0:
-                            count_item = QTableWidgetItem(str(count))
-                            count_item.setTextAlignment(Qt.AlignCenter)
-                            table.setItem(row, 1, count_item)
+            table = region_tab.findChild(QTableWidget)
+            if table:
+                for row, (pest_type, count) in enumerate(self.pest_type_stats.items()):
+                    if row < table.rowCount() and count > 0:
+                        table.item(row, 1).setText(str(count))
                 
-        # 触发刷新
-        self.update()  # 强制刷新UI
         print("已刷新所有统计图表")
         
     def update_statistics(self):
-        """更新统计数据（由外部定时器调用）"""
-        # 获取当前时间
-        now = datetime.now()
+        """更新统计数据（由外部定时器调用）
         
-        # 对所有数据点进行处理，实现自然衰减的效果
-        for data in self.hour_data:
-            for key in ['fire', 'animal', 'landslide', 'forest_degradation', 'pest']:
-                # 如果是当前小时的数据，保持不变
-                if data['time'].hour == now.hour and data['time'].day == now.day:
-                    continue
-                
-                # 对于旧数据，每次更新减少20%，但不低于0
-                # 这样可以实现数值的自然衰减，使图表能体现趋势变化
-                if data[key] > 0:
-                    data[key] = max(0, data[key] - 0.2)
-        
-        # 对日数据也进行类似处理
-        for data in self.day_data:
-            # 如果不是当前日期的数据，进行衰减
-            if data['time'].day != now.day or data['time'].month != now.month:
-                for key in ['fire', 'animal', 'landslide', 'forest_degradation', 'pest']:
-                    if data[key] > 0:
-                        data[key] = max(0, data[key] - 0.1)  # 日数据衰减更慢一些
-        
-        # 更新UI显示
-        self.update_current_tab()
+        趋势数据在查询时按当前时间惰性翻转到新的桶，这里不再逐个桶处理，只刷新显示。
+        """
+        self.schedule_redraw()
 
+    def register_chart_view(self, chart_view):
+        """记录图表视图，视图销毁时自动移除"""
+        self.chart_views.append(chart_view)
+        chart_view.destroyed.connect(lambda _=None, view=chart_view: self.chart_views.remove(view))
+        return chart_view
+        
     def create_pie_chart(self):
         """创建新的饼图供外部使用"""
-        pie_chart = QChart()
-        pie_chart.setTitle("告警类型分布")
-        pie_chart.setAnimationOptions(QChart.SeriesAnimations)
-        pie_chart.setBackgroundBrush(QColor("#0a1a2a"))
-        pie_chart.setTitleBrush(QColor("white"))
-        pie_chart.setTitleFont(QFont("Microsoft YaHei", 10, QFont.Bold))
-        
-        # 创建饼图系列
-        series = QPieSeries()
-        
-        # 检查是否有数据
-        total_alerts = sum(self.alert_stats.values())
-        if total_alerts > 0:
-            series.append("火灾告警", self.alert_stats['fire'])
-            series.append("动物告警", self.alert_stats['animal'])
-            series.append("滑坡告警", self.alert_stats['landslide'])
-            series.append("病虫害告警", self.alert_stats['pest'])
-            
-            # 设置切片颜色
-            if len(series.slices()) >= 5:
-                series.slices()[0].setBrush(QColor(255, 100, 100))  # 红色
-                series.slices()[1].setBrush(QColor(100, 255, 100))  # 绿色
-                series.slices()[2].setBrush(QColor(100, 100, 255))  # 蓝色
-                series.slices()[3].setBrush(QColor(255, 200, 100))  # 橙色
-                series.slices()[4].setBrush(QColor(180, 100, 200))  # 紫色
-                
-                # 设置标签颜色
-                for slice in series.slices():
-                    slice.setLabelColor(QColor("white"))
-                    slice.setLabelFont(QFont("Microsoft YaHei", 9))
-                
-                # 突出显示第一个切片
-                series.slices()[0].setExploded(True)
-                series.slices()[0].setLabelVisible(True)
-        else:
-            # 如果没有数据，添加一个空的占位切片
-            placeholder = series.append("无告警数据", 1)
-            placeholder.setBrush(QColor(100, 100, 100))  # 灰色
-            placeholder.setLabelColor(QColor("white"))
-            placeholder.setLabelFont(QFont("Microsoft YaHei", 9))
-            placeholder.setLabelVisible(True)
-        
-        pie_chart.addSeries(series)
-        pie_chart.legend().setLabelColor(QColor("white"))
-        
-        # 创建图表视图
-        chart_view = QChartView(pie_chart)
-        chart_view.setRenderHint(QPainter.Antialiasing)
-        chart_view.setBackgroundBrush(QColor("#0a1a2a"))
-        
-        return chart_view
+        return self.register_chart_view(PieChartView(self))
 
     def create_trend_chart_view(self):
         """创建新的趋势图视图供外部使用"""
-        trend_chart = QChart()
-        trend_chart.setTitle("24小时告警趋势")
-        trend_chart.setAnimationOptions(QChart.SeriesAnimations)
-        trend_chart.setBackgroundBrush(QColor("#0a1a2a"))
-        trend_chart.setTitleBrush(QColor("white"))
-        trend_chart.setTitleFont(QFont("Microsoft YaHei", 10, QFont.Bold))
-        
-        # 设置图表边距，增加底部和左侧空间显示坐标文字
-        trend_chart.setMargins(QMargins(10, 10, 10, 20))
-        
-        # 创建折线系列 - 火灾
-        fire_series = QLineSeries()
-        fire_series.setName("火灾告警")
-        fire_series.setColor(QColor(255, 100, 100))
-        
-        # 创建折线系列 - 动物
-        animal_series = QLineSeries()
-        animal_series.setName("动物告警")
-        animal_series.setColor(QColor(100, 255, 100))
-        
-        # 创建折线系列 - 滑坡
-        landslide_series = QLineSeries()
-        landslide_series.setName("滑坡告警")
-        landslide_series.setColor(QColor(100, 100, 255))
-        
-        # 创建折线系列 - 病虫害
-        pest_series = QLineSeries()
-        pest_series.setName("病虫害告警")
-        pest_series.setColor(QColor(180, 100, 200))
-        
-        # 添加数据点
-        for i, data in enumerate(self.hour_data):
-            timestamp = data['time'].timestamp() * 1000  # 转换为毫秒
-            fire_series.append(timestamp, data['fire'])
-            animal_series.append(timestamp, data['animal'])
-            landslide_series.append(timestamp, data['landslide'])
-            pest_series.append(timestamp, data['pest'])
-        
-        # 添加系列到图表
-        trend_chart.addSeries(fire_series)
-        trend_chart.addSeries(animal_series)
-        trend_chart.addSeries(landslide_series)
-        trend_chart.addSeries(pest_series)
-        
-        # 创建X轴(时间轴)
-        axis_x = QDateTimeAxis()
-        axis_x.setFormat("HH:mm")
-        axis_x.setTitleText("时间")
-        axis_x.setTickCount(8)  # 显示8个刻度
-        axis_x.setRange(
-            self.hour_data[0]['time'],
-            self.hour_data[-1]['time']
-        )
-        axis_x.setTitleBrush(QColor("white"))
-        axis_x.setLabelsColor(QColor("white"))
-        axis_x.setLabelsFont(QFont("Microsoft YaHei", 8))
-        axis_x.setTitleFont(QFont("Microsoft YaHei", 9, QFont.Bold))
-        
-        # 创建Y轴
-        axis_y = QValueAxis()
-        axis_y.setLabelFormat("%d")
-        axis_y.setTitleText("告警数量")
-        axis_y.setRange(0, 15)  # 增大Y轴范围，避免文字被裁剪
-        axis_y.setTickCount(6)  # 增加刻度数量以更好显示
-        axis_y.setTitleBrush(QColor("white"))
-        axis_y.setLabelsColor(QColor("white")) 
-        axis_y.setLabelsFont(QFont("Microsoft YaHei", 8))
-        axis_y.setTitleFont(QFont("Microsoft YaHei", 9, QFont.Bold))
-        
-        # 添加坐标轴到图表
-        trend_chart.addAxis(axis_x, Qt.AlignBottom)
-        trend_chart.addAxis(axis_y, Qt.AlignLeft)
-        
-        # 将所有系列依附到坐标轴
-        fire_series.attachAxis(axis_x)
-        fire_series.attachAxis(axis_y)
-        animal_series.attachAxis(axis_x)
-        animal_series.attachAxis(axis_y)
-        landslide_series.attachAxis(axis_x)
-        landslide_series.attachAxis(axis_y)
-        pest_series.attachAxis(axis_x)
-        pest_series.attachAxis(axis_y)
-        
-        # 设置图例位置和样式
-        trend_chart.legend().setVisible(True)
-        trend_chart.legend().setAlignment(Qt.AlignBottom)
-        trend_chart.legend().setLabelColor(QColor("white"))
-        trend_chart.legend().setMarkerShape(QLegend.MarkerShapeCircle)
-        trend_chart.legend().setFont(QFont("Microsoft YaHei", 8))
-        
-        # 创建图表视图
-        chart_view = QChartView(trend_chart)
-        chart_view.setRenderHint(QPainter.Antialiasing)
-        chart_view.setMinimumHeight(280)  # 增加最小高度
-        chart_view.setBackgroundBrush(QColor("#0a1a2a"))
-        
-        return chart_view
+        return self.register_chart_view(TrendChartView(self))
 
     def create_region_chart_view(self):
         """创建区域统计图视图"""
-        chart = QChart()
-        chart.setTitle("区域统计")
-        chart.setAnimationOptions(QChart.SeriesAnimations)
-        chart.setBackgroundBrush(QColor("#0a1a2a"))
-        chart.setTitleBrush(QColor("white"))
-        chart.setTitleFont(QFont("Microsoft YaHei", 10, QFont.Bold))
-        
-        # 设置图表边距，增加底部和左侧空间显示坐标文字
-        chart.setMargins(QMargins(10, 10, 10, 20))
-        
-        # 创建数据集
-        barset = QBarSet("告警数量")
-        barset.setColor(QColor(100, 200, 255))  # 设置柱状图颜色
-        
-        # 获取区域名称和数据
-        regions = list(self.region_stats.keys())
-        values = list(self.region_stats.values())
-        
-        # 如果区域统计为空，使用默认区域
-        if not regions:
-            regions = ['东北区', '西北区', '中部区', '东南区', '西南区']
-            values = [0, 0, 0, 0, 0]
-            print("警告: 区域统计数据为空，使用默认空值")
-        
-        # 打印当前区域统计数据用于调试
-        print("区域统计数据:")
-        for region, value in zip(regions, values):
-            print(f"  {region}: {value}")
-        
-        # 添加数据到集合
-        for value in values:
-            barset.append(value)
-        
-        # 创建条形系列
-        series = QBarSeries()
-        series.append(barset)
-        series.setLabelsVisible(True)
-        series.setLabelsPosition(QBarSeries.LabelsInsideEnd)  # 标签位置在柱内端
-        
-        # 添加系列到图表
-        chart.addSeries(series)
-        
-        # 创建X轴(区域)
-        axis_x = QBarCategoryAxis()
-        axis_x.append(regions)
-        axis_x.setTitleText("区域")
-        axis_x.setTitleBrush(QColor("white"))
-        axis_x.setLabelsColor(QColor("white"))
-        axis_x.setLabelsFont(QFont("Microsoft YaHei", 8))
-        axis_x.setTitleFont(QFont("Microsoft YaHei", 9, QFont.Bold))
-        
-        # 创建Y轴
-        axis_y = QValueAxis()
-        axis_y.setLabelFormat("%d")
-        axis_y.setTitleText("告警数量")
-        
-        # 设置Y轴范围，确保即使是小数值也能看到变化
-        max_value = max(values) if values and max(values) > 0 else 1
-        axis_y.setRange(0, max_value * 1.2 + 1)  # 最大值上浮20%，并确保至少有高度
-        
-        axis_y.setTickCount(6)
-        axis_y.setTitleBrush(QColor("white"))
-        axis_y.setLabelsColor(QColor("white"))
-        axis_y.setLabelsFont(QFont("Microsoft YaHei", 8))
-        axis_y.setTitleFont(QFont("Microsoft YaHei", 9, QFont.Bold))
-        
-        # 添加坐标轴到图表
-        chart.addAxis(axis_x, Qt.AlignBottom)
-        chart.addAxis(axis_y, Qt.AlignLeft)
-        
-        # 将系列附加到坐标轴
-        series.attachAxis(axis_x)
-        series.attachAxis(axis_y)
-        
-        # 图例设置
-        chart.legend().setVisible(False)  # 隐藏图例
-        
-        # 创建图表视图
-        chart_view = QChartView(chart)
-        chart_view.setRenderHint(QPainter.Antialiasing)
-        chart_view.setMinimumHeight(280)  # 增加最小高度
-        chart_view.setBackgroundBrush(QColor("#0a1a2a"))
-        
-        return chart_view
+        return self.register_chart_view(RegionChartView(self))
 
     def handle_new_alert(self, alert_type, region):
         """处理新的告警信息
@@ -858,39 +407,11 @@ class StatisticsPanel(QWidget):
         self.region_stats[mapped_region] += 1
         print(f"更新区域统计: {mapped_region} = {self.region_stats[mapped_region]}")
         
-        # 更新趋势数据
-        now = datetime.now()
+        # 更新趋势数据（按时间戳直接定位分钟/小时/天的桶）
+        self.time_series.add(alert_type)
         
-        # 更新小时数据
-        for data in self.hour_data:
-            if data['time'].hour == now.hour and data['time'].day == now.day:
-                if alert_type in data:
-                    data[alert_type] += 1
-                    print(f"更新小时趋势: {alert_type} = {data[alert_type]}")
-                break
-        
-        # 更新日数据
-        for data in self.day_data:
-            if data['time'].day == now.day and data['time'].month == now.month:
-                if alert_type in data:
-                    data[alert_type] += 1
-                    print(f"更新日趋势: {alert_type} = {data[alert_type]}")
-                break
-        
-        # 更新月数据
-        for data in self.month_data:
-            if data['time'].day == now.day and data['time'].month == now.month:
-                if alert_type in data:
-                    data[alert_type] += 1
-                    print(f"更新月趋势: {alert_type} = {data[alert_type]}")
-                break
-        
-        # 更新UI显示
-        self.update_current_tab()
-        
-        # 强制刷新UI
-        from PyQt5.QtWidgets import QApplication
-        QApplication.processEvents()
+        # 合并刷新UI显示
+        self.schedule_redraw()
 
     def handle_alert_processed(self, alert_type, region):
         """处理告警已被处理的信号
@@ -932,30 +453,8 @@ class StatisticsPanel(QWidget):
                 self.pest_type_stats[selected_pest] -= 1
                 print(f"减少病虫害类型: {selected_pest} = {self.pest_type_stats[selected_pest]}")
             
-        # 更新当前小时的趋势数据 - 减少告警量
-        now = datetime.now()
-        for data in self.hour_data:
-            if data['time'].hour == now.hour and data['time'].day == now.day:
-                if alert_type in data and data[alert_type] > 0:
-                    data[alert_type] -= 1
-                    print(f"减少小时趋势: {alert_type} = {data[alert_type]}")
-                break
-                
-        # 更新当前日期的趋势数据 - 减少告警量
-        for data in self.day_data:
-            if data['time'].day == now.day and data['time'].month == now.month:
-                if alert_type in data and data[alert_type] > 0:
-                    data[alert_type] -= 1
-                    print(f"减少日趋势: {alert_type} = {data[alert_type]}")
-                break
+        # 当前分钟/小时/天的趋势数据减少告警量
+        self.time_series.remove(alert_type)
                 
-        # 基于当前选择的时间范围更新趋势图
-        current_index = self.time_range_combo.currentIndex() if hasattr(self, 'time_range_combo') else 0
-        self.change_time_range(current_index)
-            
-        # 更新UI - 确保立即刷新所有标签页
-        self.update_current_tab()
-        
-        # 强制刷新UI
-        from PyQt5.QtWidgets import QApplication
-        QApplication.processEvents() 
\ No newline at end of file
+        # 合并刷新所有标签页（包括当前时间范围的趋势图）
+        self.schedule_redraw()
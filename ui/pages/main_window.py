@@ -7,36 +7,37 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                             QFileDialog, QMessageBox, QMenu, QGroupBox)
 from PyQt5.QtCore import Qt, QTimer, pyqtSlot, QUrl, QSize
 from PyQt5.QtGui import QIcon, QPixmap, QFont, QColor, QPainter
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-import psutil
 from PyQt5.QtWidgets import QApplication
 import time
 
 from ui.components.map_view import MapView
-from ui.components.camera_view import CameraView
 from ui.components.alert_panel import AlertPanel
 from ui.components.control_panel import ControlPanel
 from ui.components.statistics_panel import StatisticsPanel
 from ui.components.drone_manager import DroneManager
 from ui.components.grid_camera_view import GridCameraView
-from PyQt5.QtChart import QChartView, QChart, QPieSeries
+from ui.components.refresh_scheduler import RefreshScheduler
+from ui.components.lazy_tab import LazyTab
+from utils.inference_server import InferenceServer
+from utils.lazy import lazy_import
+
+psutil = lazy_import('psutil')  # 第一次刷新系统状态时才导入
 
 class MainWindow(QMainWindow):
     """
     森林多模态灾害监测系统主窗口
     """
-    def __init__(self, config):
+    def __init__(self, config, deferred=False):
+        """
+        参数:
+            config (dict): 配置
+            deferred (bool): 只构建界面骨架，模型、摄像头、地图页面和无人机由启动编排器（ui/startup.py）在后台启动
+        """
         super().__init__()
         self.config = config
-        self.last_fire_update_time = 0  # 添加上次火灾更新时间记录
-        self.fire_update_interval = 5  # 设置最小更新间隔为5秒
-        self.last_animal_update = 0  # 添加动物检测更新时间记录
-        self.min_update_interval = 5  # 设置最小更新间隔为5秒
+        self.deferred = deferred
         self.init_ui()
         
-        # 连接摄像头视图的火灾检测信号
-        self.camera_view.fire_detected.connect(self.on_fire_detected)
-        
     def init_ui(self):
         """初始化UI界面"""
         # 设置窗口属性
@@ -71,7 +72,7 @@ class MainWindow(QMainWindow):
         left_layout.addWidget(self.control_panel)
         
         # 地图视图
-        self.map_view = MapView(self.config)
+        self.map_view = MapView(self.config, auto_load=not self.deferred)
         left_layout.addWidget(self.map_view)
         
         # === 中间栏：摄像头视图和告警面板 ===
@@ -85,19 +86,20 @@ class MainWindow(QMainWindow):
         camera_tabs.setStyleSheet("QTabBar::tab { background-color: #102040; color: white; padding: 6px 12px; margin-right: 2px; border-top-left-radius: 4px; border-top-right-radius: 4px; } QTabBar::tab:selected { background-color: #1a3a5a; }")
         
         # 添加九宫格视图标签页
-        self.grid_camera_view = GridCameraView()
+        self.grid_camera_view = GridCameraView(auto_start=not self.deferred)
         camera_tabs.addTab(self.grid_camera_view, "多路监控")
         
         # 连接九宫格视图的灾害检测信号
         self.grid_camera_view.fire_detected.connect(self.on_fire_detected)
         self.grid_camera_view.animal_detected.connect(self.on_animal_detected)
         
-        # 添加单路摄像头视图标签页
-        self.camera_view = CameraView(self.config)
-        camera_tabs.addTab(self.camera_view, "单路监控")
+        # 添加单路摄像头视图标签页（第一次打开时才导入torch和模型代码并构建）
+        self.camera_tab = LazyTab(self.create_camera_view, "单路监控加载中...")
+        self.camera_tab.created.connect(self.on_camera_view_created)
+        camera_tabs.addTab(self.camera_tab, "单路监控")
         
         # 添加无人机管理标签页
-        self.drone_manager = DroneManager(self.config)
+        self.drone_manager = DroneManager(self.config, auto_start=not self.deferred)
         camera_tabs.addTab(self.drone_manager, "无人机集群")
         
         # 将标签页容器添加到中间布局
@@ -112,6 +114,11 @@ class MainWindow(QMainWindow):
         # 连接告警处理信号
         self.alert_panel.alert_processed.connect(self.on_alert_processed)
         
+        # 告警和无人机位置显示在地图上（标注变化由地图桥接按帧合并发送）
+        self.alert_panel.alert_changed.connect(self.map_view.show_alert)
+        self.drone_manager.drone_status_changed.connect(self.map_view.update_drone)
+        self.drone_manager.drone_removed.connect(self.map_view.remove_drone)
+        
         # === 右侧栏：统计信息面板 ===
         right_panel = QWidget()
         right_layout = QVBoxLayout(right_panel)
@@ -185,13 +192,13 @@ class MainWindow(QMainWindow):
         time_range_combo = QComboBox()
         time_range_combo.setObjectName("time_range_combo")
         time_range_combo.addItems(["最近24小时", "最近7天", "最近30天", "本月", "本年"])
-        time_range_combo.currentIndexChanged.connect(self.statistics_panel.change_time_range)
         time_range_layout.addWidget(time_range_combo)
         time_range_layout.addStretch(1)
         trend_layout.addLayout(time_range_layout)
         
         # 趋势图视图
         trend_chart = self.statistics_panel.create_trend_chart_view()
+        time_range_combo.currentIndexChanged.connect(trend_chart.set_time_range)
         trend_chart.setObjectName("trend_chart_view")
         trend_chart.setMinimumHeight(280)  # 设置最小高度
         trend_chart.setFixedHeight(280)    # 设置固定高度，防止尺寸变化
@@ -230,14 +237,47 @@ class MainWindow(QMainWindow):
         # 创建状态栏
         self.create_statusbar()
         
-        # 创建定时器，定期更新UI
-        self.update_timer = QTimer(self)
-        self.update_timer.timeout.connect(self.update_ui)
-        self.update_timer.start(5000)  # 每5秒更新一次
+        # 创建刷新调度器：组件被标记为需要刷新后按帧合并刷新，不可见的组件跳过
+        # （告警表格由模型变化通知自动重绘，地图标注由告警/无人机信号经地图桥接按帧推送，都不经过调度器）
+        self.refresh_scheduler = RefreshScheduler(fps=self.config.get('ui_refresh_fps', 30),
+                                                  budget_ms=self.config.get('ui_frame_budget_ms', 8), parent=self)
+        self.refresh_scheduler.register('system', self.update_system_status, interval=5000)
+        self.refresh_scheduler.register('drones', self.drone_manager.update_drone_display, self.drone_manager)
+        self.refresh_scheduler.register('overview', self.update_overview_stats, right_panel, interval=5000)
+        # 无人机状态表格在状态变化时刷新，代替无人机管理器自己的定时刷新
+        self.drone_manager.timer.stop()
+        self.drone_manager.drone_status_changed.connect(self.on_drones_changed)
+        self.drone_manager.drone_removed.connect(self.on_drones_changed)
         
         # 应用暗色/亮色主题
         self.apply_theme()
         
+    @property
+    def camera_view(self):
+        """单路监控视图（未打开过该标签页时立即构建）"""
+        return self.camera_tab.ensure()
+        
+    def create_camera_view(self):
+        """构建单路监控视图"""
+        from ui.components.camera_view import CameraView  # 延迟导入：camera_view 导入时连带导入torch和模型代码
+        # 分阶段启动时模型由启动编排器在后台加载，尚未加载完成就先不加载，由编排器稍后连接
+        load_model = not self.deferred or InferenceServer.current() is not None
+        return CameraView(self.config, load_model=load_model)
+        
+    def on_camera_view_created(self, camera_view):
+        """单路监控视图构建完成后连接信号并注册刷新"""
+        camera_view.fire_detected.connect(self.on_fire_detected)
+        self.refresh_scheduler.register('camera', camera_view.update_view, camera_view)
+        # 监控状态只在视频线程启动/结束时变化（信号在视频线程中发出，连接到本窗口的槽以排队到GUI线程）
+        camera_view.video_thread.started.connect(self.on_camera_state_changed)
+        camera_view.video_thread.finished.connect(self.on_camera_state_changed)
+        
+    def on_camera_state_changed(self):
+        self.refresh_scheduler.mark_dirty('camera')
+        
+    def on_drones_changed(self, *args):
+        self.refresh_scheduler.mark_dirty('drones')
+        
     def create_toolbar(self):
         """创建工具栏"""
         self.toolbar = self.addToolBar("主工具栏")
@@ -388,8 +428,8 @@ class MainWindow(QMainWindow):
             # 应用亮色主题
             self.setStyleSheet("")
         
-    def update_ui(self):
-        """定期更新UI界面"""
+    def update_system_status(self):
+        """更新状态栏的系统状态和资源占用"""
         # 更新系统状态
         self.status_label.setText("系统状态: 正常运行中")
         
@@ -400,18 +440,8 @@ class MainWindow(QMainWindow):
         self.cpu_progress.setValue(cpu_usage)
         self.memory_progress.setValue(memory_usage)
         
-        # 更新子组件
-        self.camera_view.update_view()
-        self.map_view.update_view()
-        self.alert_panel.update_alerts()
-        self.statistics_panel.update_statistics()
-        
-        # 添加无人机组件更新
-        if hasattr(self, 'drone_manager'):
-            self.drone_manager.update_drone_display()
-        
-        # 更新右侧概览面板的统计数据
-        self.update_overview_stats()
+        # 各组件的刷新耗时
+        self.status_label.setToolTip(self.refresh_scheduler.format_stats())
         
     @pyqtSlot()
     def start_monitoring(self):
@@ -424,7 +454,8 @@ class MainWindow(QMainWindow):
     def stop_monitoring(self):
         """停止监控"""
         self.status_label.setText("系统状态: 已停止")
-        self.camera_view.stop_monitoring()
+        if self.camera_tab.content is not None:
+            self.camera_view.stop_monitoring()
         # 更新其他组件状态
         
     @pyqtSlot()
@@ -535,9 +566,11 @@ class MainWindow(QMainWindow):
         
         if reply == QMessageBox.Yes:
             # 停止所有正在运行的线程和定时器
-            self.update_timer.stop()
+            self.refresh_scheduler.stop()
             self.time_timer.stop()
-            self.camera_view.stop_monitoring()
+            if self.camera_tab.content is not None:
+                self.camera_view.stop_monitoring()
+            self.map_view.shutdown()
             
             # 停止所有无人机
             if hasattr(self, 'drone_manager'):
@@ -567,88 +600,8 @@ class MainWindow(QMainWindow):
         if pest_label:
             pest_label.setText(f"病虫害: {self.statistics_panel.alert_stats['pest']}")
             
-        # 更新各个图表
-        self.update_overview_chart()
-        self.update_trend_chart()
-        self.update_region_chart()
-
-    def update_overview_chart(self):
-        """更新右侧统计面板中的饼图"""
-        # 获取当前概览组中的饼图
-        overview_group = self.findChild(QGroupBox, "overview_group")
-        if overview_group:
-            # 获取旧的饼图视图
-            old_chart_view = None
-            for i in range(overview_group.layout().count()):
-                item = overview_group.layout().itemAt(i)
-                if item and item.widget() and isinstance(item.widget(), QChartView):
-                    old_chart_view = item.widget()
-                    break
-            
-            if old_chart_view:
-                # 创建新的饼图
-                new_chart_view = self.statistics_panel.create_pie_chart()
-                new_chart_view.setObjectName("overview_pie_chart")
-                new_chart_view.setMinimumHeight(250)  # 设置最小高度
-                new_chart_view.setFixedHeight(250)    # 设置固定高度，防止尺寸变化
-                
-                # 替换旧的饼图
-                layout = overview_group.layout()
-                layout.replaceWidget(old_chart_view, new_chart_view)
-                old_chart_view.deleteLater() 
-
-    def update_trend_chart(self):
-        """更新趋势图"""
-        trend_group = self.findChild(QGroupBox, "trend_group")
-        if trend_group:
-            # 获取旧的趋势图
-            old_chart_view = trend_group.findChild(QChartView, "trend_chart_view")
-            if old_chart_view:
-                # 创建新的趋势图
-                new_chart_view = self.statistics_panel.create_trend_chart_view()
-                new_chart_view.setObjectName("trend_chart_view")
-                
-                # 保持尺寸一致
-                new_chart_view.setMinimumHeight(280)
-                new_chart_view.setFixedHeight(280)
-                
-                # 替换旧的趋势图
-                layout = trend_group.layout()
-                for i in range(layout.count()):
-                    item = layout.itemAt(i)
-                    if item.widget() == old_chart_view:
-                        layout.replaceWidget(old_chart_view, new_chart_view)
-                        old_chart_view.deleteLater()
-                        break
-    
-    def update_region_chart(self):
-        """更新区域统计图"""
-        region_group = self.findChild(QGroupBox, "region_group")
-        if region_group:
-            # 获取旧的区域图
-            old_chart_view = region_group.findChild(QChartView, "region_chart_view")
-            if old_chart_view:
-                # 创建新的区域图
-                new_chart_view = self.statistics_panel.create_region_chart_view()
-                new_chart_view.setObjectName("region_chart_view")
-                
-                # 保持尺寸一致
-                new_chart_view.setMinimumHeight(280)
-                new_chart_view.setFixedHeight(280)
-                
-                # 替换旧的区域图
-                layout = region_group.layout()
-                for i in range(layout.count()):
-                    item = layout.itemAt(i)
-                    if item.widget() == old_chart_view:
-                        layout.replaceWidget(old_chart_view, new_chart_view)
-                        old_chart_view.deleteLater()
-                        print("已更新区域统计图")
-                        break
-            else:
-                print("警告: 未找到区域图表视图")
-        else:
-            print("警告: 未找到区域统计组")
+        # 图表由统计面板原地更新，短时间内的多次请求合并为一次重绘
+        self.statistics_panel.schedule_redraw()
 
     def on_alert_added(self, alert_type, region):
         """处理新告警信号，更新统计面板"""
@@ -657,18 +610,8 @@ class MainWindow(QMainWindow):
         # 调用统计面板的方法处理新告警
         self.statistics_panel.handle_new_alert(alert_type, region)
         
-        # 立即更新右侧统计信息显示
-        self.update_overview_stats()
-        
-        # 强制更新区域图表
-        self.update_region_chart()
-        
-        # 重置随机更新定时器，避免冲突
-        self.statistics_panel.update_timer.stop()
-        self.statistics_panel.update_timer.start(10000)  # 增加到10秒，减少干扰
-        
-        # 强制立即刷新所有图表
-        QApplication.processEvents()  # 确保UI更新立即可见 
+        # 右侧统计信息在下一帧合并刷新
+        self.refresh_scheduler.mark_dirty('overview')
 
     def on_alert_processed(self, alert_type, region):
         """处理告警处理信号，更新统计面板"""
@@ -677,29 +620,12 @@ class MainWindow(QMainWindow):
         # 调用统计面板的方法处理告警处理
         self.statistics_panel.handle_alert_processed(alert_type, region)
         
-        # 立即更新右侧统计信息显示
-        self.update_overview_stats()
-        
-        # 强制更新区域图表
-        self.update_region_chart()
-        
-        # 重置随机更新定时器，避免冲突
-        self.statistics_panel.update_timer.stop()
-        self.statistics_panel.update_timer.start(10000)  # 增加到10秒，减少干扰
-        
-        # 强制立即刷新所有图表
-        QApplication.processEvents()  # 确保UI更新立即可见 
+        # 右侧统计信息在下一帧合并刷新
+        self.refresh_scheduler.mark_dirty('overview')
 
     def on_fire_detected(self, region):
-        """处理火灾检测信号"""
-        current_time = datetime.now().timestamp()
-        # 检查是否达到最小更新间隔
-        if current_time - self.last_fire_update_time < self.fire_update_interval:
-            return  # 如果间隔太短，直接返回不处理
-            
+        """处理火灾检测信号（去重和限流由告警面板的告警引擎负责）"""
         print(f"收到火灾检测信号，区域：{region}")
-        # 更新上次处理时间
-        self.last_fire_update_time = current_time
         
         # 创建并添加告警
         alert = {
@@ -710,41 +636,20 @@ class MainWindow(QMainWindow):
             'level': 'high',
             'status': '未处理'
         }
-        self.alert_panel.add_alert(alert)  # 这会触发alert_added信号，统计更新将在on_alert_added中处理 
+        self.alert_panel.add_alert(alert)  # 新告警会触发alert_added信号，统计更新将在on_alert_added中处理 
 
     def on_animal_detected(self, image, species, confidence):
         """处理动物检测信号"""
-        current_time = time.time()
-        if current_time - self.last_animal_update < self.min_update_interval:
-            return
-            
-        self.last_animal_update = current_time
-        
         # 创建动物检测告警
         alert = {
             'type': 'animal',
             'location': '未知位置',  # 可以根据摄像头位置更新
             'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             'status': 'unprocessed',
-            'details': f'检测到{species}，置信度: {confidence:.1f}%',
+            'detail': f'检测到{species}，置信度: {confidence:.1f}%',
+            'level': 'medium',
             'image': image  # 保存检测到动物的图像
         }
         
-        # 添加到告警面板
+        # 添加到告警面板，新告警会触发alert_added信号，统计更新将在on_alert_added中处理
         self.alert_panel.add_alert(alert)
-        
-        # 调用统计面板的方法处理新告警
-        self.statistics_panel.handle_new_alert('animal', '未知位置')
-        
-        # 立即更新右侧统计信息显示
-        self.update_overview_stats()
-        
-        # 强制更新区域图表
-        self.update_region_chart()
-        
-        # 重置随机更新定时器，避免冲突
-        self.statistics_panel.update_timer.stop()
-        self.statistics_panel.update_timer.start(10000)  # 增加到10秒，减少干扰
-        
-        # 强制立即刷新所有图表
-        QApplication.processEvents()  # 确保UI更新立即可见 
\ No newline at end of file
@@ -456,6 +456,14 @@ class CustomSplashScreen(QSplashScreen):
             self.progress_timer.stop()
             QTimer.singleShot(500, self.finish_loading)  # 延迟半秒后完成
     
+    def set_progress(self, value, message):
+        """由启动编排器的真实完成事件驱动进度条和状态消息"""
+        self.progress_timer.stop()
+        self.current_progress = value
+        self.progress_bar.setValue(value)
+        if message:
+            self.status_label.setText(message)
+        
     def finish_loading(self):
         """完成加载后的处理"""
         # 在实际应用中，这里可以发出加载完成的信号
@@ -510,25 +518,34 @@ class CustomSplashScreen(QSplashScreen):
         painter.drawLine(self.width()-margin*6, self.height()-top_margin*2, self.width()-margin*2, self.height()-top_margin*2)
         painter.drawLine(self.width()-margin*2, self.height()-top_margin*2, self.width()-margin*2, self.height()-top_margin*5)
 
-def show_splash_screen(app, main_window, duration=5000):
+def show_splash_screen(app, main_window, duration=5000, startup=None):
     """显示启动屏幕
     
     Args:
         app: QApplication实例
-        main_window: 主窗口实例
-        duration: 显示启动屏幕的时间（毫秒）
+        main_window: 主窗口实例（使用startup时由编排器创建，可以为None）
+        duration: 显示启动屏幕的时间（毫秒），使用startup时不使用
+        startup: 启动编排器（ui/startup.py），进度由各阶段的完成事件驱动，界面骨架就绪后立即显示主窗口
+    
+    Returns:
+        CustomSplashScreen: 启动屏幕
     """
     splash = CustomSplashScreen()
     splash.show()
     
-    # 开始加载动画
-    splash.start_loading(duration)
-    
-    # 设置计时器，在指定时间后隐藏启动屏幕并显示主窗口
-    QTimer.singleShot(duration, lambda: finish_splash(splash, main_window))
+    if startup is None:
+        # 开始加载动画
+        splash.start_loading(duration)
+        
+        # 设置计时器，在指定时间后隐藏启动屏幕并显示主窗口
+        QTimer.singleShot(duration, lambda: finish_splash(splash, main_window))
+    else:
+        startup.progress.connect(splash.set_progress)
+        startup.interactive.connect(lambda window: finish_splash(splash, window))
     
     # 处理事件，确保启动屏幕显示
     app.processEvents()
+    return splash
     
 def finish_splash(splash, main_window):
     """完成启动屏幕并显示主窗口"""
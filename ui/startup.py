@@ -0,0 +1,322 @@
+"""
+分阶段启动编排
+
+启动工作拆成若干阶段，按依赖关系调度：模型加载、预热和摄像头探测在线程池中运行，
+界面骨架、地图页面、无人机等必须在GUI线程创建的阶段在事件循环中逐个运行（每个阶段之间让出事件循环，启动屏幕保持刷新）。
+启动屏幕的进度条由各阶段的完成事件驱动；界面骨架构建完成后立即显示主窗口，其余阶段在后台继续，
+进度显示在主窗口状态栏。可交互时间和各阶段耗时打印并追加到日志。
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class StartupStage:
+    """一个启动阶段"""
+
+    def __init__(self, name, message, func, deps=(), weight=1, worker=False, wait=False):
+        """
+        参数:
+            name (str): 阶段名
+            message (str): 开始时显示的状态消息
+            func (callable): 阶段函数，返回值保存在 results[name]；wait=True 时签名为 func(done)，
+                完成后调用 done(result)
+            deps (tuple[str]): 依赖的阶段，全部结束（成功或失败）后才开始
+            weight (float): 在总进度中的权重
+            worker (bool): 在线程池中运行，否则在GUI线程运行
+            wait (bool): GUI阶段异步完成（如等待页面加载）
+        """
+        self.name = name
+        self.message = message
+        self.func = func
+        self.deps = tuple(deps)
+        self.weight = weight
+        self.worker = worker
+        self.wait = wait
+        self.state = 'waiting'  # waiting -> running -> done / failed
+        self.start_time = None
+        self.end_time = None
+        self.error = None
+
+
+class StartupOrchestrator(QObject):
+    """按依赖关系运行启动阶段，并用真实的完成事件汇报进度"""
+
+    progress = pyqtSignal(int, str)  # 进度(0-100), 状态消息
+    interactive = pyqtSignal(object)  # 主窗口可以显示
+    finished = pyqtSignal(dict)  # 全部阶段结束，参数为耗时报告
+    stage_done = pyqtSignal(str, object, object)  # 阶段名, 结果, 异常（工作线程 -> GUI线程）
+
+    def __init__(self, t0=None, max_workers=4, log_path=None, parent=None):
+        """
+        参数:
+            t0 (float, optional): 启动计时起点（time.time()），默认取进程创建时间
+            max_workers (int): 后台阶段的线程数
+            log_path (str, optional): 追加写入启动耗时报告的文件
+        """
+        super().__init__(parent)
+        self.t0 = self.process_start_time() if t0 is None else t0
+        self.log_path = log_path
+        self.stages = {}  # 阶段名 -> StartupStage，按添加顺序
+        self.results = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='Startup')
+        self.interactive_time = None
+        self.gui_queue = []  # 待在GUI线程运行的阶段
+        self.stage_done.connect(self.on_stage_done)
+
+    @staticmethod
+    def process_start_time():
+        """进程创建时间，统计可交互时间时包含解释器启动和模块导入"""
+        try:
+            import psutil
+            return psutil.Process().create_time()
+        except Exception:
+            return time.time()
+
+    def add(self, name, message, func, deps=(), weight=1, worker=False, wait=False):
+        """添加阶段（在 start() 之前调用）"""
+        self.stages[name] = StartupStage(name, message, func, deps, weight, worker, wait)
+
+    def elapsed(self, t=None):
+        return (time.time() if t is None else t) - self.t0
+
+    def start(self):
+        """开始调度"""
+        for stage in self.stages.values():
+            missing = [d for d in stage.deps if d not in self.stages]
+            if missing:
+                raise ValueError(f"启动阶段 {stage.name} 依赖未定义的阶段: {missing}")
+        self.schedule()
+
+    def schedule(self):
+        """启动所有依赖已结束的阶段"""
+        for stage in self.stages.values():
+            if stage.state != 'waiting':
+                continue
+            if any(self.stages[d].state in ('waiting', 'running') for d in stage.deps):
+                continue
+            stage.state = 'running'
+            stage.start_time = time.time()
+            self.report_progress(stage.message)
+            if stage.worker:
+                future = self.executor.submit(stage.func)
+                future.add_done_callback(lambda f, name=stage.name: self.stage_done.emit(
+                    name, None if f.exception() else f.result(), f.exception()))
+            else:
+                self.gui_queue.append(stage)
+        if self.gui_queue:
+            QTimer.singleShot(0, self.run_gui_stage)  # 先让出事件循环，刷新启动屏幕
+
+    def run_gui_stage(self):
+        """在GUI线程运行一个阶段"""
+        if not self.gui_queue:
+            return
+        stage = self.gui_queue.pop(0)
+        try:
+            if stage.wait:
+                stage.func(lambda result=None, name=stage.name: self.on_stage_done(name, result, None))
+            else:
+                self.on_stage_done(stage.name, stage.func(), None)
+        except Exception as e:
+            self.on_stage_done(stage.name, None, e)
+        if self.gui_queue:
+            QTimer.singleShot(0, self.run_gui_stage)
+
+    def on_stage_done(self, name, result, error):
+        stage = self.stages[name]
+        if stage.state != 'running':
+            return
+        stage.end_time = time.time()
+        stage.state = 'failed' if error is not None else 'done'
+        stage.error = error
+        self.results[name] = result
+        if error is not None:
+            print(f"启动阶段 {name} 失败: {error}")  # 依赖它的阶段照常运行，自行处理缺失的结果
+        print(f"启动阶段 {name} 完成，用时 {(stage.end_time - stage.start_time) * 1000:.0f} ms"
+              f"（启动后 {self.elapsed(stage.end_time):.2f}s）")
+        self.report_progress()
+        if all(s.state in ('done', 'failed') for s in self.stages.values()):
+            self.finish()
+        else:
+            self.schedule()
+
+    def report_progress(self, message=None):
+        total = sum(s.weight for s in self.stages.values()) or 1
+        done = sum(s.weight for s in self.stages.values() if s.state in ('done', 'failed'))
+        if message is None:
+            running = [s.message for s in self.stages.values() if s.state == 'running']
+            message = running[0] if running else "启动完成"
+        self.progress.emit(int(100 * done / total), message)
+
+    def mark_interactive(self, window):
+        """界面骨架就绪：通知显示主窗口，并在窗口显示后的第一轮事件循环记录可交互时间"""
+        self.interactive.emit(window)
+
+        def record():
+            self.interactive_time = time.time()
+            print(f"启动到可交互用时 {self.elapsed(self.interactive_time):.2f}s")
+
+        QTimer.singleShot(0, record)
+
+    def finish(self):
+        """全部阶段结束：打印并记录耗时报告"""
+        self.executor.shutdown(wait=False)
+        report = self.report()
+        lines = [f"启动完成：可交互 {report['interactive_s']}s，全部完成 {report['total_s']}s"]
+        for name, s in report['stages'].items():
+            lines.append(f"  {name:<10} {s['state']:<6} {s['start_s']:>6.2f}s -> {s['end_s']:>6.2f}s "
+                         f"({s['duration_ms']:.0f} ms)")
+        print('\n'.join(lines))
+        if self.log_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(report, ensure_ascii=False) + '\n')
+            except OSError as e:
+                print(f"写入启动日志失败: {e}")
+        self.finished.emit(report)
+
+    def report(self):
+        """各阶段相对启动起点的开始/结束时间"""
+        stages = {}
+        for name, s in self.stages.items():
+            start = self.elapsed(s.start_time) if s.start_time else 0.0
+            end = self.elapsed(s.end_time) if s.end_time else start
+            stages[name] = {'state': s.state, 'start_s': round(start, 3), 'end_s': round(end, 3),
+                            'duration_ms': round((end - start) * 1000, 1),
+                            'error': None if s.error is None else str(s.error)}
+        end = max((s.end_time for s in self.stages.values() if s.end_time), default=time.time())
+        return {'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'interactive_s': round(self.elapsed(self.interactive_time), 3) if self.interactive_time else None,
+                'total_s': round(self.elapsed(end), 3), 'stages': stages}
+
+
+def probe_cameras(sources, max_workers=4):
+    """并行探测地面摄像头，返回能打开的摄像头编号"""
+    import cv2
+
+    def probe(source):
+        cap = cv2.VideoCapture(source)
+        try:
+            return cap.isOpened()
+        finally:
+            cap.release()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return [s for s, ok in zip(sources, pool.map(probe, sources)) if ok]
+
+
+def create_application(argv=None):
+    """
+    创建QApplication（入口脚本在调用launch之前使用）
+
+    主窗口在启动屏幕显示之后才导入，地图用到的QtWebEngine因此在QApplication创建之后才导入，
+    这要求在创建QApplication之前设置共享OpenGL上下文。
+    """
+    import sys
+    from PyQt5.QtCore import QCoreApplication, Qt
+    from PyQt5.QtWidgets import QApplication
+
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+    return QApplication(sys.argv if argv is None else argv)
+
+
+def launch(app, config):
+    """
+    带启动屏幕的分阶段启动（入口脚本在创建QApplication后调用，代替先构造MainWindow再show_splash_screen）
+
+    参数:
+        app (QApplication): 应用实例（用 create_application() 创建）
+        config (dict): 配置
+    返回:
+        StartupOrchestrator: 启动编排器（调用方需保持引用直到启动完成）
+    """
+    from ui.splash_screen import show_splash_screen
+
+    startup = StartupOrchestrator(log_path=os.path.join(config.get('logs_path', 'logs'), 'startup.log'))
+    show_splash_screen(app, None, startup=startup)
+    window = {}
+
+    def load_model():
+        # 与VideoThread使用相同的权重和设备，模型加载到共享推理服务中，预热单独作为一个阶段
+        import torch
+        from utils.inference_server import InferenceServer
+        weights = str(ROOT / 'weights/best.pt')
+        if not os.path.exists(weights):
+            print(f"错误：模型文件 {weights} 不存在")
+            return None
+        device = '0' if torch.cuda.is_available() else 'cpu'
+        from utils.backend_select import BackendSelector
+        from utils.model_cache import ModelCache
+        model_cache = BackendSelector.from_config(config) or ModelCache.from_config(config)
+        imgsz = [config.get('image_size', 640)] * 2
+        return InferenceServer.shared(weights, device=device, imgsz=imgsz, warmup=False,
+                                      model_cache=model_cache)
+
+    def warmup_model():
+        server = startup.results.get('model')
+        if server is not None:
+            server.warmup()
+        return server
+
+    def build_ui():
+        from ui.pages.main_window import MainWindow
+        window['main'] = MainWindow(config, deferred=True)
+        startup.progress.connect(lambda value, message: window['main'].statusBar().showMessage(
+            f"{message} {value}%" if value < 100 else "", 3000))
+        startup.mark_interactive(window['main'])
+        return window['main']
+
+    def attach_model():
+        # 共享推理服务已加载并预热，这里只取引用；单路监控标签页还没打开过时，打开时会直接取到
+        main = window['main']
+        if main.camera_tab.content is not None and main.camera_view.video_thread.model is None:
+            main.camera_view.video_thread.init_model()
+
+    def open_cameras():
+        window['main'].grid_camera_view.set_available_sources(startup.results.get('cameras') or [])
+
+    def load_map(done):
+        map_view = window['main'].map_view
+
+        def on_loaded(ok):
+            map_view.web_view.loadFinished.disconnect(on_loaded)
+            done(ok)
+
+        map_view.web_view.loadFinished.connect(on_loaded)
+        map_view.load_map()
+        QTimer.singleShot(15000, lambda: done(False))  # 页面迟迟未加载完成时不阻塞启动结束
+
+    def start_drones():
+        window['main'].drone_manager.add_initial_drones()
+
+    startup.add('model', "加载灾害检测模型...", load_model, weight=3, worker=True)
+    startup.add('cameras', "探测摄像头...", lambda: probe_cameras(list(range(4))), weight=1, worker=True)
+    startup.add('ui', "构建主界面...", build_ui, weight=3)
+    startup.add('warmup', "预热AI分析引擎...", warmup_model, deps=('model',), weight=2, worker=True)
+    startup.add('grid', "连接多路监控...", open_cameras, deps=('ui', 'cameras'))
+    startup.add('map', "加载地理信息系统...", load_map, deps=('ui',), weight=2, wait=True)
+    startup.add('detector', "连接检测模型...", attach_model, deps=('ui', 'warmup'))
+    startup.add('drones', "启动无人机集群...", start_drones, deps=('ui', 'warmup'))
+    startup.start()
+    return startup
+
+
+if __name__ == "__main__":
+    # 分阶段启动入口: python -m ui.startup [配置文件]
+    import sys
+
+    if str(ROOT) not in sys.path:
+        sys.path.append(str(ROOT))
+    from utils.config_loader import load_config
+
+    app = create_application()
+    startup = launch(app, load_config(sys.argv[1] if len(sys.argv) > 1 else None))
+    sys.exit(app.exec_())
@@ -0,0 +1,136 @@
+"""
+告警去重与限流
+
+所有告警先经过告警引擎：按 (来源, 类型, 空间网格) 哈希索引合并滑动时间窗口内的重复告警，
+再按区域做令牌桶限流。重复告警只更新已有告警（次数、最后时间、等级），不再新增一行。
+等级只在检测到的严重程度真正上升时提高：操作员处理后降低的等级和已处理状态不会被重复告警改回去。
+"""
+import time
+from collections import OrderedDict
+
+
+LEVEL_ORDER = {'low': 0, 'medium': 1, 'high': 2}
+
+
+class TokenBucket:
+    """令牌桶：容量为burst，每秒补充rate个令牌"""
+
+    def __init__(self, rate, burst, now=None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.time() if now is None else now
+
+    def take(self, now=None):
+        """取一个令牌，成功返回True"""
+        now = time.time() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class AlertEngine:
+    """告警接入引擎：滑动窗口去重 + 区域令牌桶限流"""
+
+    def __init__(self, interval=30, burst=3, rate_per_minute=6, cell_pixels=160, cell_degrees=0.01):
+        """
+        参数:
+            interval (float): 去重窗口（秒），窗口内同一来源、类型、网格的告警合并为一条
+            burst (int): 每个区域令牌桶容量
+            rate_per_minute (float): 每个区域每分钟补充的新告警数
+            cell_pixels (int): 按图像坐标(bbox)划分网格的边长（像素）
+            cell_degrees (float): 按经纬度划分网格的边长（度）
+        """
+        self.interval = interval
+        self.burst = burst
+        self.rate = rate_per_minute / 60
+        self.cell_pixels = cell_pixels
+        self.cell_degrees = cell_degrees
+        self.index = OrderedDict()  # 去重键 -> 告警，按最后出现时间排序
+        self.buckets = {}  # 区域 -> TokenBucket
+        self.stats = {'new': 0, 'update': 0, 'drop': 0}
+
+    @classmethod
+    def from_config(cls, config):
+        """从系统配置创建"""
+        return cls(interval=config.get('alert_interval', 30),
+                   burst=config.get('alert_burst', 3),
+                   rate_per_minute=config.get('alert_rate', 6))
+
+    def cell(self, alert):
+        """告警所在的空间网格：优先经纬度，其次检测框中心，都没有时为None"""
+        if 'latitude' in alert and 'longitude' in alert:
+            return 'geo', int(alert['latitude'] // self.cell_degrees), int(alert['longitude'] // self.cell_degrees)
+        bbox = alert.get('bbox')
+        if bbox is not None:
+            x1, y1, x2, y2 = bbox[:4]
+            return 'px', int((x1 + x2) / 2 // self.cell_pixels), int((y1 + y2) / 2 // self.cell_pixels)
+        return None
+
+    def key(self, alert):
+        """去重键：来源和位置都参与，同一来源在不同位置的告警不会被合并"""
+        return alert.get('source'), alert.get('location'), alert.get('type'), self.cell(alert)
+
+    def expire(self, now):
+        """移除超出去重窗口的索引项（索引按最后出现时间有序，从头部淘汰）"""
+        while self.index:
+            alert = next(iter(self.index.values()))
+            if now - alert['last_seen'] <= self.interval:
+                break
+            self.index.popitem(last=False)
+
+    def ingest(self, alert, now=None):
+        """
+        接入一条告警
+
+        参数:
+            alert (dict): 告警，至少包含 type/location
+        返回:
+            tuple: (action, alert)，action为 'new' 新告警、'update' 合并到已有告警（返回已有告警）、'drop' 被限流丢弃
+        """
+        now = time.time() if now is None else now
+        self.expire(now)
+        key = self.key(alert)
+
+        existing = self.index.get(key)
+        if existing is not None:
+            existing['count'] += 1
+            existing['last_seen'] = now
+            existing['last_time'] = alert.get('time', existing.get('time'))
+            # 与检测到的最高等级比较，而不是与当前（可能已被操作员降低的）等级比较
+            if LEVEL_ORDER.get(alert.get('level'), -1) > LEVEL_ORDER.get(existing.get('reported_level'), -1):
+                existing['reported_level'] = alert['level']
+                if existing.get('level') != 'processed':
+                    existing['level'] = alert['level']
+            self.index.move_to_end(key)
+            self.stats['update'] += 1
+            return 'update', existing
+
+        region = alert.get('location')
+        bucket = self.buckets.get(region)
+        if bucket is None:
+            bucket = self.buckets[region] = TokenBucket(self.rate, self.burst, now)
+        if not bucket.take(now):
+            self.stats['drop'] += 1
+            return 'drop', alert
+
+        alert['count'] = 1
+        alert['ts'] = alert['last_seen'] = now  # ts为首次出现时间，合并只更新last_seen
+        alert['reported_level'] = alert.get('level')  # 检测到的最高等级
+        alert['dedup_key'] = key
+        self.index[key] = alert
+        self.stats['new'] += 1
+        return 'new', alert
+
+    def forget(self, alert):
+        """告警被处理或清空后不再合并后续告警"""
+        key = alert.get('dedup_key')
+        if key is not None and self.index.get(key) is alert:
+            del self.index[key]
+
+    def clear(self):
+        self.index.clear()
+        self.buckets.clear()
@@ -0,0 +1,268 @@
+"""
+告警持久化存储
+
+告警保存在SQLite数据库（WAL模式）中，时间、类型、等级、位置上建有索引。
+写入由后台线程批量提交，界面按过滤条件分页查询，不再遍历全部告警。
+ts 为告警首次出现的时间，决定告警在历史中的位置；合并重复告警只更新 last_seen，不改变位置。
+分页按 (ts, id) 定位，时间戳相同的告警不会在页边界被跳过。
+查询不等待写线程：尚未落库的写入保存在内存中（pending），查询时与数据库中已提交的结果合并。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from queue import Empty, Queue
+
+
+COLUMNS = ('id', 'ts', 'time', 'type', 'location', 'level', 'detail', 'count', 'source', 'last_time', 'status',
+           'last_seen')
+
+
+class AlertStore:
+    """基于SQLite的告警存储，写入异步批量提交，查询走索引分页"""
+
+    def __init__(self, path, batch_size=500, flush_interval=0.05):
+        """
+        参数:
+            path (str): 数据库文件路径
+            batch_size (int): 单个事务最多写入的条数
+            flush_interval (float): 写线程凑批的最长等待时间（秒）
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.conn = self.connect()  # 读连接，仅在GUI线程使用
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS alerts (
+                id INTEGER PRIMARY KEY,
+                ts REAL NOT NULL,
+                time TEXT,
+                type TEXT,
+                location TEXT,
+                level TEXT,
+                detail TEXT,
+                count INTEGER DEFAULT 1,
+                source TEXT,
+                last_time TEXT,
+                status TEXT,
+                last_seen REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_alerts_ts ON alerts(ts);
+            CREATE INDEX IF NOT EXISTS idx_alerts_type_ts ON alerts(type, ts);
+            CREATE INDEX IF NOT EXISTS idx_alerts_level_ts ON alerts(level, ts);
+            CREATE INDEX IF NOT EXISTS idx_alerts_location_ts ON alerts(location, ts);
+            CREATE INDEX IF NOT EXISTS idx_alerts_type_level_ts ON alerts(type, level, ts);
+        ''')
+        if 'last_seen' not in [c[1] for c in self.conn.execute('PRAGMA table_info(alerts)')]:
+            self.conn.execute('ALTER TABLE alerts ADD COLUMN last_seen REAL')  # 旧版本的数据库
+            self.conn.commit()
+        self.next_id = (self.conn.execute('SELECT MAX(id) FROM alerts').fetchone()[0] or 0) + 1
+        self.id_lock = threading.Lock()
+
+        # 尚未落库的写入：id -> (序号, 写入后的行)；cleared 为尚未落库的清空操作数
+        self.pending = {}
+        self.cleared = 0
+        self.seq = 0
+        self.pending_lock = threading.Lock()
+
+        self.queue = Queue()
+        self.running = True
+        self.thread = threading.Thread(target=self.writer, name='AlertStoreWriter', daemon=True)
+        self.thread.start()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')  # WAL下只在检查点时fsync
+        return conn
+
+    def row(self, alert):
+        """告警字典 -> 数据库行（ts为首次出现时间，在 add() 时确定）"""
+        ts = alert.get('ts', alert.get('last_seen') or time.time())
+        return (alert['id'], ts, alert.get('time'), alert.get('type'), alert.get('location'), alert.get('level'),
+                alert.get('detail'), alert.get('count', 1), alert.get('source'), alert.get('last_time'),
+                alert.get('status'), alert.get('last_seen') or ts)
+
+    def add(self, alert):
+        """保存新告警（异步），为告警分配id并返回"""
+        with self.id_lock:
+            alert['id'] = self.next_id
+            self.next_id += 1
+        alert.setdefault('ts', alert.get('last_seen') or time.time())
+        self.put('insert', self.row(alert), alert)
+        return alert['id']
+
+    def update(self, alert):
+        """更新已有告警的次数、等级等字段（异步）"""
+        if 'id' in alert:
+            self.put('insert', self.row(alert), alert)  # INSERT OR REPLACE
+
+    def update_status(self, alert):
+        """只更新告警的等级和状态（异步），不改变告警时间和在历史中的位置"""
+        if 'id' in alert:
+            self.put('status', (alert.get('level'), alert.get('status'), alert['id']), alert)
+
+    def clear(self):
+        """删除所有告警（异步）"""
+        with self.pending_lock:
+            self.pending.clear()
+            self.cleared += 1
+            self.queue.put(('clear', 0, None))
+
+    def put(self, op, payload, alert):
+        """登记未落库的行并把写操作放入队列（在锁内入队，保证序号与队列顺序一致）"""
+        with self.pending_lock:
+            self.seq += 1
+            self.pending[alert['id']] = (self.seq, self.row(alert))
+            self.queue.put((op, self.seq, payload))
+
+    def committed(self, ops):
+        """一批写操作提交后，移除已落库且没有被更新的写入覆盖的内存行"""
+        with self.pending_lock:
+            for op, seq, payload in ops:
+                if op == 'clear':
+                    self.cleared -= 1
+                    continue
+                alert_id = payload[0] if op == 'insert' else payload[2]
+                entry = self.pending.get(alert_id)
+                if entry is not None and entry[0] == seq:
+                    del self.pending[alert_id]
+
+    def writer(self):
+        """写线程：把队列中的写操作合并成事务批量提交"""
+        conn = self.connect()
+        while self.running or not self.queue.empty():
+            try:
+                ops = [self.queue.get(timeout=0.1)]
+            except Empty:
+                continue
+            deadline = time.time() + self.flush_interval
+            while len(ops) < self.batch_size:
+                try:
+                    ops.append(self.queue.get(timeout=max(deadline - time.time(), 0)))
+                except Empty:
+                    break
+            try:
+                with conn:
+                    rows = []
+                    for op, _, row in ops:
+                        if op == 'insert':
+                            rows.append(row)
+                            continue
+                        # 之前的写入先提交，保持顺序
+                        self.write_rows(conn, rows)
+                        rows = []
+                        if op == 'status':
+                            conn.execute('UPDATE alerts SET level = ?, status = ? WHERE id = ?', row)
+                        else:
+                            conn.execute('DELETE FROM alerts')
+                    self.write_rows(conn, rows)
+            except sqlite3.Error as e:
+                print(f"告警写入数据库失败: {e}")
+            finally:
+                self.committed(ops)  # 写入失败的行同样丢弃，与数据库保持一致
+                for _ in ops:
+                    self.queue.task_done()
+        conn.close()
+
+    @staticmethod
+    def write_rows(conn, rows):
+        if rows:
+            conn.executemany(f"INSERT OR REPLACE INTO alerts ({', '.join(COLUMNS)}) "
+                             f"VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+
+    def flush(self):
+        """等待已提交的写操作全部落库（查询不需要调用，未落库的写入会被合并进结果）"""
+        self.queue.join()
+
+    @staticmethod
+    def where(alert_type=None, level=None, location=None, since=None, before=None):
+        conditions, params = [], []
+        for column, value in (('type', alert_type), ('level', level), ('location', location)):
+            if value not in (None, 'all'):
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        if since is not None:
+            conditions.append('ts >= ?')
+            params.append(since)
+        if before is not None:
+            conditions.append('(ts < ? OR (ts = ? AND id < ?))')
+            params += [before[0], before[0], before[1]]
+        return (' WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+
+    def snapshot(self, alert_type=None, level=None, location=None, since=None, before=None):
+        """
+        取得未落库写入的快照，须在读数据库之前调用（之后才落库的行仍在快照中，不会遗漏）
+
+        返回:
+            tuple: (是否有未落库的清空操作, 所有未落库行的id列表, 符合过滤条件的未落库行)
+        """
+        with self.pending_lock:
+            cleared = self.cleared > 0
+            rows = [row for _, row in self.pending.values()]
+        matched = []
+        for row in rows:
+            alert = dict(zip(COLUMNS, row))
+            if any(value not in (None, 'all') and alert[column] != value
+                   for column, value in (('type', alert_type), ('level', level), ('location', location))):
+                continue
+            if since is not None and alert['ts'] < since:
+                continue
+            if before is not None and (alert['ts'], alert['id']) >= tuple(before):
+                continue
+            matched.append(alert)
+        return cleared, [row[0] for row in rows], matched
+
+    def query(self, alert_type=None, level=None, location=None, since=None, offset=0, limit=200, before=None):
+        """
+        分页查询告警，按时间倒序
+
+        参数:
+            alert_type/level/location (str, optional): 过滤条件，None或'all'表示不过滤
+            since (float, optional): 只返回该时间戳之后的告警
+            before (tuple, optional): (ts, id)，只返回排在该告警之后（更早）的告警，按已加载的最早告警翻页
+            offset (int): 跳过的条数
+            limit (int): 返回条数
+        返回:
+            list[dict]: 告警列表（最新的在前）
+        """
+        cleared, pending_ids, alerts = self.snapshot(alert_type, level, location, since, before)
+        if not alerts and not cleared:
+            where, params = self.where(alert_type, level, location, since, before)
+            cursor = self.conn.execute(f"SELECT {', '.join(COLUMNS)} FROM alerts{where} "
+                                       f"ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?", params + [limit, offset])
+            return [dict(zip(COLUMNS, row)) for row in cursor]
+
+        if not cleared:
+            # 多取 len(pending_ids) 条，去掉被内存行覆盖的旧版本后仍然够一页
+            where, params = self.where(alert_type, level, location, since, before)
+            cursor = self.conn.execute(f"SELECT {', '.join(COLUMNS)} FROM alerts{where} "
+                                       f"ORDER BY ts DESC, id DESC LIMIT ?",
+                                       params + [offset + limit + len(pending_ids)])
+            pending_ids = set(pending_ids)
+            alerts += [dict(zip(COLUMNS, row)) for row in cursor if row[0] not in pending_ids]
+        alerts.sort(key=lambda alert: (alert['ts'], alert['id']), reverse=True)
+        return alerts[offset:offset + limit]
+
+    def count(self, alert_type=None, level=None, location=None, since=None):
+        """符合条件的告警数"""
+        cleared, pending_ids, alerts = self.snapshot(alert_type, level, location, since)
+        if cleared:
+            return len(alerts)
+        where, params = self.where(alert_type, level, location, since)
+        total = self.conn.execute(f'SELECT COUNT(*) FROM alerts{where}', params).fetchone()[0]
+        if pending_ids:
+            # 已落库的旧版本由内存中的新版本代替
+            where = (where + ' AND ' if where else ' WHERE ') + 'id IN (SELECT value FROM json_each(?))'
+            total -= self.conn.execute(f'SELECT COUNT(*) FROM alerts{where}',
+                                       params + [json.dumps(pending_ids)]).fetchone()[0]
+        return total + len(alerts)
+
+    def close(self):
+        """提交剩余写入并关闭数据库"""
+        self.running = False
+        self.thread.join(timeout=5)
+        self.conn.close()
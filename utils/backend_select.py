@@ -0,0 +1,290 @@
+"""
+CPU推理后端自动选择
+
+把 .pt 模型导出为本机可用的各个推理后端（TorchScript、ONNX Runtime、OpenVINO，以及通过验收的INT8模型），
+在配置的输入尺寸和批大小下逐个测速，选出每帧耗时最短的后端。选择结果连同各后端的耗时
+按 权重SHA256 + 输入尺寸 + 批大小 + CPU型号 保存为JSON，以后启动直接使用，换机器或换权重后重新测速。
+导出的模型都经过与原模型的输出比对（见 utils/model_cache.py），可以直接交给 DetectMultiBackend 加载。
+
+导出和测速要几分钟，推理服务启动时没有可用的选择结果就先加载 .pt，选择在后台线程中进行，下次启动生效；
+也可以提前离线运行: python -m utils.backend_select [权重] [批大小]
+"""
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from utils.lazy import lazy_import
+from utils.model_cache import ModelCache, compare_outputs, load_fused_model
+
+torch = lazy_import('torch')
+
+BACKENDS = ['pytorch', 'torchscript', 'onnx', 'onnx_int8', 'openvino']
+
+
+def cpu_name():
+    """CPU型号（用于区分不同机器上的测速结果）"""
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def available_backends():
+    """本机已安装运行时的后端"""
+    backends = ['pytorch', 'torchscript']
+    if importlib.util.find_spec('onnx') and importlib.util.find_spec('onnxruntime'):
+        backends += ['onnx', 'onnx_int8']
+    if importlib.util.find_spec('openvino'):
+        backends.append('openvino')
+    return backends
+
+
+def export_openvino(onnx_file, out_dir, imgsz, batch=1):
+    """
+    用OpenVINO模型优化器把ONNX模型转换为IR（.xml/.bin），输入形状固定为 (batch, 3, h, w)
+
+    返回:
+        Path: .xml 文件路径
+    """
+    mo = shutil.which('mo')
+    cmd = [mo] if mo else [sys.executable, '-m', 'openvino.tools.mo']
+    cmd += ['--input_model', str(onnx_file), '--output_dir', str(out_dir),
+            '--input_shape', f"[{batch},3,{imgsz[0]},{imgsz[1]}]"]
+    subprocess.run(cmd, check=True, capture_output=True, text=True)
+    return Path(out_dir) / (Path(onnx_file).stem + '.xml')
+
+
+def benchmark(model, im, warmup=3, runs=20):
+    """
+    测量单次前向耗时
+
+    返回:
+        dict: 中位数和最小耗时（毫秒）
+    """
+    times = []
+    with torch.no_grad():
+        for i in range(warmup + runs):
+            t0 = time.perf_counter()
+            model(im)
+            if i >= warmup:
+                times.append((time.perf_counter() - t0) * 1000)
+    return {'median_ms': round(float(np.median(times)), 2), 'min_ms': round(float(np.min(times)), 2)}
+
+
+class BackendSelector:
+    """导出、测速并记录最快的CPU推理后端"""
+
+    # OpenVINO IR按固定批大小导出（见 InferenceServer），其余后端的批大小可变
+    STATIC_BATCH = {'openvino': 1}
+
+    _running = set()  # 正在后台选择的结果文件
+    _running_lock = threading.Lock()
+
+    def __init__(self, cache_dir='cache/models', batch=8, backends=None, warmup=3, runs=20, fallback=None,
+                 background=True):
+        """
+        参数:
+            cache_dir (str): 导出模型和选择结果的保存目录
+            batch (int): 测速使用的批大小，应与推理服务的 max_batch 一致，
+                按固定批大小导出的后端（OpenVINO）以其实际批大小计算每帧耗时
+            backends (list[str], optional): 参与比较的后端，默认为本机可用的全部后端
+            warmup (int): 每个后端测速前的预热次数
+            runs (int): 计时次数
+            fallback (ModelCache, optional): GPU上不做选择，改用该缓存加载
+            background (bool): 没有选择结果时是否在后台线程中选择（先返回 .pt），False时阻塞到选择完成
+        """
+        self.cache_dir = Path(cache_dir)
+        self.batch = batch
+        self.backends = [b for b in (backends or BACKENDS) if b in available_backends()]
+        self.warmup = warmup
+        self.runs = runs
+        self.fallback = fallback
+        self.background = background
+
+    @classmethod
+    def from_config(cls, config):
+        """inference_backend 为 auto 时创建，否则返回None"""
+        config = config or {}
+        if config.get('inference_backend') != 'auto':
+            return None
+        return cls(config.get('model_cache_path', 'cache/models'), batch=config.get('auto_backend_batch', 8),
+                   fallback=ModelCache.from_config(config))
+
+    def decision_path(self, weights, imgsz):
+        sha = ModelCache(self.cache_dir).weights_hash(weights)
+        return self.cache_dir / f"{Path(weights).stem}-{sha[:16]}-{imgsz[0]}x{imgsz[1]}-b{self.batch}-backend.json"
+
+    def export(self, backend, weights, imgsz, device):
+        """导出指定后端的模型，返回 DetectMultiBackend 可加载的路径，导出或校验失败返回None"""
+        if backend == 'pytorch':
+            return str(weights)
+        if backend in ('torchscript', 'onnx'):
+            path = ModelCache(self.cache_dir, backend).get(weights, imgsz, device, half=False)
+            return path if path != weights else None
+        if backend == 'onnx_int8':
+            # 只使用 utils/quantize.py 量化并通过精度/速度验收的模型
+            from utils.quantize import Int8Quantizer
+            return Int8Quantizer(self.cache_dir).accepted_model(weights, imgsz)
+        # OpenVINO：由已校验的ONNX模型转换，再单独与原模型比对
+        onnx_file = ModelCache(self.cache_dir, 'onnx').get(weights, imgsz, device, half=False)
+        if onnx_file == weights:
+            return None
+        out_dir = Path(onnx_file).with_suffix('')
+        xml = out_dir / (Path(onnx_file).stem + '.xml')
+        if xml.exists():
+            return str(xml)
+        try:
+            xml = export_openvino(onnx_file, out_dir, imgsz, self.STATIC_BATCH['openvino'])
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"OpenVINO 模型转换失败: {getattr(e, 'stderr', None) or e}")
+            return None
+        if not self.validate(weights, str(xml), imgsz, device):
+            shutil.rmtree(out_dir, ignore_errors=True)
+            return None
+        return str(xml)
+
+    def validate(self, weights, path, imgsz, device):
+        """比较导出模型与原模型在随机输入上的输出"""
+        from models.common import DetectMultiBackend
+
+        model = load_fused_model(weights, device)
+        exported = DetectMultiBackend(path, device=device)
+        im = torch.rand(1, 3, *imgsz, device=device)
+        with torch.no_grad():
+            ok, err = compare_outputs(model(im)[0], exported(im), *ModelCache.TOLERANCE['fp32'])
+        if not ok:
+            print(f"{path} 与原模型输出不一致（最大误差 {err:.4f}），不参与选择")
+        return ok
+
+    def run(self, weights, imgsz, device):
+        """
+        导出并测速全部后端
+
+        返回:
+            dict: 选择结果，含各后端的每批、每帧耗时
+        """
+        from models.common import DetectMultiBackend
+
+        results = {}
+        for backend in self.backends:
+            try:
+                path = self.export(backend, weights, imgsz, device)
+                if path is None:
+                    results[backend] = {'error': '未量化或未通过验收' if backend == 'onnx_int8' else '导出失败'}
+                    continue
+                batch = self.STATIC_BATCH.get(backend, self.batch)
+                model = DetectMultiBackend(path, device=device)
+                model.float()
+                im = torch.rand(batch, 3, *imgsz, device=device)
+                stats = benchmark(model, im, self.warmup, self.runs)
+                results[backend] = {'path': path, 'batch': batch, **stats,
+                                    'ms_per_frame': round(stats['median_ms'] / batch, 2)}
+                print(f"{backend:<12} 批大小 {batch}: {stats['median_ms']:.1f} ms/批, "
+                      f"{results[backend]['ms_per_frame']:.1f} ms/帧")
+            except Exception as e:
+                print(f"{backend} 测速失败: {e}")
+                results[backend] = {'error': str(e)}
+        ok = {k: v for k, v in results.items() if 'ms_per_frame' in v}
+        best = min(ok, key=lambda k: ok[k]['ms_per_frame']) if ok else 'pytorch'
+        return {'backend': best, 'path': ok[best]['path'] if ok else str(weights),
+                'weights': str(Path(weights).resolve()), 'imgsz': list(imgsz), 'batch': self.batch,
+                'cpu': cpu_name(), 'threads': torch.get_num_threads(), 'torch': torch.__version__,
+                'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'results': results}
+
+    def int8_changed(self, decision, weights, imgsz):
+        """上次选择之后INT8模型是否有变化（新通过验收或被否决），有变化时需要重新测速"""
+        if 'onnx_int8' not in self.backends:
+            return False
+        from utils.quantize import Int8Quantizer
+        path = Int8Quantizer(self.cache_dir).accepted_model(weights, imgsz)
+        return path != decision['results'].get('onnx_int8', {}).get('path')
+
+    def select(self, weights, imgsz, device):
+        """导出、测速并保存选择结果，返回选中的模型路径"""
+        file = self.decision_path(weights, imgsz)
+        decision = self.run(weights, imgsz, device)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        file.write_text(json.dumps(decision, indent=2, ensure_ascii=False))
+        print(f"选择推理后端 {decision['backend']}，结果保存到 {file}")
+        return decision['path']
+
+    def select_in_background(self, weights, imgsz, device):
+        """在后台线程中选择（同一结果文件只启动一个线程），结果下次启动时使用"""
+        file = self.decision_path(weights, imgsz)
+        with self._running_lock:
+            if file in self._running:
+                return
+            self._running.add(file)
+
+        def worker():
+            try:
+                self.select(weights, imgsz, device)
+            except Exception as e:
+                print(f"后台推理后端选择失败: {e}")
+            finally:
+                with self._running_lock:
+                    self._running.discard(file)
+
+        threading.Thread(target=worker, name='BackendSelector', daemon=True).start()
+        print("尚未选择推理后端，本次使用 .pt 模型，后台测速完成后下次启动生效")
+
+    def get(self, weights, imgsz, device, half=False):
+        """
+        返回最快后端的模型路径（接口与 ModelCache.get 相同，可以作为 InferenceServer 的 model_cache 使用）
+
+        参数:
+            weights (str): .pt 权重路径
+            imgsz (list): 推理尺寸 [h, w]
+            device (torch.device): 推理设备，只在CPU上选择后端
+        返回:
+            str: 模型路径；还没有选择结果且 background=True 时返回原 .pt 路径
+        """
+        if device.type != 'cpu' or half:
+            return self.fallback.get(weights, imgsz, device, half) if self.fallback is not None else weights
+        if Path(weights).suffix.lower() != '.pt' or not os.path.exists(weights):
+            return weights
+        try:
+            file = self.decision_path(weights, imgsz)
+            if file.exists():
+                decision = json.loads(file.read_text())
+                if (decision.get('cpu') == cpu_name() and decision.get('torch') == torch.__version__
+                        and decision['backend'] in self.backends
+                        and os.path.exists(decision['path'])
+                        and not self.int8_changed(decision, weights, imgsz)):
+                    print(f"使用已选择的推理后端 {decision['backend']}: {decision['path']}")
+                    return decision['path']
+            if self.background:
+                self.select_in_background(weights, imgsz, device)
+                return weights
+            return self.select(weights, imgsz, device)
+        except Exception as e:
+            print(f"推理后端选择失败，使用PyTorch: {e}")
+            return weights
+
+
+# 测试代码
+if __name__ == "__main__":
+    ROOT = Path(__file__).resolve().parents[1]
+    if str(ROOT) not in sys.path:
+        sys.path.append(str(ROOT))
+
+    weights = sys.argv[1] if len(sys.argv) > 1 else str(ROOT / 'weights/best.pt')
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    selector = BackendSelector(ROOT / 'cache/models', batch=batch, runs=10, background=False)
+    print(f"CPU: {cpu_name()}，可用后端: {selector.backends}")
+    path = selector.get(weights, [640, 640], torch.device('cpu'))
+    print(json.dumps(json.loads(selector.decision_path(weights, [640, 640]).read_text()), indent=2,
+                     ensure_ascii=False))
@@ -1,19 +1,26 @@
 import cv2
 import torch
 import numpy as np
-from models.yolo import YOLOv5
+from utils.inference_server import InferenceServer
+from utils.postprocess import DetectionPostprocessor
 
 class CameraDetector:
     def __init__(self, config):
         """初始化摄像头检测器"""
         self.config = config
-        self.device = torch.device(config['device'])
+        device = config['device']
+        if str(device).startswith('cuda') and not torch.cuda.is_available():
+            device = 'cpu'
         
-        # 初始化YOLOv5模型
+        # 使用共享推理服务，与其他视频源共用同一个YOLOv5模型
+        # NMS阈值只在首次创建服务时生效，后处理再按本检测器的置信度阈值过滤一次
         weights_path = f"{config['weights_path']}/yolov5{config['model_size']}.pt"
-        self.model = YOLOv5(weights_path, self.device)
-        self.model.conf = config['conf_threshold']
-        self.model.iou = config['iou_threshold']
+        self.server = InferenceServer.shared(weights_path, device=device,
+                                             imgsz=config['image_size'],
+                                             conf_thres=config['conf_threshold'],
+                                             iou_thres=config['iou_threshold'])
+        self.source_id = f"detector-{id(self)}"
+        self.postprocessor = DetectionPostprocessor(self.server.names, conf_thres=config['conf_threshold'])
         
         # 初始化摄像头
         self.cap = None
@@ -36,37 +43,29 @@ class CameraDetector:
         self.is_running = False
         if self.cap:
             self.cap.release()
+        if getattr(self, 'server', None) is not None:
+            self.server.unregister(self.source_id)
             
     def detect_frame(self, frame):
         """对单帧图像进行检测"""
         if frame is None:
             return None, []
             
-        # 调整图像大小
-        img = cv2.resize(frame, (self.config['image_size'], self.config['image_size']))
+        # 提交到共享推理服务（服务内部完成letterbox和坐标还原）
+        det = self.server.submit_frame(self.source_id, frame).result(InferenceServer.RESULT_TIMEOUT)
         
-        # 执行检测
-        results = self.model(img)
-        
-        # 处理检测结果
-        detections = []
-        for *xyxy, conf, cls in results.xyxy[0]:
-            x1, y1, x2, y2 = map(int, xyxy)
-            label = self.model.names[int(cls)]
-            confidence = float(conf)
+        # 处理检测结果（筛选在设备上完成，一次拷回主机）
+        detections = self.postprocessor.process(det)['detections']
+        for d in detections:
+            x1, y1, x2, y2 = d['bbox']
+            label = d['label']
             
             # 在图像上绘制边界框
             color = (0, 0, 255) if label == 'fire' else (0, 255, 0)  # 火焰用红色，烟雾用绿色
             cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            cv2.putText(frame, f'{label} {confidence:.2f}',
+            cv2.putText(frame, f'{label} {d["confidence"]:.2f}',
                        (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX,
                        0.5, color, 2)
-                       
-            detections.append({
-                'label': label,
-                'confidence': confidence,
-                'bbox': (x1, y1, x2, y2)
-            })
             
         return frame, detections
         
@@ -75,6 +75,10 @@ def get_default_config():
         'num_workers': 4,                   # 数据加载线程数
         'weights_path': 'weights',          # 权重保存路径
         'logs_path': 'logs',                # 日志保存路径
+        'model_cache': 'torchscript',       # 编译模型缓存格式：torchscript、onnx，留空则每次加载.pt
+        'model_cache_path': 'cache/models', # 编译模型缓存目录
+        'inference_backend': 'auto',        # 推理后端：auto在CPU上后台测速选择，下次启动生效，其他值按model_cache加载
+        'auto_backend_batch': 8,            # 后端测速使用的批大小，与推理服务的最大批大小一致
         
         # 监测区域配置
         'monitor_regions': [
@@ -98,6 +102,13 @@ def get_default_config():
         'gis_api_key': '',                  # GIS API密钥
         'map_center': [39.9, 116.3],        # 地图中心点
         'map_zoom': 8,                      # 地图缩放级别
+        'map_max_points': 2000,             # 地图视野内超过该点数时按网格聚合显示
+        'map_mode': 'auto',                 # 地图模式：online、offline、auto
+        'map_tile_url': '',                 # 离线瓦片的下载地址，留空则只用本地缓存
+        'map_tile_cache': 'cache/tiles.mbtiles',  # 离线瓦片缓存（MBTiles）
+        'map_tile_memory': 512,             # 内存中缓存的瓦片数
+        'map_prefetch_zooms': [],           # 预取瓦片的缩放级别范围，留空不预取
+        'map_prefetch_max': 5000,           # 每次最多预取的瓦片数
         
         # UI配置
         'dark_mode': True,                  # 是否使用暗色模式
@@ -107,5 +118,14 @@ def get_default_config():
         # 告警配置
         'alert_threshold': 0.75,            # 告警阈值
         'alert_methods': ['ui', 'sound'],   # 告警方式：ui界面、声音
-        'alert_interval': 30                # 告警间隔（秒）
+        'alert_interval': 30,               # 告警间隔（秒），窗口内的重复告警合并为一条
+        'alert_burst': 3,                   # 每个区域短时间内最多新增的告警数
+        'alert_rate': 6,                    # 每个区域每分钟补充的告警数
+        'alert_db': 'logs/alerts.db',       # 告警数据库路径
+        'alert_page_size': 200,             # 启动时加载的历史告警条数
+        'alert_table_rows': 10000,          # 告警表格最多保留的告警条数
+        'chart_max_fps': 2,                 # 统计图表每秒最多重绘次数
+        'ui_refresh_fps': 30,               # 界面组件最高刷新帧率
+        'ui_frame_budget_ms': 8,            # 每帧界面刷新的耗时预算（毫秒）
+        'drone_preview_fps': 15             # 无人机预览画面最高帧率
     } 
\ No newline at end of file
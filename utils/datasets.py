@@ -158,7 +158,8 @@ class _RepeatSampler:
 
 class LoadImages:
     # YOLOv5 image/video dataloader, i.e. `python detect.py --source image.jpg/vid.mp4`
-    def __init__(self, path, img_size=640, stride=32, auto=True):
+    def __init__(self, path, img_size=640, stride=32, auto=True, raw=False):
+        # raw=True: return img=None and leave letterboxing to the consumer (e.g. InferenceServer.submit_frame)
         p = str(Path(path).resolve())  # os-agnostic absolute path
         if '*' in p:
             files = sorted(glob.glob(p, recursive=True))  # glob
@@ -180,6 +181,7 @@ class LoadImages:
         self.video_flag = [False] * ni + [True] * nv
         self.mode = 'image'
         self.auto = auto
+        self.raw = raw
         if any(videos):
             self.new_video(videos[0])  # new video
         else:
@@ -220,6 +222,9 @@ class LoadImages:
             assert img0 is not None, f'Image Not Found {path}'
             s = f'image {self.count}/{self.nf} {path}: '
 
+        if self.raw:
+            return path, None, img0, self.cap, s
+
         # Padded resize
         img = letterbox(img0, self.img_size, stride=self.stride, auto=self.auto)[0]
 
@@ -282,10 +287,14 @@ class LoadWebcam:  # for inference
 
 class LoadStreams:
     # YOLOv5 streamloader, i.e. `python detect.py --source 'rtsp://example.com/media.mp4'  # RTSP, RTMP, HTTP streams`
-    def __init__(self, sources='streams.txt', img_size=640, stride=32, auto=True):
+    def __init__(self, sources='streams.txt', img_size=640, stride=32, auto=True, latest=False, raw=False):
+        # latest=True: no fps pacing, __next__ always returns the freshest frame of each stream
+        # raw=True: return img=None and leave letterboxing to the consumer (e.g. InferenceServer.submit_frame)
         self.mode = 'stream'
         self.img_size = img_size
         self.stride = stride
+        self.latest = latest
+        self.raw = raw
 
         if os.path.isfile(sources):
             with open(sources) as f:
@@ -297,6 +306,9 @@ class LoadStreams:
         self.imgs, self.fps, self.frames, self.threads = [None] * n, [0] * n, [0] * n, [None] * n
         self.sources = [clean_str(x) for x in sources]  # clean source names for later
         self.auto = auto
+        self.slots = [None] * n  # (seq, timestamp, frame) per stream, replaced atomically by the reader thread
+        self.last_seq = [0] * n  # last sequence number handed out per stream
+        self.counts = [{'received': 0, 'dropped': 0, 'duplicated': 0, 'stale': 0} for _ in range(n)]
         for i, s in enumerate(sources):  # index, source
             # Start thread to read frames from video stream
             st = f'{i + 1}/{n}: {s}... '
@@ -314,6 +326,7 @@ class LoadStreams:
             self.fps[i] = max((fps if math.isfinite(fps) else 0) % 100, 0) or 30  # 30 FPS fallback
 
             _, self.imgs[i] = cap.read()  # guarantee first frame
+            self.slots[i] = (0, time.time(), self.imgs[i])
             self.threads[i] = Thread(target=self.update, args=([i, cap, s]), daemon=True)
             LOGGER.info(f"{st} Success ({self.frames[i]} frames {w}x{h} at {self.fps[i]:.2f} FPS)")
             self.threads[i].start()
@@ -336,11 +349,13 @@ class LoadStreams:
                 success, im = cap.retrieve()
                 if success:
                     self.imgs[i] = im
+                    self.slots[i] = (n, time.time(), im)  # single reference swap, no lock needed
                 else:
                     LOGGER.warning('WARNING: Video stream unresponsive, please check your IP camera connection.')
                     self.imgs[i] = np.zeros_like(self.imgs[i])
                     cap.open(stream)  # re-open stream if signal was lost
-            time.sleep(1 / self.fps[i])  # wait time
+            if not self.latest:
+                time.sleep(1 / self.fps[i])  # wait time, latest mode is paced by cap.grab() itself
 
     def __iter__(self):
         self.count = -1
@@ -352,8 +367,11 @@ class LoadStreams:
             cv2.destroyAllWindows()
             raise StopIteration
 
+        img0 = self.read_latest() if self.latest else self.imgs.copy()
+        if self.raw:
+            return self.sources, None, img0, None, ''
+
         # Letterbox
-        img0 = self.imgs.copy()
         img = [letterbox(x, self.img_size, stride=self.stride, auto=self.rect and self.auto)[0] for x in img0]
 
         # Stack
@@ -365,6 +383,32 @@ class LoadStreams:
 
         return self.sources, img, img0, None, ''
 
+    def read_latest(self, timeout=None):
+        # Take the freshest frame of every stream, waiting up to one frame period for at least one new frame
+        t_end = time.time() + (timeout if timeout is not None else 1 / max(self.fps))
+        slots = list(self.slots)
+        while all(x[0] <= s for x, s in zip(slots, self.last_seq)) and time.time() < t_end:
+            time.sleep(0.001)
+            slots = list(self.slots)
+
+        now = time.time()
+        for i, (seq, t, _) in enumerate(slots):
+            c, last = self.counts[i], self.last_seq[i]
+            if seq > last:
+                c['received'] += 1
+                c['dropped'] += seq - last - 1  # frames overwritten before being consumed
+            elif self.count:
+                c['duplicated'] += 1  # no new frame since last call
+            if now - t > 2 / self.fps[i]:
+                c['stale'] += 1  # frame older than two frame periods
+            self.last_seq[i] = seq
+        return [x[2] for x in slots]
+
+    def stats(self):
+        # Per-stream frame accounting: received, dropped (camera faster than consumer), duplicated (consumer faster
+        # than camera) and stale (delivered frame older than two frame periods)
+        return {s: dict(c) for s, c in zip(self.sources, self.counts)}
+
     def __len__(self):
         return len(self.sources)  # 1E12 frames = 32 streams at 30 FPS for 30 years
 
@@ -0,0 +1,102 @@
+"""
+多路火情颜色预筛
+
+把所有摄像头的画面缩小后拼成一个批次，一次完成HSV转换和火焰颜色掩码，
+再用积分图统计每个网格块的火焰像素密度，输出候选区域（ROI）。
+只有通过预筛的画面/区域才需要送入YOLO模型确认。
+"""
+import cv2
+import numpy as np
+
+
+class FireScreen:
+    """基于HSV颜色阈值和积分图的批量火情预筛"""
+
+    def __init__(self, size=(160, 120), ratio=0.01, block=8, block_ratio=0.2, pad=1):
+        """
+        参数:
+            size (tuple): 预筛时的缩放尺寸 (宽, 高)
+            ratio (float): 整帧火焰像素占比阈值
+            block (int): 网格块边长（缩放后像素）
+            block_ratio (float): 网格块内火焰像素占比超过该值视为候选块
+            pad (int): 候选区域向外扩展的网格块数
+        """
+        self.size = size
+        self.ratio = ratio
+        self.block = block
+        self.block_ratio = block_ratio
+        self.pad = pad
+        self.batch = np.empty((0, size[1], size[0], 3), dtype=np.uint8)  # 预分配的缩放帧批次
+
+        # 网格块在积分图中的角点坐标
+        w, h = size
+        self.ys = np.arange(0, h + 1, block)
+        self.xs = np.arange(0, w + 1, block)
+
+    def screen(self, frames):
+        """
+        对一批BGR帧做火情预筛
+
+        参数:
+            frames (list[np.ndarray]): 各路摄像头的原始帧（尺寸可以不同）
+        返回:
+            list[dict]: 每帧的 fire 是否通过预筛, ratio 火焰像素占比, rois 原图坐标下的候选区域 [(x1, y1, x2, y2), ...]，
+                通过预筛但火焰像素分散、没有候选块时为整帧
+        """
+        n = len(frames)
+        if not n:
+            return []
+        w, h = self.size
+        if len(self.batch) < n:
+            self.batch = np.empty((n, h, w, 3), dtype=np.uint8)
+        batch = self.batch[:n]
+        for i, frame in enumerate(frames):
+            cv2.resize(frame, (w, h), dst=batch[i], interpolation=cv2.INTER_AREA)
+
+        # 纵向拼接成一张图，一次完成整批的颜色空间转换
+        hsv = cv2.cvtColor(batch.reshape(n * h, w, 3), cv2.COLOR_BGR2HSV).reshape(n, h, w, 3)
+        hue, sat, val = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+        mask = ((hue <= 10) | (hue >= 170)) & (sat >= 120) & (val >= 70)  # 红色和橙色
+
+        # 积分图：ii[:, y, x] 为 mask[:, :y, :x] 的火焰像素数
+        ii = np.zeros((n, h + 1, w + 1), dtype=np.int32)
+        np.cumsum(np.cumsum(mask, axis=1, dtype=np.int32), axis=2, out=ii[:, 1:, 1:])
+        ratios = ii[:, -1, -1] / (h * w)
+
+        # 网格块内的火焰像素数 = 四个角点的积分图差分
+        ys, xs = self.ys, self.xs
+        blocks = ii[:, ys[1:]][:, :, xs[1:]] - ii[:, ys[:-1]][:, :, xs[1:]] \
+            - ii[:, ys[1:]][:, :, xs[:-1]] + ii[:, ys[:-1]][:, :, xs[:-1]]
+        candidates = blocks > self.block_ratio * self.block * self.block
+
+        results = []
+        for i, frame in enumerate(frames):
+            passed = ratios[i] > self.ratio
+            rois = self.rois(candidates[i], frame.shape[:2]) if passed else []
+            if passed and not rois:
+                rois = [(0, 0, frame.shape[1], frame.shape[0])]
+            results.append({'fire': bool(passed), 'ratio': float(ratios[i]), 'rois': rois})
+        return results
+
+    def rois(self, candidates, shape):
+        """把相连的候选网格块合并成原图坐标下的区域"""
+        if not candidates.any():
+            return []
+        num, _, stats, _ = cv2.connectedComponentsWithStats(candidates.astype(np.uint8), connectivity=8)
+        gh, gw = candidates.shape
+        sx, sy = shape[1] / self.size[0] * self.block, shape[0] / self.size[1] * self.block  # 网格块 -> 原图像素
+        rois = []
+        for x, y, bw, bh, _ in stats[1:]:  # 第0个为背景
+            x1, y1 = max(x - self.pad, 0), max(y - self.pad, 0)
+            x2, y2 = min(x + bw + self.pad, gw), min(y + bh + self.pad, gh)
+            rois.append((int(x1 * sx), int(y1 * sy), min(int(x2 * sx), shape[1]), min(int(y2 * sy), shape[0])))
+        return rois
+
+
+if __name__ == "__main__":
+    # 测试代码
+    frames = [np.zeros((480, 640, 3), dtype=np.uint8) for _ in range(9)]
+    frames[3][100:200, 300:400] = (0, 0, 255)  # 红色区域
+    for i, r in enumerate(FireScreen().screen(frames)):
+        if r['fire']:
+            print(i, r)
@@ -0,0 +1,302 @@
+"""
+共享批量推理服务
+
+所有视频源（单路监控、九宫格、无人机）共用同一个模型实例。
+各路线程把预处理好的帧提交到服务队列，推理线程在最大等待时间内
+把同尺寸的帧拼成一个批次统一推理，再把每一路的检测结果分发回去。
+"""
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from queue import Empty, Queue
+
+from utils.lazy import lazy_import
+
+# torch及依赖torch的工具模块在第一次创建推理服务时才导入，界面模块导入本模块时不连带导入torch
+torch = lazy_import('torch')
+general = lazy_import('utils.general')
+preprocess = lazy_import('utils.preprocess')
+torch_utils = lazy_import('utils.torch_utils')
+
+
+class InferenceRequest:
+    """单帧推理请求"""
+    __slots__ = ('source_id', 'im', 'im0', 'im0_shape', 'future', 'submit_time')
+
+    def __init__(self, source_id, im, im0_shape, im0=None):
+        self.source_id = source_id
+        self.im = im  # letterbox后的CHW uint8数组，为None时由服务对im0做letterbox
+        self.im0 = im0  # 原始BGR图像
+        self.im0_shape = im0_shape  # 原始图像尺寸，用于坐标还原
+        self.future = Future()
+        self.submit_time = time.time()
+
+
+class InferenceServer:
+    """进程内共享推理服务，持有唯一的模型并按截止时间动态组批"""
+
+    _instances = {}  # (weights, device) -> InferenceServer
+    _instances_lock = threading.Lock()  # 只保护注册表，不在持有时加载模型
+    _creating = {}  # (weights, device) -> 创建该服务时持有的锁，同一模型只加载一次
+    RESULT_TIMEOUT = 5.0  # 调用方等待单帧结果的最长时间（秒）
+
+    def __init__(self, weights, device=None, imgsz=640, max_batch=8, max_latency=0.01,
+                 conf_thres=0.25, iou_thres=0.45, max_det=1000, warmup=True, model_cache=None):
+        """
+        参数:
+            weights (str): 模型权重路径
+            device (str | torch.device, optional): 推理设备，默认有GPU用GPU
+            imgsz (int | list): 推理尺寸
+            max_batch (int): 单批最大帧数
+            max_latency (float): 首帧入队后最多等待多久凑批（秒）
+            conf_thres/iou_thres/max_det: NMS参数，对该服务的所有调用方生效
+            warmup (bool): 是否在构造时预热，分阶段启动时由启动编排器单独调用 warmup()
+            model_cache (ModelCache | BackendSelector, optional): 编译模型缓存或CPU后端选择，
+                .pt 权重改为加载其返回的导出模型
+        """
+        from models.common import DetectMultiBackend  # 延迟导入，避免循环依赖
+
+        self.device = self.resolve_device(device)
+        self.half = self.device.type != 'cpu'  # 仅在GPU上使用半精度
+        imgsz = [imgsz, imgsz] if isinstance(imgsz, int) else list(imgsz)
+        self.weights = weights
+        if model_cache is not None:
+            # 导出模型的输入尺寸在导出时就固定了，这里按最常见的32步长对齐
+            self.weights = model_cache.get(weights, general.check_img_size(imgsz, s=32), self.device, self.half)
+        self.model = DetectMultiBackend(self.weights, device=self.device)
+        self.stride = self.model.stride
+        self.imgsz = general.check_img_size(imgsz, s=self.stride)
+        if self.weights != weights and self.imgsz != general.check_img_size(imgsz, s=32):
+            print(f"模型步长为 {self.stride}，与导出模型的输入尺寸不符，改为加载原权重")
+            self.weights = weights
+            self.model = DetectMultiBackend(weights, device=self.device)
+        self.names = self.model.names
+        self.pt = getattr(self.model, 'pt', True)
+
+        if self.half:
+            self.model.half()
+        else:
+            self.model.float()
+
+        # 确保Detect层有inplace属性
+        if self.pt:
+            from models.yolo import Detect
+            for m in self.model.model.modules():
+                if isinstance(m, Detect) and not hasattr(m, 'inplace'):
+                    m.inplace = True
+
+        self.max_batch = 1 if getattr(self.model, 'xml', False) else max_batch  # OpenVINO IR按批大小1导出
+        self.max_latency = max_latency
+        self.conf_thres = conf_thres
+        self.iou_thres = iou_thres
+        self.max_det = max_det
+        self.preprocessor = preprocess.Preprocessor(self.imgsz, self.device, half=self.half,
+                                                    max_batch=self.max_batch)
+
+        self.sources = {}  # source_id -> 统计信息
+        self.batch_count = 0
+        self.frame_count = 0
+        self.lock = threading.Lock()
+        self.state_lock = threading.Lock()  # 保证停止后不再有请求入队
+        self.queue = Queue()
+
+        if warmup:
+            self.warmup()
+
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name='InferenceServer', daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def resolve_device(device=None):
+        """把'0'、'cpu'、torch.device等写法统一成torch.device"""
+        if isinstance(device, torch.device):
+            return device
+        if device is None:
+            device = '0' if torch.cuda.is_available() else 'cpu'
+        return torch_utils.select_device(str(device))
+
+    @classmethod
+    def shared(cls, weights, device=None, **kwargs):
+        """
+        获取（必要时创建）指定权重和设备对应的共享推理服务
+
+        NMS阈值（conf_thres/iou_thres/max_det）在服务创建时固定，由所有调用方共用；
+        服务已存在时传入不同的阈值不会生效，只打印警告，需要更高置信度的调用方应在后处理中自行过滤
+        """
+        device = cls.resolve_device(device)
+        key = (str(Path(weights).resolve()), str(device))
+        with cls._instances_lock:
+            server = cls._instances.get(key)
+            if server is not None and server.running:
+                server.check_thresholds(kwargs)
+                return server
+            creating = cls._creating.setdefault(key, threading.Lock())
+        # 加载模型期间不占用注册表锁，current()等调用不会被阻塞
+        with creating:
+            with cls._instances_lock:
+                server = cls._instances.get(key)
+                if server is not None and server.running:
+                    server.check_thresholds(kwargs)
+                    return server
+            server = cls(weights, device=device, **kwargs)
+            with cls._instances_lock:
+                cls._instances[key] = server
+            return server
+
+    def check_thresholds(self, kwargs):
+        """复用已有服务时，调用方要求的NMS阈值与服务不一致则警告"""
+        for name in ('conf_thres', 'iou_thres', 'max_det'):
+            if name in kwargs and kwargs[name] != getattr(self, name):
+                print(f"推理服务已存在，{name}={kwargs[name]} 不生效，沿用 {getattr(self, name)}")
+
+    @classmethod
+    def current(cls):
+        """返回任意一个已在运行的共享推理服务，没有则返回None（不会触发模型加载）"""
+        with cls._instances_lock:
+            for server in cls._instances.values():
+                if server.running:
+                    return server
+        return None
+
+    def warmup(self):
+        """预热模型（仅GPU）"""
+        if self.device.type != 'cpu':
+            dummy = torch.zeros(1, 3, *self.imgsz, device=self.device)
+            dummy = dummy.half() if self.half else dummy.float()
+            with torch.no_grad():
+                for _ in range(3):
+                    self.model(dummy)
+            torch.cuda.empty_cache()
+
+    def register(self, source_id):
+        """登记一路视频源"""
+        with self.lock:
+            self.sources.setdefault(source_id, {'frames': 0, 'latency': 0.0})
+
+    def unregister(self, source_id):
+        """注销视频源"""
+        with self.lock:
+            self.sources.pop(source_id, None)
+
+    def submit(self, source_id, im, im0_shape, im0=None):
+        """提交一帧已经letterbox的CHW uint8图像，返回Future，结果为原图坐标下的(n,6)检测张量"""
+        if source_id not in self.sources:
+            self.register(source_id)
+        request = InferenceRequest(source_id, im, im0_shape, im0)
+        with self.state_lock:
+            if not self.running:
+                raise RuntimeError('推理服务已停止')
+            self.queue.put(request)
+        return request.future
+
+    def submit_frame(self, source_id, im0):
+        """提交一帧原始BGR图像，由推理线程按固定尺寸直接letterbox进预分配缓冲区，便于不同视频源组批"""
+        return self.submit(source_id, None, im0.shape, im0)
+
+    def infer(self, source_id, im, im0_shape, timeout=RESULT_TIMEOUT):
+        """同步推理，阻塞到该帧所在批次完成"""
+        return self.submit(source_id, im, im0_shape).result(timeout)
+
+    def _collect(self):
+        """取出一个批次：首帧到达后在max_latency内尽量凑满max_batch"""
+        try:
+            first = self.queue.get(timeout=0.1)
+        except Empty:
+            return []
+        batch = [first]
+        deadline = first.submit_time + self.max_latency
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.time()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _loop(self):
+        """推理线程主循环"""
+        while self.running:
+            batch = self._collect()
+            if not batch:
+                continue
+            # 只有尺寸相同的帧才能拼成一个张量
+            groups = {}
+            for request in batch:
+                shape = request.im.shape[1:] if request.im is not None else self.imgsz
+                groups.setdefault(tuple(shape), []).append(request)
+            for shape, requests in groups.items():
+                try:
+                    self._run_batch(requests, shape)
+                except Exception as e:
+                    print(f"批量推理出错: {str(e)}")
+                    for request in requests:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+
+        self.fail_pending()
+
+    def fail_pending(self):
+        """服务停止后，通知仍在队列中等待的请求"""
+        while True:
+            try:
+                request = self.queue.get_nowait()
+            except Empty:
+                break
+            if not request.future.done():
+                request.future.set_exception(RuntimeError('推理服务已停止'))
+
+    def _run_batch(self, requests, shape):
+        """对一组同尺寸的请求执行一次批量推理"""
+        # 写入预分配缓冲区后整体上传，避免逐帧分配
+        for i, request in enumerate(requests):
+            if request.im is None:
+                self.preprocessor.letterbox_into(i, request.im0)
+                request.im0 = None
+            else:
+                self.preprocessor.copy_into(i, request.im)
+        im = self.preprocessor.upload(len(requests), shape)
+
+        with torch.no_grad():
+            pred = self.model(im, augment=False)
+            if isinstance(pred, (list, tuple)):
+                pred = pred[0]
+        pred = general.non_max_suppression(pred, self.conf_thres, self.iou_thres, None, False, max_det=self.max_det)
+
+        now = time.time()
+        with self.lock:
+            self.batch_count += 1
+            self.frame_count += len(requests)
+            for request in requests:
+                stats = self.sources.get(request.source_id)
+                if stats is not None:
+                    stats['frames'] += 1
+                    stats['latency'] = now - request.submit_time
+
+        for request, det in zip(requests, pred):
+            if len(det):
+                det[:, :4] = general.scale_coords(im.shape[2:], det[:, :4], request.im0_shape).round()
+            request.future.set_result(det)
+
+    def get_stats(self):
+        """获取服务统计：平均批大小及各路帧数、最近一次延迟"""
+        with self.lock:
+            return {
+                'batches': self.batch_count,
+                'frames': self.frame_count,
+                'avg_batch': self.frame_count / self.batch_count if self.batch_count else 0.0,
+                'sources': {k: dict(v) for k, v in self.sources.items()},
+            }
+
+    def stop(self):
+        """停止推理线程，队列中剩余的请求以异常结束"""
+        with self.state_lock:
+            self.running = False  # 此后submit直接拒绝，不会再有请求入队
+        if self.thread.is_alive() and threading.current_thread() is not self.thread:
+            self.thread.join(timeout=1)
+        self.fail_pending()  # 推理线程退出前或join超时时仍可能留有请求
+        with InferenceServer._instances_lock:
+            for key, server in list(InferenceServer._instances.items()):
+                if server is self:
+                    del InferenceServer._instances[key]
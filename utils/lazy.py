@@ -0,0 +1,159 @@
+"""
+延迟导入和导入耗时分析
+
+lazy_import(name) 返回模块代理，第一次访问属性时才真正导入模块（线程安全），
+用于 torch、推理后端等只在推理时才需要的重量级模块：界面模块导入时不再连带导入它们，
+导入发生在第一次使用时（通常是启动编排器的后台阶段或第一次打开对应标签页）。
+每个代理记录首次导入的耗时。
+
+profile_imports() 在子进程中用 python -X importtime 导入指定模块，统计各模块的累计导入耗时
+以及哪些重量级模块被连带导入，用于检查冷启动时的导入开销。
+"""
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# 冷启动时应当避免连带导入的重量级模块
+HEAVY_MODULES = ['torch', 'torchvision', 'pandas', 'tensorflow', 'onnxruntime', 'openvino', 'tensorrt',
+                 'coremltools', 'PyQt5.QtWebEngineWidgets', 'PyQt5.QtChart', 'psutil']
+
+LOAD_TIMES = {}  # 模块名 -> 通过代理首次导入的耗时（秒）
+
+
+class LazyModule(types.ModuleType):
+    """模块代理：第一次访问属性时导入真正的模块，之后直接转发（取到的属性缓存在代理上）"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with self.__dict__['_lock']:
+                module = self.__dict__['_module']
+                if module is None:
+                    name = self.__name__
+                    cached = name in sys.modules
+                    t0 = time.time()
+                    module = importlib.import_module(name)
+                    if not cached:
+                        LOAD_TIMES[name] = time.time() - t0
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        self.__dict__[attr] = value
+        return value
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name):
+    """
+    返回模块代理（模块已导入时直接返回模块本身）
+
+    参数:
+        name (str): 模块名，如 'torch'、'utils.general'
+    返回:
+        module | LazyModule
+    """
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+def is_loaded(module):
+    """模块（或代理）对应的真实模块是否已经导入"""
+    if isinstance(module, LazyModule):
+        return module.__dict__['_module'] is not None or module.__name__ in sys.modules
+    return True
+
+
+def profile_imports(modules, python=None):
+    """
+    在新的解释器中导入指定模块，统计导入耗时
+
+    参数:
+        modules (list[str]): 要导入的模块
+        python (str, optional): 解释器路径，默认为当前解释器
+    返回:
+        dict: {'total_ms': 总耗时, 'modules': {模块名: 累计耗时ms}（按耗时降序）,
+               'heavy': 被连带导入的重量级模块, 'error': 导入失败时的错误信息}
+    """
+    code = ''.join(f"import {m}\n" for m in modules)
+    code += f"import sys\nprint(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get('PYTHONPATH')])))
+    t0 = time.time()
+    result = subprocess.run([python or sys.executable, '-X', 'importtime', '-c', code], cwd=str(ROOT), env=env,
+                            capture_output=True, text=True)
+    total = (time.time() - t0) * 1000
+
+    # 每行格式：import time: self [us] | cumulative | imported package（包名前的缩进表示嵌套层级）
+    times, errors = {}, []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            errors.append(line)
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        times[name] = max(times.get(name, 0), int(parts[1]) / 1000)
+    output = result.stdout.strip().splitlines()
+    heavy = output[-1].split(',') if result.returncode == 0 and output else []
+    return {'total_ms': round(total, 1),
+            'modules': dict(sorted(times.items(), key=lambda kv: -kv[1])),
+            'heavy': [m for m in heavy if m],
+            'error': '\n'.join(errors[-5:]) if result.returncode != 0 else None}
+
+
+def import_report(modules, top=15, python=None):
+    """
+    导入耗时报告（文本）
+
+    参数:
+        modules (list[str]): 要分析的模块，逐个在独立的解释器中导入
+        top (int): 每个模块列出耗时最多的前几个依赖
+    """
+    lines = []
+    for name in modules:
+        profile = profile_imports([name], python)
+        if profile['error']:
+            lines.append(f"{name}: 导入失败\n    {profile['error'].splitlines()[-1]}")
+            continue
+        own = profile['modules'].get(name, 0.0)
+        lines.append(f"{name}: {own:.0f} ms（解释器启动+导入共 {profile['total_ms']:.0f} ms）")
+        lines.append(f"    连带导入的重量级模块: {', '.join(profile['heavy']) or '无'}")
+        deps = [(m, t) for m, t in profile['modules'].items() if m != name and '.' not in m][:top]
+        for m, t in deps:
+            lines.append(f"    {t:8.1f} ms  {m}")
+    if LOAD_TIMES:
+        lines.append("本进程中延迟导入的模块:")
+        for name, t in sorted(LOAD_TIMES.items(), key=lambda kv: -kv[1]):
+            lines.append(f"    {t * 1000:8.1f} ms  {name}")
+    return '\n'.join(lines)
+
+
+# 测试代码
+if __name__ == "__main__":
+    decimal = lazy_import('decimal')
+    print(decimal, is_loaded(decimal))
+    print(decimal.Decimal('1.10') + decimal.Decimal('2.205'), decimal)
+
+    modules = sys.argv[1:] or ['ui.pages.main_window', 'ui.components.grid_camera_view',
+                               'ui.components.camera_view', 'utils.inference_server']
+    print(import_report(modules, top=10))
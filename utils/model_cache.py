@@ -0,0 +1,267 @@
+"""
+编译模型缓存
+
+第一次加载 .pt 权重时，把融合过BN、切换到eval模式并转换好精度的模型导出为 TorchScript（或ONNX），
+按 权重SHA256 + 输入尺寸 + 设备 + 精度 保存到缓存目录。以后启动直接加载导出的模型，
+跳过反序列化完整checkpoint、fuse() 和重新建图。导出后会用随机输入比较导出模型和原模型的输出，
+超出容差的产物不会被使用。导出的文件可以直接交给 DetectMultiBackend 加载。
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from utils.lazy import lazy_import
+
+torch = lazy_import('torch')
+
+FORMATS = {'torchscript': '.torchscript', 'onnx': '.onnx'}
+
+
+def file_sha256(path, chunk=1 << 20):
+    """计算文件的SHA256"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_fused_model(weights, device, half=False):
+    """
+    按 attempt_load 的方式加载 .pt 权重（融合BN、eval模式），并转换精度
+
+    返回:
+        nn.Module: 可直接推理的模型
+    """
+    from models.experimental import attempt_load
+    from models.yolo import Detect
+
+    model = attempt_load(weights, map_location=device)
+    for m in model.modules():
+        if isinstance(m, Detect):
+            m.inplace = getattr(m, 'inplace', True)
+    model = model.half() if half else model.float()
+    for p in model.parameters():
+        p.requires_grad = False
+    return model.to(device).eval()
+
+
+def model_metadata(model):
+    """导出时写入的模型信息，格式与 DetectMultiBackend 读取的 config.txt 一致"""
+    names = model.module.names if hasattr(model, 'module') else model.names
+    return {'stride': max(int(model.stride.max()), 32), 'names': list(names)}
+
+
+def export_torchscript(model, im, file):
+    """用示例输入追踪模型并保存为TorchScript"""
+    with torch.no_grad():
+        ts = torch.jit.trace(model, im, strict=False)
+    extra_files = {'config.txt': json.dumps(model_metadata(model))}
+    ts.save(str(file), _extra_files=extra_files)
+    return file
+
+
+def export_onnx(model, im, file, opset=12, dynamic_batch=True):
+    """导出ONNX（第一维批大小可变，便于推理服务组批）"""
+    import onnx
+
+    dynamic = {'images': {0: 'batch'}, 'output': {0: 'batch'}} if dynamic_batch else None
+    with torch.no_grad():
+        torch.onnx.export(model, im, str(file), verbose=False, opset_version=opset,
+                          training=torch.onnx.TrainingMode.EVAL, do_constant_folding=True,
+                          input_names=['images'], output_names=['output'], dynamic_axes=dynamic)
+    model_onnx = onnx.load(str(file))
+    onnx.checker.check_model(model_onnx)
+    for k, v in model_metadata(model).items():
+        meta = model_onnx.metadata_props.add()
+        meta.key, meta.value = k, json.dumps(v)
+    onnx.save(model_onnx, str(file))
+    return file
+
+
+def compare_outputs(ref, out, atol, rtol):
+    """
+    比较导出模型和原模型的输出
+
+    返回:
+        (bool, float): 是否在容差内, 最大绝对误差
+    """
+    ref = ref.float().cpu().numpy() if isinstance(ref, torch.Tensor) else np.asarray(ref, dtype=np.float32)
+    out = out.float().cpu().numpy() if isinstance(out, torch.Tensor) else np.asarray(out, dtype=np.float32)
+    if ref.shape != out.shape:
+        return False, float('inf')
+    err = np.abs(ref - out)
+    return bool(np.all(err <= atol + rtol * np.abs(ref))), float(err.max()) if err.size else 0.0
+
+
+class ModelCache:
+    """按权重哈希、输入尺寸、设备和精度缓存导出的模型"""
+
+    # 导出模型与原模型输出（框坐标为像素、置信度为0-1）的容差
+    TOLERANCE = {'fp32': (1e-2, 1e-3), 'fp16': (5e-1, 1e-2)}  # 精度 -> (atol, rtol)
+
+    def __init__(self, cache_dir='cache/models', fmt='torchscript', validate_batches=(1, 2)):
+        """
+        参数:
+            cache_dir (str): 缓存目录
+            fmt (str): 导出格式，torchscript 或 onnx
+            validate_batches (tuple): 校验时使用的批大小（推理服务会把多路视频组成批次）
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的模型缓存格式: {fmt}，可选 {list(FORMATS)}")
+        self.cache_dir = Path(cache_dir)
+        self.fmt = fmt
+        self.validate_batches = validate_batches
+        self.hashes_file = self.cache_dir / 'hashes.json'
+
+    @classmethod
+    def from_config(cls, config):
+        """根据配置创建缓存，未配置 model_cache 时返回None"""
+        fmt = (config or {}).get('model_cache')
+        if not fmt:
+            return None
+        return cls(config.get('model_cache_path', 'cache/models'), fmt)
+
+    def weights_hash(self, weights):
+        """权重文件的SHA256（按路径、大小和修改时间缓存，避免每次启动都读完整个权重文件）"""
+        stat = os.stat(weights)
+        key = f"{Path(weights).resolve()}|{stat.st_size}|{stat.st_mtime_ns}"
+        try:
+            hashes = json.loads(self.hashes_file.read_text())
+        except (OSError, ValueError):
+            hashes = {}
+        if key not in hashes:
+            hashes[key] = file_sha256(weights)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self.hashes_file.write_text(json.dumps(hashes, indent=2))
+        return hashes[key]
+
+    def artifact_path(self, weights, imgsz, device, half):
+        """缓存文件路径：<权重名>-<SHA前16位>-<高>x<宽>-<设备>-<精度>.<格式>"""
+        device = f"{device.type}{device.index or 0}" if device.type == 'cuda' else device.type
+        name = (f"{Path(weights).stem}-{self.weights_hash(weights)[:16]}-{imgsz[0]}x{imgsz[1]}-"
+                f"{device}-{'fp16' if half else 'fp32'}")
+        return self.cache_dir / (name + FORMATS[self.fmt])
+
+    def load_artifact(self, file, device):
+        """加载导出的模型，返回可调用对象 f(im) -> 输出张量"""
+        if self.fmt == 'torchscript':
+            model = torch.jit.load(str(file), map_location=device).eval()
+            return lambda im: model(im)[0]
+        import onnxruntime
+        providers = ['CUDAExecutionProvider', 'CPUExecutionProvider'] if device.type == 'cuda' else \
+            ['CPUExecutionProvider']
+        session = onnxruntime.InferenceSession(str(file), providers=providers)
+        return lambda im: session.run(['output'], {'images': im.cpu().numpy()})[0]
+
+    def validate(self, model, file, imgsz, device, half):
+        """
+        用随机输入比较导出模型与原模型的输出
+
+        返回:
+            dict: 各批大小下的最大绝对误差和是否通过
+        """
+        atol, rtol = self.TOLERANCE['fp16' if half else 'fp32']
+        run = self.load_artifact(file, device)
+        results = {'atol': atol, 'rtol': rtol, 'passed': True, 'max_error': {}}
+        torch.manual_seed(0)
+        for batch in self.validate_batches:
+            im = torch.rand(batch, 3, *imgsz, device=device)
+            im = im.half() if half else im
+            with torch.no_grad():
+                ref = model(im)[0]
+                out = run(im)
+            ok, err = compare_outputs(ref, out, atol, rtol)
+            results['max_error'][batch] = err
+            results['passed'] = results['passed'] and ok
+        return results
+
+    def build(self, weights, imgsz, device, half, file):
+        """导出并校验模型，失败时删除产物并返回None"""
+        t0 = time.time()
+        model = load_fused_model(weights, device, half)
+        im = torch.zeros(1, 3, *imgsz, device=device)
+        im = im.half() if half else im
+        with torch.no_grad():
+            model(im)  # 先运行一次，生成Detect层的网格
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = file.with_name(file.stem + '.tmp' + file.suffix)
+        try:
+            if self.fmt == 'torchscript':
+                export_torchscript(model, im, tmp)
+            else:
+                export_onnx(model, im, tmp)
+            validation = self.validate(model, tmp, imgsz, device, half)
+        except Exception as e:
+            print(f"模型导出失败（{self.fmt}）: {e}")
+            tmp.unlink(missing_ok=True)
+            return None
+        if not validation['passed']:
+            print(f"导出模型与原模型输出不一致，不使用缓存: 最大误差 {validation['max_error']}")
+            tmp.unlink(missing_ok=True)
+            return None
+        os.replace(tmp, file)
+        info = {'weights': str(Path(weights).resolve()), 'sha256': self.weights_hash(weights),
+                'imgsz': list(imgsz), 'device': str(device), 'half': half, 'format': self.fmt,
+                'torch': torch.__version__, 'export_s': round(time.time() - t0, 2), 'validation': validation}
+        file.with_suffix('.json').write_text(json.dumps(info, indent=2))
+        print(f"已缓存导出模型 {file}（{info['export_s']}s，最大误差 {validation['max_error']}）")
+        return file
+
+    def get(self, weights, imgsz, device, half=False):
+        """
+        返回 weights 对应的导出模型路径，没有缓存时导出并校验；导出失败返回原权重路径
+
+        参数:
+            weights (str): .pt 权重路径
+            imgsz (list): 推理尺寸 [h, w]（已对齐到步长）
+            device (torch.device): 推理设备
+            half (bool): 是否半精度
+        返回:
+            str: 可交给 DetectMultiBackend 的模型路径
+        """
+        if Path(weights).suffix.lower() != '.pt' or not os.path.exists(weights):
+            return weights
+        try:
+            file = self.artifact_path(weights, imgsz, device, half)
+            info_file = file.with_suffix('.json')
+            if file.exists() and info_file.exists():
+                info = json.loads(info_file.read_text())
+                if info.get('torch') == torch.__version__:
+                    return str(file)
+                print(f"导出模型由 torch {info.get('torch')} 生成，重新导出")
+            file = self.build(weights, imgsz, device, half, file)
+        except Exception as e:
+            print(f"模型缓存不可用: {e}")
+            file = None
+        return str(file) if file is not None else weights
+
+
+# 测试代码
+if __name__ == "__main__":
+    import sys
+
+    ROOT = Path(__file__).resolve().parents[1]
+    if str(ROOT) not in sys.path:
+        sys.path.append(str(ROOT))
+    from models.common import DetectMultiBackend
+    from utils.torch_utils import select_device
+
+    weights = sys.argv[1] if len(sys.argv) > 1 else str(ROOT / 'weights/best.pt')
+    device = select_device('')
+    half = device.type != 'cpu'
+    cache = ModelCache(ROOT / 'cache/models', sys.argv[2] if len(sys.argv) > 2 else 'torchscript')
+
+    for attempt in ('首次', '再次'):
+        t0 = time.time()
+        path = cache.get(weights, [640, 640], device, half)
+        model = DetectMultiBackend(path, device=device)
+        print(f"{attempt}加载 {path}: {time.time() - t0:.2f}s")
+
+    t0 = time.time()
+    model = DetectMultiBackend(weights, device=device)
+    print(f"直接加载 .pt（含fuse）: {time.time() - t0:.2f}s")
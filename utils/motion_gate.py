@@ -0,0 +1,80 @@
+"""
+运动门控推理调度
+
+每路视频维护一个缩小的灰度背景模型，用帧差计算运动分数；
+画面静止时跳过推理，但距上次推理超过最大间隔时必须推理一次。
+"""
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """单路视频的运动检测与推理门控"""
+
+    def __init__(self, threshold=0.005, max_interval=2.0, size=(64, 48), diff=15, alpha=0.05):
+        """
+        参数:
+            threshold (float): 变化像素占比超过该值视为有运动
+            max_interval (float): 静止画面的最长推理间隔（秒）
+            size (tuple): 计算运动分数时的缩放尺寸 (宽, 高)
+            diff (int): 像素灰度变化超过该值视为变化像素
+            alpha (float): 背景更新速率，适应光照缓慢变化
+        """
+        self.threshold = threshold
+        self.max_interval = max_interval
+        self.size = size
+        self.diff = diff
+        self.alpha = alpha
+        self.background = None  # float32背景模型
+        self.small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self.last_infer = 0
+        self.score = 0.0
+        self.frames = 0
+        self.inferred = 0
+
+    def motion_score(self, frame):
+        """计算当前帧相对背景的变化像素占比，并更新背景"""
+        cv2.resize(frame, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        if self.background is None:
+            self.background = gray.astype(np.float32)
+            return 1.0
+        changed = cv2.absdiff(gray, self.background.astype(np.uint8)) > self.diff
+        cv2.accumulateWeighted(gray, self.background, self.alpha)
+        return float(changed.mean())
+
+    def should_infer(self, frame):
+        """返回当前帧是否需要推理"""
+        now = time.time()
+        self.frames += 1
+        self.score = self.motion_score(frame)
+        if self.score > self.threshold or now - self.last_infer >= self.max_interval:
+            self.last_infer = now
+            self.inferred += 1
+            return True
+        return False
+
+    def stats(self):
+        """帧数、推理次数、跳过比例和最近的运动分数"""
+        return {'frames': self.frames, 'inferred': self.inferred,
+                'skip_ratio': 1 - self.inferred / self.frames if self.frames else 0.0, 'score': self.score}
+
+
+class MotionScheduler:
+    """按视频源管理多路运动门控"""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs  # 传给每路MotionGate的参数
+        self.gates = {}  # 视频源 -> MotionGate
+
+    def should_infer(self, source, frame):
+        gate = self.gates.get(source)
+        if gate is None:
+            gate = self.gates[source] = MotionGate(**self.kwargs)
+        return gate.should_infer(frame)
+
+    def stats(self):
+        """各路视频的跳过比例"""
+        return {source: gate.stats() for source, gate in self.gates.items()}
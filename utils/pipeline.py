@@ -0,0 +1,121 @@
+"""
+视频处理流水线工具
+
+解码、推理、渲染三个阶段之间用有界队列连接，队列满时丢弃最旧的帧，
+保证下游总是处理最新画面；每个阶段记录耗时和队列深度，便于定位瓶颈。
+"""
+import threading
+import time
+from collections import deque
+
+
+class DropOldestQueue:
+    """有界队列：默认满时丢弃最旧元素而不是阻塞生产者"""
+
+    def __init__(self, maxsize=2):
+        self.items = deque()
+        self.maxsize = maxsize
+        self.dropped = 0  # 因队列满被丢弃的元素数
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def put(self, item, block=False):
+        """放入元素
+
+        block为False时队列满则丢弃最旧的一个（实时流）；为True时等待消费者腾出空间（本地文件，
+        不丢帧）。队列已关闭时返回False。
+        """
+        with self.cond:
+            if block:
+                while len(self.items) >= self.maxsize and not self.closed:
+                    self.cond.wait()
+            elif len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            if self.closed:
+                return False
+            self.items.append(item)
+            self.cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """取出最旧元素，超时或队列已关闭且为空时返回None"""
+        with self.cond:
+            if not self.items and not self.closed:
+                self.cond.wait(timeout)
+            if self.items:
+                item = self.items.popleft()
+                self.cond.notify_all()  # 唤醒等待空间的生产者
+                return item
+            return None
+
+    def finished(self):
+        """生产者已关闭且元素已取完"""
+        with self.cond:
+            return self.closed and not self.items
+
+    def close(self):
+        """关闭队列，唤醒所有等待的消费者"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def __len__(self):
+        return len(self.items)
+
+
+class StageStats:
+    """单个流水线阶段的统计：处理帧数、平均耗时（指数滑动平均）"""
+
+    def __init__(self, name, alpha=0.1):
+        self.name = name
+        self.alpha = alpha
+        self.count = 0
+        self.latency = 0.0  # 秒
+        self.lock = threading.Lock()
+
+    def record(self, start):
+        """记录一次处理，start为处理开始时间"""
+        dt = time.time() - start
+        with self.lock:
+            self.latency = dt if self.count == 0 else self.latency + self.alpha * (dt - self.latency)
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {'count': self.count, 'latency_ms': self.latency * 1000}
+
+
+class PipelineMonitor:
+    """汇总各阶段耗时与队列深度"""
+
+    def __init__(self, stages, queues):
+        """
+        参数:
+            stages (list[str]): 阶段名称
+            queues (dict): 名称 -> DropOldestQueue
+        """
+        self.stages = {name: StageStats(name) for name in stages}
+        self.queues = queues
+
+    def record(self, stage, start):
+        self.stages[stage].record(start)
+
+    def snapshot(self):
+        """返回 {'stages': {阶段: {...}}, 'queues': {队列: {'depth', 'dropped'}}}"""
+        return {
+            'stages': {name: s.snapshot() for name, s in self.stages.items()},
+            'queues': {name: {'depth': len(q), 'dropped': q.dropped} for name, q in self.queues.items()},
+        }
+
+    @staticmethod
+    def format(snapshot):
+        """格式化成一行文字，用于状态栏提示"""
+        stages = ' | '.join(f"{k}: {v['latency_ms']:.1f}ms" for k, v in snapshot['stages'].items())
+        queues = ' | '.join(f"{k}: {v['depth']} (丢弃 {v['dropped']})" for k, v in snapshot['queues'].items())
+        lines = [stages, queues]
+        for name, c in snapshot.get('streams', {}).items():
+            lines.append(f"{name}: 接收 {c['received']} 丢帧 {c['dropped']} 重复 {c['duplicated']} 过期 {c['stale']}")
+        for name, m in snapshot.get('motion', {}).items():
+            lines.append(f"视频流 {name}: 跳过推理 {m['skip_ratio']:.0%} (运动分数 {m['score']:.3f})")
+        return '\n'.join(lines)
@@ -0,0 +1,83 @@
+"""
+检测结果后处理
+
+NMS之后的类别计数、置信度/火焰筛选都在设备上以张量运算完成，
+结果打包成一个张量一次性拷回主机，再生成界面使用的检测字典。
+"""
+import numpy as np
+
+from utils.lazy import lazy_import
+
+torch = lazy_import('torch')  # 第一次创建后处理器时才导入
+
+
+class DetectionPostprocessor:
+    """把 (n, 6) 检测张量 [x1, y1, x2, y2, conf, cls] 转换成计数、检测字典和火焰标志"""
+
+    def __init__(self, names, conf_thres=0.25, fire_thres=0.5, fire_classes=('fire',)):
+        """
+        参数:
+            names (list | dict): 类别名称
+            conf_thres (float): 输出检测框的置信度阈值
+            fire_thres (float): 判定为火焰的置信度阈值
+            fire_classes (tuple): 视为火焰的类别名称（不区分大小写）
+        """
+        if isinstance(names, dict):
+            names = [names[i] for i in sorted(names)]
+        self.names = np.array(names, dtype=object)
+        self.nc = len(names)
+        self.conf_thres = conf_thres
+        self.fire_thres = fire_thres
+        fire_classes = {c.lower() for c in fire_classes}
+        self.fire_cpu = torch.tensor([n.lower() in fire_classes for n in names], dtype=torch.bool)
+        self.fire_mask = {}  # device -> 火焰类别掩码
+
+    def is_fire(self, cls):
+        """类别是否为火焰"""
+        return bool(self.fire_cpu[int(cls)])
+
+    def process(self, det):
+        """
+        处理单帧检测结果
+
+        参数:
+            det (torch.Tensor): NMS输出的 (n, 6) 张量，可以在GPU上
+        返回:
+            dict: boxes (m, 6) 过滤后的检测框（numpy）, counts {类别: 数量}, summary 计数文字,
+                  detections 检测字典列表, fire 是否检测到火焰, fire_conf 最高火焰置信度
+        """
+        n = len(det)
+        if not n:
+            return {'boxes': np.zeros((0, 6), dtype=np.float32), 'counts': {}, 'summary': '',
+                    'detections': [], 'fire': False, 'fire_conf': 0.0}
+
+        fire_mask = self.fire_mask.get(det.device)
+        if fire_mask is None:
+            fire_mask = self.fire_mask[det.device] = self.fire_cpu.to(det.device)
+
+        det = det.float()
+        cls = det[:, 5].long()
+        conf = det[:, 4]
+        keep = conf > self.conf_thres
+        fire = keep & fire_mask[cls] & (conf > self.fire_thres)
+        counts = torch.bincount(cls, minlength=self.nc).float()
+
+        # 一次拷回主机：[检测框(n*6), keep(n), fire(n), 类别计数(nc)]
+        packed = torch.cat((det[:, :6].flatten(), keep.float(), fire.float(), counts)).cpu().numpy()
+        boxes = packed[:n * 6].reshape(n, 6)
+        keep = packed[n * 6:n * 7].astype(bool)
+        fire = packed[n * 7:n * 8].astype(bool)
+        counts = packed[n * 8:].astype(int)
+
+        idx = np.nonzero(counts)[0]
+        counts = dict(zip(self.names[idx].tolist(), counts[idx].tolist()))
+        summary = ''.join(f"{k} {v}{'s' * (v > 1)}, " for k, v in counts.items())
+
+        fire_conf = float(boxes[fire, 4].max()) if fire.any() else 0.0
+        boxes = boxes[keep][::-1]  # 低置信度先画，高置信度覆盖在上层
+        cls = boxes[:, 5].astype(int)
+        detections = [{'class': c, 'label': label, 'confidence': p, 'bbox': xyxy}
+                      for c, label, p, xyxy in zip(cls.tolist(), self.names[cls].tolist(),
+                                                   boxes[:, 4].tolist(), boxes[:, :4].astype(int).tolist())]
+        return {'boxes': boxes, 'counts': counts, 'summary': summary, 'detections': detections,
+                'fire': fire_conf > 0, 'fire_conf': fire_conf}
@@ -0,0 +1,158 @@
+"""
+推理输入预处理引擎
+
+按输入尺寸预先分配 (max_batch, 3, h, w) 的uint8主机缓冲区（有CUDA时为锁页内存）和设备端张量，
+原始帧直接letterbox写入缓冲区对应位置，上传后在设备上原地归一化，每帧几乎不再分配新的数组。
+"""
+import time
+
+import cv2
+import numpy as np
+import torch
+
+
+class Preprocessor:
+    """可复用的letterbox + 上传 + 归一化引擎（非线程安全，由单个推理线程使用）"""
+
+    def __init__(self, imgsz, device, half=False, max_batch=8, color=114):
+        """
+        参数:
+            imgsz (list): 固定推理尺寸 [h, w]
+            device (torch.device): 推理设备
+            half (bool): 设备端是否使用半精度
+            max_batch (int): 单批最大帧数
+            color (int): 填充颜色
+        """
+        self.imgsz = tuple(imgsz)
+        self.device = device
+        self.half = half
+        self.max_batch = max_batch
+        self.color = color
+        self.pin = device.type != 'cpu' and torch.cuda.is_available()
+        self.buffers = {}  # (h, w) -> (主机uint8张量, 其numpy视图, 设备张量)
+        self.geometry = {}  # 槽位 -> 上次letterbox的原图尺寸，尺寸不变时无需重新填充边框
+        self.scratch = {}  # (nh, nw) -> 缩放用的HWC中间缓冲
+
+    def buffer(self, shape):
+        """获取（必要时分配）指定尺寸的缓冲区"""
+        buf = self.buffers.get(shape)
+        if buf is None:
+            host = torch.empty((self.max_batch, 3, *shape), dtype=torch.uint8)
+            if self.pin:
+                host = host.pin_memory()
+            dtype = torch.float16 if self.half else torch.float32
+            dev = torch.empty((self.max_batch, 3, *shape), dtype=dtype, device=self.device)
+            buf = self.buffers[shape] = (host, host.numpy(), dev)
+        return buf
+
+    def letterbox_into(self, i, im0):
+        """把一帧BGR原图letterbox后以RGB CHW写入第i个槽位，结果与 letterbox(auto=False) 一致"""
+        h, w = self.imgsz
+        arr = self.buffer(self.imgsz)[1]
+        h0, w0 = im0.shape[:2]
+        r = min(h / h0, w / w0)
+        nh, nw = int(round(h0 * r)), int(round(w0 * r))
+        top, left = int(round((h - nh) / 2 - 0.1)), int(round((w - nw) / 2 - 0.1))
+
+        # 原图尺寸变化时才需要重新填充边框
+        if self.geometry.get(i) != (h0, w0):
+            arr[i].fill(self.color)
+            self.geometry[i] = (h0, w0)
+
+        if (nh, nw) != (h0, w0):
+            src = self.scratch.get((nh, nw))
+            if src is None:
+                src = self.scratch[(nh, nw)] = np.empty((nh, nw, 3), dtype=np.uint8)
+            cv2.resize(im0, (nw, nh), dst=src, interpolation=cv2.INTER_LINEAR)
+        else:
+            src = im0
+        arr[i, :, top:top + nh, left:left + nw] = src[..., ::-1].transpose(2, 0, 1)  # BGR HWC -> RGB CHW，单次拷贝
+
+    def copy_into(self, i, im):
+        """把一帧已经letterbox的CHW uint8图像拷入第i个槽位"""
+        shape = tuple(im.shape[1:])
+        np.copyto(self.buffer(shape)[1][i], im)
+        if shape == self.imgsz:
+            self.geometry.pop(i, None)  # 槽位已被覆盖，下次letterbox需要重新填充边框
+
+    def upload(self, n, shape=None):
+        """把前n个槽位上传到设备并原地归一化到0~1，返回设备张量视图（下一批会复用同一块内存）"""
+        host, _, dev = self.buffer(shape or self.imgsz)
+        im = dev[:n]
+        # 锁页内存可异步拷贝；推理与NMS会在同一CUDA流上同步，下一批写入主机缓冲区前拷贝已完成
+        im.copy_(host[:n], non_blocking=self.pin)
+        im /= 255
+        return im
+
+
+def preprocess_baseline(im0, imgsz, device, half=False):
+    """原有的逐帧预处理流程，仅用于基准对比"""
+    from utils.augmentations import letterbox
+
+    im = letterbox(im0, imgsz, auto=False)[0]
+    im = im[..., ::-1].transpose((2, 0, 1))
+    im = np.ascontiguousarray(im)
+    im = torch.from_numpy(im).to(device)
+    im = im.half() if half else im.float()
+    im /= 255
+    return im[None]
+
+
+if __name__ == "__main__":
+    # 测试代码：对比原流程与预处理引擎的单帧耗时和内存分配，在项目根目录运行 python -m utils.preprocess
+    # tracemalloc 只能看到NumPy数组的分配，torch张量的主机内存分配用profiler的内存事件统计，显存分配用 memory_stats
+    import tracemalloc
+    from torch.profiler import ProfilerActivity, profile
+
+    device = torch.device('cuda:0' if torch.cuda.is_available() else 'cpu')
+    half = device.type != 'cpu'
+    imgsz = [640, 640]
+    frames = [np.random.randint(0, 255, (1080, 1920, 3), dtype=np.uint8) for _ in range(4)]
+    n = 200
+
+    def torch_allocs(fn):
+        """torch在主机上的内存分配次数和字节数（每帧）"""
+        with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+            for k in range(n):
+                fn(k)
+        allocs = [e for e in prof.events() if e.name == '[memory]' and e.cpu_memory_usage > 0]
+        return len(allocs) / n, sum(e.cpu_memory_usage for e in allocs) / n
+
+    def bench(name, fn):
+        for k in range(10):  # 预热，排除首次分配
+            fn(k)
+        if device.type != 'cpu':
+            torch.cuda.synchronize()
+            allocs0 = torch.cuda.memory_stats(device)['allocation.all.allocated']
+        tracemalloc.start()
+        peak = 0
+        t = time.time()
+        for k in range(n):
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            fn(k)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+        if device.type != 'cpu':
+            torch.cuda.synchronize()
+        dt = (time.time() - t) / n * 1000
+        tracemalloc.stop()
+        if device.type != 'cpu':
+            gpu_allocs = (torch.cuda.memory_stats(device)['allocation.all.allocated'] - allocs0) / n
+        count, size = torch_allocs(fn)
+        msg = (f"{name}: {dt:.2f} ms/帧, NumPy单帧分配峰值 {peak / 1E6:.2f} MB, "
+               f"torch主机内存分配 {count:.1f} 次/帧 {size / 1E6:.2f} MB/帧")
+        if device.type != 'cpu':
+            msg += f", 显存分配 {gpu_allocs:.1f} 次/帧"
+        print(msg)
+
+    engine = Preprocessor(imgsz, device, half=half, max_batch=1)
+
+    def run_engine(k):
+        engine.letterbox_into(0, frames[k % len(frames)])
+        return engine.upload(1)
+
+    print(f"设备: {device}, 输入 1920x1080 -> {imgsz[1]}x{imgsz[0]}, {n} 帧")
+    bench('原流程', lambda k: preprocess_baseline(frames[k % len(frames)], imgsz, device, half))
+    bench('预处理引擎', run_engine)
+    print('结果一致:', torch.allclose(preprocess_baseline(frames[0], imgsz, device, half).float(),
+                                  run_engine(0).float(), atol=1 / 255))
@@ -0,0 +1,309 @@
+"""
+CPU部署的INT8训练后量化
+
+从我们自己的监控录像/图片中经 LoadImages 抽取帧，一部分用于校准，另一部分留作评估。
+用 ONNX Runtime 静态量化（QDQ格式，卷积权重按通道INT8、激活UINT8）把已校验的FP32 ONNX模型
+转换为INT8 ONNX模型，DetectMultiBackend 可以直接加载。
+
+评估时FP32和INT8模型都在留出的帧上推理+NMS，用 utils/metrics.ap_per_class 计算 mAP@0.5 和 mAP@0.5:0.95：
+图片有YOLO格式标注（images/ 对应 labels/）时以标注为真值，否则以FP32模型的检测结果为参考真值
+（此时衡量的是INT8相对FP32的一致性）。精度变化和测速得到的加速比一起写入报告，按阈值给出是否采用。
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from utils.lazy import lazy_import
+from utils.model_cache import ModelCache
+
+torch = lazy_import('torch')
+
+
+def sample_frames(source, imgsz, stride=32, count=300, every=10):
+    """
+    用 LoadImages 从图片/视频中抽取letterbox后的帧（视频每隔 every 帧取一帧）
+
+    返回:
+        list[dict]: {'path', 'im'(CHW RGB uint8), 'shape'(原图形状)}
+    """
+    from utils.datasets import LoadImages
+
+    frames = []
+    dataset = LoadImages(source, img_size=imgsz, stride=stride, auto=False)
+    for i, (path, im, im0, cap, _) in enumerate(dataset):
+        if cap is not None and i % every:
+            continue
+        frames.append({'path': path, 'im': im, 'shape': im0.shape, 'video': cap is not None})
+        if len(frames) >= count:
+            break
+    return frames
+
+
+def load_labels(frame):
+    """读取图片对应的YOLO格式标注，返回原图像素坐标的 [cls, x1, y1, x2, y2]，没有标注文件时返回None"""
+    from utils.datasets import img2label_paths
+    from utils.general import xywh2xyxy
+
+    if frame['video']:
+        return None
+    label_file = img2label_paths([frame['path']])[0]
+    if not os.path.isfile(label_file):
+        return None
+    labels = np.loadtxt(label_file, ndmin=2, dtype=np.float32).reshape(-1, 5)
+    h, w = frame['shape'][:2]
+    labels[:, 1:] = xywh2xyxy(labels[:, 1:]) * np.array([w, h, w, h], dtype=np.float32)
+    return torch.from_numpy(labels)
+
+
+def match_predictions(detections, labels, iouv):
+    """
+    按IoU阈值匹配检测框和真值框（与YOLOv5验证流程相同）
+
+    参数:
+        detections (Tensor): (n, 6) [x1, y1, x2, y2, conf, cls]
+        labels (Tensor): (m, 5) [cls, x1, y1, x2, y2]
+        iouv (Tensor): IoU阈值
+    返回:
+        Tensor: (n, len(iouv)) 每个检测框在各阈值下是否正确
+    """
+    from utils.metrics import box_iou
+
+    correct = torch.zeros(detections.shape[0], iouv.shape[0], dtype=torch.bool)
+    iou = box_iou(labels[:, 1:], detections[:, :4])
+    x = torch.where((iou >= iouv[0]) & (labels[:, 0:1] == detections[:, 5]))
+    if x[0].shape[0]:
+        matches = torch.cat((torch.stack(x, 1), iou[x[0], x[1]][:, None]), 1).cpu().numpy()
+        if x[0].shape[0] > 1:
+            matches = matches[matches[:, 2].argsort()[::-1]]
+            matches = matches[np.unique(matches[:, 1], return_index=True)[1]]
+            matches = matches[np.unique(matches[:, 0], return_index=True)[1]]
+        matches = torch.from_numpy(matches)
+        correct[matches[:, 1].long()] = matches[:, 2:3] >= iouv
+    return correct
+
+
+def detect(model, frames, conf_thres=0.001, iou_thres=0.6, max_det=300):
+    """逐帧推理+NMS，返回原图坐标下的检测结果列表"""
+    from utils.general import non_max_suppression, scale_coords
+
+    results = []
+    with torch.no_grad():
+        for frame in frames:
+            im = torch.from_numpy(frame['im']).float()[None] / 255
+            pred = non_max_suppression(model(im), conf_thres, iou_thres, max_det=max_det)[0]
+            pred[:, :4] = scale_coords(im.shape[2:], pred[:, :4], frame['shape']).round()
+            results.append(pred)
+    return results
+
+
+def evaluate(predictions, targets, names):
+    """
+    计算 mAP@0.5 和 mAP@0.5:0.95
+
+    参数:
+        predictions (list[Tensor]): 每帧的 (n, 6) 检测结果
+        targets (list[Tensor]): 每帧的 (m, 5) 真值
+        names (dict): 类别名称
+    """
+    from utils.metrics import ap_per_class
+
+    iouv = torch.linspace(0.5, 0.95, 10)
+    stats = []
+    for pred, labels in zip(predictions, targets):
+        tcls = labels[:, 0].tolist()
+        if len(pred) == 0:
+            if len(labels):
+                stats.append((torch.zeros(0, iouv.numel(), dtype=torch.bool), torch.zeros(0), torch.zeros(0), tcls))
+            continue
+        correct = match_predictions(pred, labels, iouv) if len(labels) else \
+            torch.zeros(pred.shape[0], iouv.numel(), dtype=torch.bool)
+        stats.append((correct, pred[:, 4], pred[:, 5], tcls))
+    stats = [np.concatenate([np.asarray(s[i]) for s in stats], 0) for i in range(4)] if stats else []
+    if not stats or not len(stats[3]):
+        return {'map50': 0.0, 'map': 0.0, 'precision': 0.0, 'recall': 0.0, 'targets': 0}
+    tp, fp, p, r, f1, ap, ap_class = ap_per_class(*stats, names=names)
+    return {'map50': round(float(ap[:, 0].mean()), 4), 'map': round(float(ap.mean()), 4),
+            'precision': round(float(p.mean()), 4), 'recall': round(float(r.mean()), 4),
+            'targets': int(len(stats[3]))}
+
+
+def quantize_onnx(fp32_file, int8_file, calib_frames, per_channel=True):
+    """
+    ONNX Runtime 静态量化：只量化卷积，Detect层的解码（Sigmoid、乘加、拼接）保持浮点
+
+    参数:
+        fp32_file (str): FP32 ONNX 模型
+        int8_file (str): 输出的INT8模型
+        calib_frames (list[dict]): 校准帧
+    """
+    import onnx
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType,
+                                          quantize_static)
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self, frames):
+            self.frames = iter(frames)
+
+        def get_next(self):
+            frame = next(self.frames, None)
+            if frame is None:
+                return None
+            return {'images': (frame['im'][None].astype(np.float32) / 255)}
+
+    quantize_static(str(fp32_file), str(int8_file), FrameReader(calib_frames), quant_format=QuantFormat.QDQ,
+                    op_types_to_quantize=['Conv'], per_channel=per_channel, weight_type=QuantType.QInt8,
+                    activation_type=QuantType.QUInt8, calibrate_method=CalibrationMethod.MinMax)
+
+    # 量化后的模型不保留元数据，把步长和类别名称补回去，DetectMultiBackend 才能读到
+    src, dst = onnx.load(str(fp32_file)), onnx.load(str(int8_file))
+    del dst.metadata_props[:]
+    for prop in src.metadata_props:
+        meta = dst.metadata_props.add()
+        meta.key, meta.value = prop.key, prop.value
+    onnx.save(dst, str(int8_file))
+    return int8_file
+
+
+class Int8Quantizer:
+    """校准、量化、评估并给出是否采用INT8模型的结论"""
+
+    def __init__(self, cache_dir='cache/models', calib_frames=200, eval_frames=100, every=10,
+                 max_map_drop=0.01, min_speedup=1.1):
+        """
+        参数:
+            cache_dir (str): 模型和报告的保存目录
+            calib_frames (int): 校准帧数
+            eval_frames (int): 评估帧数（与校准帧不重叠）
+            every (int): 视频抽帧间隔
+            max_map_drop (float): 可以接受的 mAP@0.5 最大下降
+            min_speedup (float): 至少需要的加速比
+        """
+        self.cache_dir = Path(cache_dir)
+        self.calib_frames = calib_frames
+        self.eval_frames = eval_frames
+        self.every = every
+        self.max_map_drop = max_map_drop
+        self.min_speedup = min_speedup
+
+    def report_path(self, weights, imgsz):
+        sha = ModelCache(self.cache_dir).weights_hash(weights)
+        return self.cache_dir / f"{Path(weights).stem}-{sha[:16]}-{imgsz[0]}x{imgsz[1]}-int8.json"
+
+    def accepted_model(self, weights, imgsz):
+        """已通过验收的INT8模型路径，没有时返回None"""
+        try:
+            report = json.loads(self.report_path(weights, imgsz).read_text())
+        except (OSError, ValueError):
+            return None
+        return report['int8_model'] if report.get('accepted') and os.path.exists(report['int8_model']) else None
+
+    def run(self, weights, source, imgsz=(640, 640)):
+        """
+        量化并生成报告
+
+        参数:
+            weights (str): .pt 权重
+            source (str): 校准/评估用的图片或视频（文件、目录或通配符）
+            imgsz (tuple): 推理尺寸
+        返回:
+            dict: 报告（同时保存为JSON）
+        """
+        from models.common import DetectMultiBackend
+        from utils.backend_select import benchmark
+
+        device = torch.device('cpu')
+        imgsz = list(imgsz)
+        fp32_file = ModelCache(self.cache_dir, 'onnx').get(weights, imgsz, device, half=False)
+        if fp32_file == weights:
+            raise RuntimeError('FP32 ONNX 模型导出失败，无法量化')
+        int8_file = Path(fp32_file).with_name(Path(fp32_file).stem.replace('-fp32', '') + '-int8.onnx')
+
+        fp32 = DetectMultiBackend(fp32_file, device=device)
+        frames = sample_frames(source, imgsz, fp32.stride, self.calib_frames + self.eval_frames, self.every)
+        if len(frames) < 2:
+            raise RuntimeError(f'{source} 中可用的帧太少')
+        # 交错划分：校准帧和评估帧覆盖相同的场景但互不重叠
+        eval_step = max(len(frames) // max(self.eval_frames, 1), 2)
+        eval_set = frames[::eval_step][:self.eval_frames]
+        calib_set = [f for i, f in enumerate(frames) if i % eval_step][:self.calib_frames]
+        print(f"校准帧 {len(calib_set)}，评估帧 {len(eval_set)}")
+
+        t0 = time.time()
+        quantize_onnx(fp32_file, int8_file, calib_set)
+        quantize_s = time.time() - t0
+        int8 = DetectMultiBackend(str(int8_file), device=device)
+
+        # 精度：有标注用标注，否则以FP32检测结果为参考
+        names = dict(enumerate(fp32.names)) if isinstance(fp32.names, list) else fp32.names
+        labels = [load_labels(f) for f in eval_set]
+        fp32_pred = detect(fp32, eval_set)
+        int8_pred = detect(int8, eval_set)
+        if all(label is not None for label in labels):
+            reference = 'labels'
+            targets = labels
+        else:
+            reference = 'fp32'
+            ref_pred = detect(fp32, eval_set, conf_thres=0.25, iou_thres=0.45)
+            targets = [torch.cat((p[:, 5:6], p[:, :4]), 1) for p in ref_pred]
+        fp32_metrics = evaluate(fp32_pred, targets, names)
+        int8_metrics = evaluate(int8_pred, targets, names)
+
+        # 速度
+        im = torch.rand(1, 3, *imgsz)
+        fp32_speed = benchmark(fp32, im)
+        int8_speed = benchmark(int8, im)
+        speedup = fp32_speed['median_ms'] / max(int8_speed['median_ms'], 1e-6)
+
+        map_drop = fp32_metrics['map50'] - int8_metrics['map50']
+        accepted = map_drop <= self.max_map_drop and speedup >= self.min_speedup
+        report = {'weights': str(Path(weights).resolve()), 'source': str(source), 'imgsz': imgsz,
+                  'fp32_model': str(fp32_file), 'int8_model': str(int8_file),
+                  'calib_frames': len(calib_set), 'eval_frames': len(eval_set), 'reference': reference,
+                  'fp32': {**fp32_metrics, **fp32_speed}, 'int8': {**int8_metrics, **int8_speed},
+                  'map50_drop': round(map_drop, 4), 'map_drop': round(fp32_metrics['map'] - int8_metrics['map'], 4),
+                  'speedup': round(speedup, 2), 'quantize_s': round(quantize_s, 1),
+                  'max_map_drop': self.max_map_drop, 'min_speedup': self.min_speedup, 'accepted': accepted,
+                  'time': time.strftime('%Y-%m-%d %H:%M:%S')}
+        self.report_path(weights, imgsz).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        return report
+
+
+def format_report(report):
+    """报告 -> 便于阅读的文本"""
+    fp32, int8 = report['fp32'], report['int8']
+    reference = '标注' if report['reference'] == 'labels' else 'FP32检测结果'
+    return '\n'.join([
+        f"INT8量化报告（以{reference}为真值，校准 {report['calib_frames']} 帧，评估 {report['eval_frames']} 帧）",
+        f"         mAP@0.5   mAP@0.5:0.95   耗时(ms)",
+        f"  FP32   {fp32['map50']:.4f}    {fp32['map']:.4f}         {fp32['median_ms']:.1f}",
+        f"  INT8   {int8['map50']:.4f}    {int8['map']:.4f}         {int8['median_ms']:.1f}",
+        f"  mAP@0.5 下降 {report['map50_drop']:+.4f}（允许 {report['max_map_drop']}），"
+        f"加速 {report['speedup']:.2f}x（至少 {report['min_speedup']}x）",
+        f"  结论: {'采用' if report['accepted'] else '不采用'} {report['int8_model']}"])
+
+
+# 测试代码
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    ROOT = Path(__file__).resolve().parents[1]
+    if str(ROOT) not in sys.path:
+        sys.path.append(str(ROOT))
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--weights', type=str, default=str(ROOT / 'weights/best.pt'), help='.pt 权重')
+    parser.add_argument('--source', type=str, required=True, help='校准/评估用的图片或视频')
+    parser.add_argument('--imgsz', type=int, default=640, help='推理尺寸')
+    parser.add_argument('--calib', type=int, default=200, help='校准帧数')
+    parser.add_argument('--eval', type=int, default=100, help='评估帧数')
+    parser.add_argument('--max-map-drop', type=float, default=0.01, help='可接受的 mAP@0.5 最大下降')
+    parser.add_argument('--min-speedup', type=float, default=1.1, help='至少需要的加速比')
+    opt = parser.parse_args()
+
+    quantizer = Int8Quantizer(ROOT / 'cache/models', opt.calib, opt.eval, max_map_drop=opt.max_map_drop,
+                              min_speedup=opt.min_speedup)
+    print(format_report(quantizer.run(opt.weights, opt.source, (opt.imgsz, opt.imgsz))))
@@ -0,0 +1,171 @@
+"""
+地图点的空间索引
+
+经纬度按多级网格（类似geohash，每级边长翻倍）索引：每个网格保存聚合统计（数量、坐标和、各等级数量）
+和其中的点id，插入/移动/删除都是O(级数)。
+按地图视野和缩放级别查询时，只访问视野内的网格：点数不多时返回视野内的点，否则返回对应缩放级别的聚合点，
+查询开销取决于视野而不是历史告警总数。
+"""
+import math
+
+
+LEVEL_RANK = {'processed': 0, 'low': 1, 'medium': 2, 'high': 3}
+RANK_LEVEL = ['processed', 'low', 'medium', 'high']
+
+
+class SpatialIndex:
+    """多级网格空间索引"""
+
+    def __init__(self, base_degrees=0.001, levels=15, cluster_pixels=48, max_points=2000):
+        """
+        参数:
+            base_degrees (float): 最细一级网格的边长（度），第k级为 base_degrees * 2**k
+            levels (int): 网格级数
+            cluster_pixels (int): 聚合点在屏幕上的大致间距（像素），决定某缩放级别使用哪一级网格
+            max_points (int): 视野内点数不超过该值时返回单个点，否则返回聚合点
+        """
+        self.sizes = [base_degrees * 2 ** k for k in range(levels)]
+        self.cluster_pixels = cluster_pixels
+        self.max_points = max_points
+        self.items = {}  # id -> (纬度, 经度, 类别, 等级, 标题)
+        self.grids = [dict() for _ in range(levels)]  # 第k级：(类别, 行, 列) -> [数量, 纬度和, 经度和, 各等级数量(4), {id}]
+        self.kinds = {}  # 类别 -> 点数
+
+    def cell(self, k, lat, lng):
+        size = self.sizes[k]
+        return math.floor(lat / size), math.floor(lng / size)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item_id):
+        return item_id in self.items
+
+    def insert(self, item_id, lat, lng, kind='alert', level='medium', title=''):
+        """插入或更新一个点（已存在时先删除旧位置）"""
+        if item_id in self.items:
+            old = self.items[item_id]
+            if old == (lat, lng, kind, level, title):
+                return
+            self.remove(item_id)
+        self.items[item_id] = (lat, lng, kind, level, title)
+        self.accumulate(item_id, lat, lng, kind, level, 1)
+
+    def remove(self, item_id):
+        """删除一个点，不存在时忽略"""
+        item = self.items.pop(item_id, None)
+        if item is None:
+            return
+        lat, lng, kind, level, _ = item
+        self.accumulate(item_id, lat, lng, kind, level, -1)
+
+    def accumulate(self, item_id, lat, lng, kind, level, sign):
+        """更新各级网格的聚合统计和点集合"""
+        rank = LEVEL_RANK.get(level, 2)
+        self.kinds[kind] = self.kinds.get(kind, 0) + sign
+        if self.kinds[kind] <= 0:
+            del self.kinds[kind]
+        for k, grid in enumerate(self.grids):
+            key = (kind,) + self.cell(k, lat, lng)
+            stats = grid.get(key)
+            if stats is None:
+                stats = grid[key] = [0, 0.0, 0.0, 0, 0, 0, 0, set()]
+            stats[0] += sign
+            stats[1] += sign * lat
+            stats[2] += sign * lng
+            stats[3 + rank] += sign
+            if sign > 0:
+                stats[7].add(item_id)
+            elif stats[0] <= 0:
+                del grid[key]
+            else:
+                stats[7].discard(item_id)
+
+    def level_for_zoom(self, zoom):
+        """缩放级别对应的网格级：网格边长约等于 cluster_pixels 个像素"""
+        degrees = self.cluster_pixels * 360 / (256 * 2 ** zoom)  # Web墨卡托下每像素约 360/(256*2^z) 度
+        for k, size in enumerate(self.sizes):
+            if size >= degrees:
+                return k
+        return len(self.sizes) - 1
+
+    def cells_in(self, grid, k, bounds):
+        """某级网格中与视野相交的非空网格"""
+        south, west, north, east = bounds
+        size = self.sizes[k]
+        rows = range(math.floor(south / size), math.floor(north / size) + 1)
+        cols = range(math.floor(west / size), math.floor(east / size) + 1)
+        kinds = list(self.kinds)
+        if len(rows) * len(cols) * len(kinds) <= len(grid):
+            # 视野内的网格比非空网格少：按视野枚举
+            for i in rows:
+                for j in cols:
+                    for kind in kinds:
+                        stats = grid.get((kind, i, j))
+                        if stats is not None:
+                            yield (kind, i, j), stats
+        else:
+            # 非空网格较少：遍历非空网格，按行列过滤
+            for key, value in grid.items():
+                i, j = key[-2:]
+                if rows.start <= i < rows.stop and cols.start <= j < cols.stop:
+                    yield key, value
+
+    def query(self, bounds, zoom):
+        """
+        查询视野内的点
+
+        参数:
+            bounds (tuple): (南, 西, 北, 东) 纬度/经度范围
+            zoom (float): 地图缩放级别
+        返回:
+            list: 每项为 (id, 纬度, 经度, 类别, 等级, 标题, 数量)；数量大于1的是聚合点
+        """
+        south, west, north, east = bounds
+        k = self.level_for_zoom(zoom)
+        clusters = list(self.cells_in(self.grids[k], k, bounds))
+        if sum(stats[0] for _, stats in clusters) > self.max_points and k > 0:
+            result = []
+            for (kind, i, j), stats in clusters:
+                n = stats[0]
+                level = RANK_LEVEL[max(r for r in range(4) if stats[3 + r] > 0)]  # 聚合点显示最高等级
+                result.append((f"cluster-{kind}-{k}-{i}-{j}", stats[1] / n, stats[2] / n, kind, level, '', n))
+            return result
+
+        # 点数不多：取视野内网格中的点，边缘网格按坐标过滤
+        result = []
+        for _, stats in clusters:
+            for item_id in stats[7]:
+                lat, lng, kind, level, title = self.items[item_id]
+                if south <= lat <= north and west <= lng <= east:
+                    result.append((item_id, lat, lng, kind, level, title, 1))
+        return result
+
+
+# 测试代码
+if __name__ == "__main__":
+    import random
+    import time
+
+    index = SpatialIndex()
+    random.seed(0)
+    t0 = time.time()
+    for i in range(100000):
+        index.insert(f"alert-{i}", 30 + random.uniform(0, 10), 110 + random.uniform(0, 10), 'alert',
+                     random.choice(['high', 'medium', 'low']))
+    print(f"插入10万个点: {(time.time() - t0) * 1000:.0f} ms")
+
+    for bounds, zoom in [((30, 110, 40, 120), 6), ((35, 115, 35.05, 115.08), 14), ((35, 115, 35.5, 115.8), 10)]:
+        t0 = time.time()
+        result = index.query(bounds, zoom)
+        clustered = sum(1 for r in result if r[6] > 1)
+        print(f"视野 {bounds} 缩放 {zoom}: {len(result)} 项（聚合 {clustered}，覆盖 {sum(r[6] for r in result)} 个点）"
+              f" {(time.time() - t0) * 1000:.1f} ms")
+
+    t0 = time.time()
+    for i in range(10000):
+        index.insert(f"alert-{i}", 30 + random.uniform(0, 10), 110 + random.uniform(0, 10), 'alert', 'high')
+    print(f"移动1万个点: {(time.time() - t0) * 1000:.0f} ms")
+    for i in range(100000):
+        index.remove(f"alert-{i}")
+    print(f"全部删除后: {len(index)} 个点, 网格 {sum(len(g) for g in index.grids)} 个")
@@ -0,0 +1,326 @@
+"""
+离线地图瓦片缓存
+
+瓦片保存在MBTiles格式的SQLite数据库中（按TMS行号存储，可直接用其他MBTiles工具查看），
+上面再加一层按瓦片数计数的LRU内存缓存。缓存缺失时可选从配置的XYZ瓦片地址下载并写入数据库，
+离线时只使用已缓存的瓦片。可在后台预取各监测区域周围的瓦片（只应使用允许批量下载的瓦片服务，
+OpenStreetMap公共瓦片服务禁止批量预取）。
+TileServer 在本机回环地址上提供瓦片的HTTP服务，供离线地图页面加载。
+监测区域等坐标为百度地图的BD-09坐标，XYZ瓦片按WGS-84绘制，计算瓦片号前先做坐标转换。
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def bd09_to_gcj02(lat, lng):
+    """百度BD-09坐标 -> 国测局GCJ-02坐标"""
+    x_pi = math.pi * 3000.0 / 180.0
+    x, y = lng - 0.0065, lat - 0.006
+    z = math.sqrt(x * x + y * y) - 0.00002 * math.sin(y * x_pi)
+    theta = math.atan2(y, x) - 0.000003 * math.cos(x * x_pi)
+    return z * math.sin(theta), z * math.cos(theta)
+
+
+def wgs84_to_gcj02(lat, lng):
+    """WGS-84坐标 -> GCJ-02坐标（国外坐标不偏移）"""
+    if not (72.004 <= lng <= 137.8347 and 0.8293 <= lat <= 55.8271):
+        return lat, lng
+    a, ee = 6378245.0, 0.00669342162296594323
+    x, y = lng - 105.0, lat - 35.0
+    common = (20.0 * math.sin(6.0 * x * math.pi) + 20.0 * math.sin(2.0 * x * math.pi)) * 2.0 / 3.0
+    dlat = (-100.0 + 2.0 * x + 3.0 * y + 0.2 * y * y + 0.1 * x * y + 0.2 * math.sqrt(abs(x)) + common
+            + (20.0 * math.sin(y * math.pi) + 40.0 * math.sin(y / 3.0 * math.pi)) * 2.0 / 3.0
+            + (160.0 * math.sin(y / 12.0 * math.pi) + 320 * math.sin(y * math.pi / 30.0)) * 2.0 / 3.0)
+    dlng = (300.0 + x + 2.0 * y + 0.1 * x * x + 0.1 * x * y + 0.1 * math.sqrt(abs(x)) + common
+            + (20.0 * math.sin(x * math.pi) + 40.0 * math.sin(x / 3.0 * math.pi)) * 2.0 / 3.0
+            + (150.0 * math.sin(x / 12.0 * math.pi) + 300.0 * math.sin(x / 30.0 * math.pi)) * 2.0 / 3.0)
+    rad = math.radians(lat)
+    magic = 1 - ee * math.sin(rad) ** 2
+    dlat = dlat * 180.0 / ((a * (1 - ee)) / (magic * math.sqrt(magic)) * math.pi)
+    dlng = dlng * 180.0 / (a / math.sqrt(magic) * math.cos(rad) * math.pi)
+    return lat + dlat, lng + dlng
+
+
+def bd09_to_wgs84(lat, lng):
+    """百度BD-09坐标 -> WGS-84坐标（GCJ-02 -> WGS-84 迭代求逆）"""
+    glat, glng = bd09_to_gcj02(lat, lng)
+    wlat, wlng = glat, glng
+    for _ in range(3):
+        dlat, dlng = wgs84_to_gcj02(wlat, wlng)
+        wlat, wlng = wlat - (dlat - glat), wlng - (dlng - glng)
+    return wlat, wlng
+
+
+def lat_lng_to_tile(lat, lng, zoom):
+    """经纬度 -> Web墨卡托XYZ瓦片号 (x, y)"""
+    lat = max(min(lat, 85.0511), -85.0511)
+    n = 2 ** zoom
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_around(lat, lng, radius_km, zoom):
+    """以(lat, lng)为中心、radius_km为半径的方形范围覆盖的瓦片 [(z, x, y)]"""
+    dlat = radius_km / 111.32
+    dlng = radius_km / (111.32 * max(math.cos(math.radians(lat)), 0.01))
+    x0, y0 = lat_lng_to_tile(lat + dlat, lng - dlng, zoom)  # 西北角
+    x1, y1 = lat_lng_to_tile(lat - dlat, lng + dlng, zoom)  # 东南角
+    return [(zoom, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+class TileCache:
+    """MBTiles磁盘缓存 + LRU内存缓存，缺失时可从网络下载"""
+
+    def __init__(self, path, memory_tiles=512, tile_url=None, timeout=5):
+        """
+        参数:
+            path (str): MBTiles数据库路径
+            memory_tiles (int): 内存中最多缓存的瓦片数
+            tile_url (str, optional): XYZ瓦片下载地址，如自建或已授权的 https://tiles.example.com/{z}/{x}/{y}.png，
+                为空时只使用磁盘缓存（完全离线）
+            timeout (float): 下载超时（秒）
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.memory_tiles = memory_tiles
+        self.tile_url = tile_url
+        self.timeout = timeout
+        self.memory = OrderedDict()  # (z, x, y) -> 瓦片数据，最近使用的在末尾
+        self.lock = threading.Lock()  # 保护内存缓存和数据库连接（HTTP服务是多线程的）
+        self.failed = {}  # (z, x, y) -> 下载失败时间，短时间内不再重试
+        self.session = None
+        self.hits = {'memory': 0, 'disk': 0, 'network': 0, 'miss': 0}
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS tiles (
+                zoom_level INTEGER,
+                tile_column INTEGER,
+                tile_row INTEGER,
+                tile_data BLOB,
+                PRIMARY KEY (zoom_level, tile_column, tile_row)
+            );
+        ''')
+        self.conn.executemany('INSERT OR IGNORE INTO metadata VALUES (?, ?)',
+                              [('name', 'SenTong offline tiles'), ('format', 'png'), ('type', 'baselayer')])
+        self.conn.commit()
+
+    @staticmethod
+    def tms_row(z, y):
+        """MBTiles按TMS方案存储，行号从南往北数"""
+        return (1 << z) - 1 - y
+
+    def remember(self, key, data):
+        self.memory[key] = data
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_tiles:
+            self.memory.popitem(last=False)
+
+    def lookup(self, z, x, y):
+        """只查内存和磁盘缓存，不下载"""
+        key = (z, x, y)
+        with self.lock:
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+                self.hits['memory'] += 1
+                return data
+            row = self.conn.execute('SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?',
+                                    (z, x, self.tms_row(z, y))).fetchone()
+            if row is not None:
+                self.hits['disk'] += 1
+                self.remember(key, row[0])
+                return row[0]
+        return None
+
+    def put(self, z, x, y, data):
+        """写入瓦片（磁盘和内存）"""
+        with self.lock:
+            self.conn.execute('INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)', (z, x, self.tms_row(z, y), data))
+            self.conn.commit()
+            self.remember((z, x, y), data)
+
+    def fetch(self, z, x, y):
+        """从网络下载瓦片，失败返回None（60秒内不重试同一瓦片）"""
+        key = (z, x, y)
+        if not self.tile_url or time.time() - self.failed.get(key, 0) < 60:
+            return None
+        try:
+            import requests  # 只有需要下载时才导入
+            if self.session is None:
+                self.session = requests.Session()
+                self.session.headers['User-Agent'] = 'SenTong/1.0'
+            response = self.session.get(self.tile_url.format(z=z, x=x, y=y), timeout=self.timeout)
+            response.raise_for_status()
+            return response.content
+        except Exception as e:
+            print(f"瓦片下载失败 {z}/{x}/{y}: {e}")
+            self.failed[key] = time.time()
+            return None
+
+    def get(self, z, x, y):
+        """
+        取瓦片：内存 -> 磁盘 -> 网络（下载成功后写入缓存）
+
+        返回:
+            bytes | None: 瓦片数据，离线且未缓存时为None
+        """
+        data = self.lookup(z, x, y)
+        if data is not None:
+            return data
+        data = self.fetch(z, x, y)
+        if data is None:
+            self.hits['miss'] += 1
+            return None
+        self.hits['network'] += 1
+        self.put(z, x, y, data)
+        return data
+
+    def contains(self, z, x, y):
+        with self.lock:
+            return (z, x, y) in self.memory or self.conn.execute(
+                'SELECT 1 FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?',
+                (z, x, self.tms_row(z, y))).fetchone() is not None
+
+    def prefetch(self, regions, zooms, max_tiles=5000, stop=None):
+        """
+        下载监测区域周围缺失的瓦片（在后台线程中调用）
+
+        参数:
+            regions (list[dict]): 监测区域，含 latitude、longitude（BD-09）、radius（公里）
+            zooms (list[int]): 缩放级别范围 [最小, 最大]
+            max_tiles (int): 最多下载的瓦片数
+            stop (threading.Event, optional): 置位时提前结束
+        返回:
+            int: 新下载的瓦片数
+        """
+        if not self.tile_url:
+            return 0
+        fetched = 0
+        for zoom in range(zooms[0], zooms[-1] + 1):
+            for region in regions:
+                lat, lng = bd09_to_wgs84(region['latitude'], region['longitude'])
+                for z, x, y in tiles_around(lat, lng, region.get('radius', 5), zoom):
+                    if fetched >= max_tiles or (stop is not None and stop.is_set()):
+                        return fetched
+                    if self.contains(z, x, y):
+                        continue
+                    data = self.fetch(z, x, y)
+                    if data is not None:
+                        self.put(z, x, y, data)
+                        fetched += 1
+        return fetched
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM tiles').fetchone()[0]
+
+    def stats(self):
+        return {**self.hits, 'memory_tiles': len(self.memory)}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class TileServer:
+    """在本机回环地址上提供 /tiles/{z}/{x}/{y}.png 的瓦片HTTP服务"""
+
+    def __init__(self, cache, host='127.0.0.1', port=0):
+        """
+        参数:
+            cache (TileCache): 瓦片缓存
+            port (int): 端口，0表示由系统分配空闲端口
+        """
+        self.cache = cache
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                parts = handler.path.split('?')[0].strip('/').split('/')
+                data = None
+                if len(parts) == 4 and parts[0] == 'tiles':
+                    try:
+                        z, x, y = int(parts[1]), int(parts[2]), int(parts[3].split('.')[0])
+                        if 0 <= z <= 22 and 0 <= x < (1 << z) and 0 <= y < (1 << z):
+                            data = cache.get(z, x, y)
+                    except ValueError:
+                        pass
+                if data is None:
+                    handler.send_error(404)
+                    return
+                handler.send_response(200)
+                handler.send_header('Content-Type', 'image/png')
+                handler.send_header('Content-Length', str(len(data)))
+                handler.send_header('Cache-Control', 'max-age=86400')
+                handler.send_header('Access-Control-Allow-Origin', '*')
+                handler.end_headers()
+                handler.wfile.write(data)
+
+            def log_message(handler, format, *args):
+                pass  # 不逐条打印瓦片请求
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def tile_url(self):
+        return self.url + "/tiles/{z}/{x}/{y}.png"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='TileServer', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# 测试代码
+if __name__ == "__main__":
+    import tempfile
+    import urllib.request
+
+    path = os.path.join(tempfile.mkdtemp(), 'tiles.mbtiles')
+    cache = TileCache(path, memory_tiles=64)  # 不配置下载地址：完全离线
+
+    # 模拟预先导入的瓦片
+    regions = [{'name': '北京密云', 'latitude': 40.3764, 'longitude': 116.8301, 'radius': 5}]
+    tiles = [t for zoom in range(8, 14) for t in tiles_around(40.3764, 116.8301, 5, zoom)]
+    t0 = time.time()
+    for z, x, y in tiles:
+        cache.put(z, x, y, f"tile {z}/{x}/{y}".encode())
+    print(f"写入 {len(tiles)} 个瓦片: {(time.time() - t0) * 1000:.0f} ms, 数据库共 {cache.count()} 个")
+
+    cache = TileCache(path, memory_tiles=64)  # 重新打开，内存缓存为空
+    t0 = time.time()
+    for _ in range(3):
+        for z, x, y in tiles:
+            assert cache.get(z, x, y) == f"tile {z}/{x}/{y}".encode()
+    print(f"读取{len(tiles) * 3}次: {(time.time() - t0) * 1000:.1f} ms, {cache.stats()}")
+    print(f"未缓存的瓦片: {cache.get(3, 0, 0)}")
+
+    server = TileServer(cache).start()
+    z, x, y = tiles[-1]
+    with urllib.request.urlopen(f"{server.url}/tiles/{z}/{x}/{y}.png") as response:
+        print(f"HTTP {response.status}: {response.read()}")
+    try:
+        urllib.request.urlopen(f"{server.url}/tiles/3/0/0.png")
+    except Exception as e:
+        print(f"缺失瓦片: {e}")
+    server.stop()
+    cache.close()
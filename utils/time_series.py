@@ -0,0 +1,185 @@
+"""
+告警时间序列聚合
+
+按分钟、小时、天三种粒度把告警计数保存在环形缓冲区中，每个桶是一行按告警类型排列的NumPy计数。
+桶号由时间戳直接算出，新增告警O(1)定位；时钟跨过桶边界时才惰性清零过期的桶，查询任意时间范围都不需要遍历告警。
+"""
+import time
+
+import numpy as np
+
+
+class RingCounter:
+    """固定粒度的环形计数缓冲区，保存最近size个桶"""
+
+    def __init__(self, size, span, width, offset=0):
+        """
+        参数:
+            size (int): 桶数
+            span (int): 每个桶的时长（秒）
+            width (int): 每个桶的计数列数（告警类型数）
+            offset (int): 本地时区相对UTC的偏移（秒），保证小时/天的桶按本地时间对齐
+        """
+        self.size = size
+        self.span = span
+        self.offset = offset
+        self.counts = np.zeros((size, width))
+        self.head = None  # 最新的桶号
+
+    def bucket(self, ts):
+        """时间戳 -> 桶号（支持数组）"""
+        if np.ndim(ts) == 0:
+            return int((ts + self.offset) // self.span)
+        return ((np.asarray(ts) + self.offset) // self.span).astype(np.int64)
+
+    def start(self, bucket):
+        """桶号 -> 桶的起始时间戳（支持数组）"""
+        return np.asarray(bucket) * self.span - self.offset
+
+    def advance(self, bucket):
+        """时钟前进到bucket，清零中间过期的桶（惰性翻转）"""
+        bucket = int(bucket)
+        if self.head is None:
+            self.head = bucket
+        elif bucket > self.head:
+            k = min(bucket - self.head, self.size)
+            self.counts[np.arange(bucket - k + 1, bucket + 1) % self.size] = 0
+            self.head = bucket
+
+    def add(self, buckets, columns, values=1):
+        """把计数加到对应的桶和列上，早于缓冲区范围的计数被忽略"""
+        if np.ndim(buckets) == 0:  # 单条告警走标量路径
+            self.advance(buckets)
+            if buckets > self.head - self.size:
+                self.counts[buckets % self.size, columns] += values
+            return
+        buckets = np.atleast_1d(buckets).astype(np.int64)
+        self.advance(buckets.max())
+        valid = buckets > self.head - self.size
+        values = np.broadcast_to(values, buckets.shape)
+        np.add.at(self.counts, (buckets[valid] % self.size, np.atleast_1d(columns)[valid]), values[valid])
+
+    def window(self, n, end):
+        """
+        取截至end（含）的最近n个桶，不修改缓冲区（只有 add/remove 推进时钟）
+
+        返回:
+            starts (np.ndarray): (n,) 每个桶的起始时间戳
+            counts (np.ndarray): (n, width) 计数副本
+        """
+        n = min(n, self.size)
+        buckets = np.arange(end - n + 1, end + 1)
+        if self.head is None:
+            return self.start(buckets), np.zeros((n, self.counts.shape[1]))
+        # 只读不翻转：晚于最新桶的还没有计数，早于缓冲区范围的已过期，这两类位置上是其他桶的旧数据
+        counts = self.counts[buckets % self.size]
+        counts[(buckets > self.head) | (buckets <= self.head - self.size)] = 0
+        return self.start(buckets), counts
+
+
+class AlertTimeSeries:
+    """按告警类型统计的多粒度时间序列"""
+
+    def __init__(self, types, minutes=24 * 60, hours=31 * 24, days=366):
+        """
+        参数:
+            types (list[str]): 告警类型，决定计数列的顺序
+            minutes/hours/days (int): 各粒度保留的桶数
+        """
+        self.types = list(types)
+        self.columns = {t: i for i, t in enumerate(self.types)}
+        offset = time.localtime().tm_gmtoff
+        width = len(self.types)
+        self.rings = {
+            'minute': RingCounter(minutes, 60, width, offset),
+            'hour': RingCounter(hours, 3600, width, offset),
+            'day': RingCounter(days, 86400, width, offset),
+        }
+        self.totals = np.zeros(width)
+
+    def add(self, alert_type, ts=None, n=1):
+        """记录n条告警（n为负数时表示撤销），未知类型忽略"""
+        column = self.columns.get(alert_type)
+        if column is None:
+            return
+        ts = time.time() if ts is None else ts
+        for ring in self.rings.values():
+            ring.add(ring.bucket(ts), column, n)
+        self.totals[column] += n
+
+    def add_many(self, alert_types, timestamps):
+        """批量记录告警，整批只做一次向量化累加"""
+        columns = np.array([self.columns.get(t, -1) for t in alert_types], dtype=np.int64)
+        timestamps = np.asarray(timestamps, dtype=float)
+        known = columns >= 0
+        if not known.any():
+            return
+        columns, timestamps = columns[known], timestamps[known]
+        for ring in self.rings.values():
+            ring.add(ring.bucket(timestamps), columns)
+        self.totals += np.bincount(columns, minlength=len(self.types))
+
+    def remove(self, alert_type, ts=None):
+        """撤销一条告警（告警被处理），计数不会小于0"""
+        column = self.columns.get(alert_type)
+        if column is None:
+            return
+        ts = time.time() if ts is None else ts
+        for ring in self.rings.values():
+            bucket = ring.bucket(ts)
+            ring.advance(bucket)
+            if bucket > ring.head - ring.size:
+                row = bucket % ring.size
+                ring.counts[row, column] = max(ring.counts[row, column] - 1, 0)
+        self.totals[column] = max(self.totals[column] - 1, 0)
+
+    def series(self, resolution, n, now=None):
+        """
+        最近n个桶的计数
+
+        参数:
+            resolution (str): 'minute'、'hour' 或 'day'
+            n (int): 桶数（截至当前桶）
+        返回:
+            starts (np.ndarray): (n,) 桶起始时间戳
+            counts (np.ndarray): (n, len(types)) 按类型的计数
+        """
+        ring = self.rings[resolution]
+        now = time.time() if now is None else now
+        return ring.window(n, ring.bucket(now))
+
+    def total(self, resolution, n, now=None):
+        """最近n个桶内各类型的告警总数 {类型: 数量}"""
+        _, counts = self.series(resolution, n, now)
+        return dict(zip(self.types, counts.sum(0).tolist()))
+
+
+# 测试代码
+if __name__ == "__main__":
+    types = ['fire', 'animal', 'landslide', 'forest_degradation', 'pest']
+    ts = AlertTimeSeries(types)
+    now = time.time()
+
+    # 过去两天内的10万条随机告警
+    n = 100000
+    rng = np.random.default_rng(0)
+    alert_types = [types[i] for i in rng.integers(0, len(types), n)]
+    stamps = now - rng.uniform(0, 2 * 86400, n)
+    t0 = time.time()
+    ts.add_many(alert_types, stamps)
+    print(f"批量写入 {n} 条: {(time.time() - t0) * 1000:.1f} ms")
+
+    t0 = time.time()
+    for t, s in zip(alert_types[:10000], stamps[:10000]):
+        ts.add(t, s)
+    print(f"逐条写入 10000 条: {(time.time() - t0) * 1000:.1f} ms")
+
+    starts, counts = ts.series('hour', 24, now)
+    print(f"最近24小时: {len(starts)} 个桶, 共 {counts.sum():.0f} 条")
+    starts, counts = ts.series('day', 7, now)
+    print(f"最近7天: {counts.sum(0)}")
+    print(f"总计: {dict(zip(types, ts.totals.tolist()))}")
+
+    # 跨过很多桶边界后过期数据被清零
+    starts, counts = ts.series('minute', 60, now + 3 * 86400)
+    print(f"3天后最近60分钟: {counts.sum():.0f} 条")
@@ -0,0 +1,178 @@
+"""
+多目标跟踪
+
+在NMS和界面之间维护检测目标的轨迹：用IoU把检测框关联到已有轨迹，
+所有轨迹的卡尔曼滤波（匀速模型）以批量矩阵运算更新。
+跳过推理的帧用预测位置延续检测框；只在轨迹新建或置信度升级时产生事件。
+"""
+import numpy as np
+
+
+def iou_matrix(a, b):
+    """计算两组 (x1, y1, x2, y2) 框的IoU矩阵 (n, m)"""
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:4], b[None, :, 2:4])
+    inter = np.clip(rb - lt, 0, None).prod(2)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None] - inter + 1e-9)
+
+
+def xyxy2cxcywh(boxes):
+    return np.stack(((boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2,
+                     boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]), 1)
+
+
+def cxcywh2xyxy(boxes):
+    half = boxes[:, 2:4] / 2
+    return np.concatenate((boxes[:, :2] - half, boxes[:, :2] + half), 1)
+
+
+class Tracker:
+    """IoU关联 + 批量卡尔曼滤波的多目标跟踪器（单路视频一个实例）"""
+
+    # 匀速模型：状态 [cx, cy, w, h, vcx, vcy, vw, vh]，观测 [cx, cy, w, h]
+    F = np.eye(8) + np.eye(8, k=4)
+    H = np.eye(4, 8)
+
+    def __init__(self, iou_thres=0.3, max_age=30, min_hits=1, levels=(0.5, 0.7, 0.9)):
+        """
+        参数:
+            iou_thres (float): 关联检测框与轨迹的最小IoU
+            max_age (int): 轨迹连续多少帧未匹配后删除
+            min_hits (int): 轨迹匹配多少次后确认（确认时产生新建事件）
+            levels (tuple): 置信度等级，轨迹最高置信度跨过新的等级时产生升级事件
+        """
+        self.iou_thres = iou_thres
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.levels = np.asarray(levels)
+        self.next_id = 1
+
+        # 所有轨迹的状态按行存放
+        self.x = np.zeros((0, 8))  # 卡尔曼状态
+        self.P = np.zeros((0, 8, 8))  # 状态协方差
+        self.ids = np.zeros(0, dtype=int)
+        self.cls = np.zeros(0, dtype=int)
+        self.conf = np.zeros(0)  # 最近一次匹配的置信度
+        self.hits = np.zeros(0, dtype=int)
+        self.age = np.zeros(0, dtype=int)  # 连续未匹配帧数
+        self.level = np.zeros(0, dtype=int)  # 已达到的置信度等级
+
+    def noise(self, h):
+        """按框高缩放的过程噪声和观测噪声"""
+        pos, vel = h / 20, h / 160
+        q = np.stack([pos, pos, pos, pos, vel, vel, vel, vel], 1) ** 2
+        r = np.stack([pos, pos, pos, pos], 1) ** 2
+        return q, r
+
+    def predict(self):
+        """所有轨迹前进一帧，返回预测的跟踪结果（用于跳过推理的帧）"""
+        if len(self.ids):
+            q, _ = self.noise(self.x[:, 3])
+            self.x = self.x @ self.F.T
+            self.x[:, 2:4] = np.maximum(self.x[:, 2:4], 1)
+            self.P = self.F @ self.P @ self.F.T + q[:, :, None] * np.eye(8)
+        return self.tracks(visible=True)
+
+    def update(self, dets):
+        """
+        用一帧检测结果更新轨迹
+
+        参数:
+            dets (np.ndarray): (n, 6) [x1, y1, x2, y2, conf, cls]
+        返回:
+            tracks (np.ndarray): (m, 7) [x1, y1, x2, y2, conf, cls, id]，只含已确认且本帧可见的轨迹
+            events (list[dict]): type 为 'birth' 或 'escalation'，以及 id, class, confidence, bbox
+        """
+        self.predict()
+        dets = np.asarray(dets, dtype=float).reshape(-1, 6)
+        matched_t, matched_d = self.associate(dets)
+
+        events = []
+        # 更新匹配上的轨迹（批量卡尔曼更新）
+        if len(matched_t):
+            z = xyxy2cxcywh(dets[matched_d, :4])
+            x, P = self.x[matched_t], self.P[matched_t]
+            _, r = self.noise(x[:, 3])
+            S = self.H @ P @ self.H.T + r[:, :, None] * np.eye(4)
+            K = P @ self.H.T @ np.linalg.inv(S)
+            self.x[matched_t] = x + (K @ (z - x @ self.H.T)[:, :, None])[:, :, 0]
+            self.P[matched_t] = (np.eye(8) - K @ self.H) @ P
+            self.conf[matched_t] = dets[matched_d, 4]
+            self.hits[matched_t] += 1
+            self.age[matched_t] = 0
+
+            # 已确认轨迹的置信度跨过更高等级时升级
+            level = np.searchsorted(self.levels, self.conf[matched_t], side='right')
+            confirmed = self.hits[matched_t] > self.min_hits
+            for t in np.asarray(matched_t)[confirmed & (level > self.level[matched_t])]:
+                events.append(self.event('escalation', t))
+            born = np.asarray(matched_t)[self.hits[matched_t] == self.min_hits]
+            for t in born:
+                events.append(self.event('birth', t))
+            self.level[matched_t] = np.maximum(self.level[matched_t], level)
+
+        # 未匹配的检测新建轨迹
+        unmatched = np.setdiff1d(np.arange(len(dets)), matched_d)
+        if len(unmatched):
+            new = dets[unmatched]
+            z = xyxy2cxcywh(new[:, :4])
+            x = np.concatenate((z, np.zeros_like(z)), 1)
+            h = z[:, 3]
+            std = np.stack([h / 10, h / 10, h / 10, h / 10, h / 16, h / 16, h / 16, h / 16], 1)
+            P = (std ** 2)[:, :, None] * np.eye(8)
+            start = len(self.ids)
+            self.x = np.concatenate((self.x, x))
+            self.P = np.concatenate((self.P, P))
+            self.ids = np.concatenate((self.ids, np.arange(self.next_id, self.next_id + len(new))))
+            self.next_id += len(new)
+            self.cls = np.concatenate((self.cls, new[:, 5].astype(int)))
+            self.conf = np.concatenate((self.conf, new[:, 4]))
+            self.hits = np.concatenate((self.hits, np.ones(len(new), dtype=int)))
+            self.age = np.concatenate((self.age, np.zeros(len(new), dtype=int)))
+            self.level = np.concatenate((self.level, np.searchsorted(self.levels, new[:, 4], side='right')))
+            if self.min_hits <= 1:
+                events.extend(self.event('birth', t) for t in range(start, len(self.ids)))
+
+        # 删除长时间未匹配的轨迹
+        keep = self.age <= self.max_age
+        if not keep.all():
+            for name in ('x', 'P', 'ids', 'cls', 'conf', 'hits', 'age', 'level'):
+                setattr(self, name, getattr(self, name)[keep])
+
+        return self.tracks(visible=True), events
+
+    def associate(self, dets):
+        """按IoU从大到小贪心匹配同类别的轨迹和检测，返回匹配的轨迹索引和检测索引"""
+        if not len(self.ids) or not len(dets):
+            self.age += 1
+            return [], []
+        iou = iou_matrix(cxcywh2xyxy(self.x[:, :4]), dets[:, :4])
+        iou[self.cls[:, None] != dets[None, :, 5].astype(int)] = 0
+        t, d = np.nonzero(iou >= self.iou_thres)
+        order = np.argsort(-iou[t, d])
+        matched_t, matched_d, used_t, used_d = [], [], set(), set()
+        for i in order:
+            if t[i] not in used_t and d[i] not in used_d:
+                used_t.add(t[i])
+                used_d.add(d[i])
+                matched_t.append(t[i])
+                matched_d.append(d[i])
+        unmatched = np.ones(len(self.ids), dtype=bool)
+        unmatched[matched_t] = False
+        self.age[unmatched] += 1
+        return matched_t, matched_d
+
+    def tracks(self, visible=False):
+        """当前已确认的轨迹 (m, 7)；visible为True时只返回本帧匹配上的轨迹"""
+        mask = self.hits >= self.min_hits
+        if visible:
+            mask &= self.age == 0
+        boxes = cxcywh2xyxy(self.x[mask, :4])
+        return np.concatenate((boxes, self.conf[mask, None], self.cls[mask, None], self.ids[mask, None]), 1)
+
+    def event(self, kind, t):
+        box = cxcywh2xyxy(self.x[t:t + 1, :4])[0]
+        return {'type': kind, 'id': int(self.ids[t]), 'class': int(self.cls[t]),
+                'confidence': float(self.conf[t]), 'bbox': box.astype(int).tolist()}